@@ -0,0 +1,74 @@
+"""
+Micro-benchmark for section classification on a large snapshot.
+
+    python benchmarks/bench_section_state.py [--nodes 10000] [--rounds 20]
+
+Reports the cost of get_section_state() per key and of classifying a whole
+snapshot the way every renderer sees it (Snapshot.states(), once per snapshot).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hashicorp_doctor.snapshot import Snapshot  # noqa: E402
+from hashicorp_doctor.utils import get_section_state  # noqa: E402
+
+
+def large_snapshot(nodes):
+    catalog = [{'ID': f'id-{i}', 'Node': f'node-{i}', 'Address': f'10.0.{i // 256}.{i % 256}',
+                'Datacenter': 'dc1', 'Meta': {'segment': ''}} for i in range(nodes)]
+    token = {'data': {'id': '', 'policies': [f'policy-{i}' for i in range(nodes)],
+                      'meta': {f'key-{i}': 'value' for i in range(nodes)}}}
+    return Snapshot({
+        'Vault': {
+            'leader': {'ha_enabled': True, 'is_self': True},
+            'seal_status': {'sealed': False},
+            'token_lookup_self': token,
+            'replication_status': {'dr': {'mode': 'disabled'}, 'performance': {'mode': 'primary'}},
+            'autopilot': 'Error: 403 permission denied',
+        },
+        'Consul': {
+            'members': catalog,
+            'catalog_nodes': catalog,
+            'raft_peers': ['10.0.0.1:8300', '10.0.0.2:8300', '10.0.0.3:8300'],
+            'autopilot_health': {'Healthy': True},
+        },
+        'Nomad': {'leader': '10.0.0.1:4647', 'list_peers': ['10.0.0.1:4647'], 'scheduler': {}},
+    })
+
+
+def bench(func, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--nodes', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+    snapshot = large_snapshot(args.nodes)
+    print(f"{'section':<28} {'best (us)':>12}")
+    for title, data in snapshot.sections.items():
+        product = snapshot.products[title]
+        for key, value in data.items():
+            elapsed = bench(lambda: get_section_state(key, value, product), args.rounds)
+            print(f"{title + '.' + key:<28} {elapsed * 1e6:12.1f}")
+
+    def classify_all():
+        fresh = Snapshot(snapshot.sections)
+        for title in fresh.sections:
+            fresh.states(title)
+
+    print(f"\nwhole snapshot ({args.nodes} nodes): {bench(classify_all, args.rounds) * 1e3:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Import-time benchmark for the CLI.
+
+    python benchmarks/bench_startup.py [--runs 7] [--budget-ms 100]
+
+Measures, in fresh interpreters, the cumulative import time of
+hashicorp_doctor.cli (python -X importtime) and the wall time of a few
+commands that should stay cheap, then lists the slowest imports. Exits with
+status 1 when the median import time is over the budget, so it can run in CI.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMANDS = [['--help'], ['nomad', '--help'], ['web', '--help']]
+
+
+def import_times():
+    """Module -> cumulative import time in microseconds for one fresh import of the CLI."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import hashicorp_doctor.cli'],
+                            capture_output=True, text=True, cwd=ROOT, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def wall_time(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'hashicorp_doctor.cli'] + args, capture_output=True, cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=100.0, help='Allowed median import time of hashicorp_doctor.cli')
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.runs)]
+    median_ms = statistics.median(run['hashicorp_doctor.cli'] for run in runs) / 1000
+    print(f"import hashicorp_doctor.cli: {median_ms:.1f} ms (median of {args.runs}, budget {args.budget_ms:g} ms)")
+    for command in COMMANDS:
+        elapsed = statistics.median(wall_time(command) for _ in range(args.runs))
+        print(f"hcp-doctor {' '.join(command):<14} {elapsed * 1000:8.1f} ms wall (includes interpreter start)")
+
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+    print("\nslowest imports (cumulative):")
+    for module, micros in [item for item in slowest if item[0] != 'hashicorp_doctor.cli'][:10]:
+        print(f"  {module:<40} {micros / 1000:8.1f} ms")
+    heavy = [m for m in ('aiohttp', 'requests', 'flask', 'hvac', 'fpdf') if m in runs[-1]]
+    if heavy:
+        print(f"\nheavy modules imported at startup: {', '.join(heavy)}")
+    return 0 if median_ms <= args.budget_ms and not heavy else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
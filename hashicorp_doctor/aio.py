@@ -0,0 +1,276 @@
+import asyncio
+import json
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from hashicorp_doctor.config import env_number
+from hashicorp_doctor.executor import (
+    ProbeTimeout, default_probe_timeout, default_connect_timeout, default_read_timeout, default_pool_size,
+)
+from hashicorp_doctor.streaming import JsonArrayParser
+from hashicorp_doctor.timing import ProbeTiming, current_timing, timed_probe, trace_config
+
+DEFAULT_CONNECTION_LIMIT = 100
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def default_connection_limit():
+    """Open connections allowed across all clusters in one async run (HCP_DOCTOR_CONNECTION_LIMIT, default 100)."""
+    return env_number('HCP_DOCTOR_CONNECTION_LIMIT', DEFAULT_CONNECTION_LIMIT, int)
+
+
+class APIError(Exception):
+    """Non-2xx response from a Vault, Consul or Nomad HTTP API."""
+
+    def __init__(self, status_code, text='', body=None):
+        super().__init__(f"{status_code} {text}".strip())
+        self.status_code = status_code
+        self.body = body
+
+
+def _ssl(verify):
+    # aiohttp takes the TLS setting per request, so one connector serves clusters with different CAs
+    if isinstance(verify, str):
+        return ssl.create_default_context(cafile=verify)
+    return True if verify else False
+
+
+class AsyncHTTP:
+    """
+    One aiohttp session and connector shared by every async collector in a
+    run. limit caps open connections overall and limit_per_host per cluster,
+    so hundreds of probes across many clusters run on a single event loop
+    without a thread per request. Use as an async context manager, or call
+    close() when done.
+    """
+
+    def __init__(self, limit=None, limit_per_host=None, timeout=None, connect_timeout=None, read_timeout=None):
+        self.limit = limit or default_connection_limit()
+        self.limit_per_host = limit_per_host or default_pool_size()
+        self.timeout = timeout or default_probe_timeout()
+        self.connect_timeout = connect_timeout or default_connect_timeout()
+        self.read_timeout = read_timeout or default_read_timeout()
+        self._session = None
+
+    def session(self):
+        # Created lazily: aiohttp sessions must be built inside the running loop
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            # A blackholed node fails after connect_timeout instead of the OS TCP timeout
+            timeout = aiohttp.ClientTimeout(total=self.timeout, sock_connect=self.connect_timeout,
+                                            sock_read=self.read_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[trace_config()])
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def get_json(self, url, headers=None, params=None, verify=True, allow_errors=False):
+        """
+        GET url and return the decoded JSON body (plain text when the response
+        is not JSON, None when it is empty).
+        Raises:
+            APIError: On a non-2xx status, unless allow_errors is set, in which
+                case the error body is returned like a successful one.
+        """
+        body, _ = await self.get_json_with_headers(url, headers, params, verify, allow_errors)
+        return body
+
+    async def get_json_with_headers(self, url, headers=None, params=None, verify=True, allow_errors=False, timeout=None):
+        """
+        Like get_json(), but returns (body, response headers), e.g. to follow
+        X-Consul-Index. timeout (seconds) replaces the client's total and read
+        timeouts for this request, for long polls that outlast them.
+        """
+        timing = current_timing()
+        start = time.monotonic()
+        options = {}
+        if timeout is not None:
+            options['timeout'] = aiohttp.ClientTimeout(total=timeout, sock_connect=self.connect_timeout, sock_read=timeout)
+        async with self.session().get(url, headers=headers or {}, params=params, ssl=_ssl(verify),
+                                      trace_request_ctx=timing, **options) as resp:
+            if timing is not None:
+                timing.requests += 1
+                timing.ttfb += time.monotonic() - start
+            raw = await resp.read()
+            text = raw.decode(resp.get_encoding() or 'utf-8', 'replace')
+            start = time.monotonic()
+            body = None
+            if text.strip():
+                try:
+                    body = json.loads(text)
+                except ValueError:
+                    body = text.strip()
+            if timing is not None:
+                timing.bytes += len(raw)
+                timing.add_parse(start)
+            if resp.status >= 400 and not allow_errors:
+                if isinstance(body, dict) and isinstance(body.get('errors'), list):
+                    raise APIError(resp.status, ', '.join(str(e) for e in body['errors']), body)
+                raise APIError(resp.status, text, body)
+            return body, resp.headers
+
+    async def iter_json_array(self, url, headers=None, params=None, verify=True):
+        """Stream url and yield the elements of its JSON array body one at a time."""
+        timing = current_timing()
+        start = time.monotonic()
+        async with self.session().get(url, headers=headers or {}, params=params, ssl=_ssl(verify),
+                                      trace_request_ctx=timing) as resp:
+            if timing is not None:
+                timing.requests += 1
+                timing.ttfb += time.monotonic() - start
+            if resp.status >= 400:
+                raise APIError(resp.status, (await resp.text())[:200])
+            parser = JsonArrayParser()
+            async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+                start = time.monotonic()
+                items = parser.feed(chunk)
+                if timing is not None:
+                    timing.bytes += len(chunk)
+                    timing.add_parse(start)
+                for item in items:
+                    yield item
+                if parser.finished:
+                    break
+            parser.close()
+
+    async def iter_json_lines(self, url, headers=None, params=None, verify=True):
+        """
+        Stream a newline-delimited JSON body (e.g. Nomad's event stream) and
+        yield each decoded line as it arrives. The request has no total
+        deadline; a stream silent for longer than read_timeout still fails.
+        """
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+        async with self.session().get(url, headers=headers or {}, params=params, ssl=_ssl(verify),
+                                      timeout=timeout) as resp:
+            if resp.status >= 400:
+                raise APIError(resp.status, (await resp.text())[:200])
+            pending = bytearray()
+            async for chunk in resp.content.iter_any():
+                pending += chunk
+                end = pending.rfind(b'\n')
+                if end < 0:
+                    continue
+                lines = bytes(pending[:end]).split(b'\n')
+                del pending[:end + 1]
+                for line in lines:
+                    if line.strip():
+                        yield json.loads(line)
+            if pending.strip():
+                yield json.loads(bytes(pending))
+
+
+class RateLimiter:
+    """
+    Spaces requests so that at most rate of them start per second, on top of
+    whatever concurrency limit applies. rate None or 0 disables it. Meant for
+    one event loop: slots are handed out without awaiting in between.
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def gather_probes(probes, timeout=None, limit=None, budget=None, timings=None):
+    """
+    Await independent probes concurrently.
+    Args:
+        probes (list): (key, factory) pairs; each factory returns a new awaitable.
+        timeout (float): Deadline in seconds for each probe, counted from when it starts.
+        limit (int): Maximum number of probes in flight at once.
+        budget (float): Deadline in seconds for the whole batch. Probes still
+            pending or queued when it runs out are cancelled.
+        timings (dict): Filled with probe key -> ProbeTiming when given.
+    Returns:
+        dict: Results keyed by probe key in the given order. A raised exception
+        is stored as-is; a late or cancelled probe is stored as ProbeTimeout.
+    """
+    probes = list(probes)
+    if not probes:
+        return {}
+    timeout = timeout or default_probe_timeout()
+    semaphore = asyncio.Semaphore(limit or len(probes))
+
+    async def _run(key, factory):
+        async with semaphore:
+            try:
+                if timings is None:
+                    return await asyncio.wait_for(factory(), timeout)
+                timings[key] = ProbeTiming()
+                return await asyncio.wait_for(timed_probe(timings[key], factory), timeout)
+            except aiohttp.ServerTimeoutError as e:
+                # Connect or read timeout of the request itself
+                return e
+            except asyncio.TimeoutError:
+                return ProbeTimeout(f"timed out after {timeout:g}s")
+            except Exception as e:
+                return e
+
+    tasks = [asyncio.ensure_future(_run(key, factory)) for key, factory in probes]
+    done, pending = await asyncio.wait(tasks, timeout=budget)
+    for task in pending:
+        task.cancel()
+    if pending:
+        # Let cancelled probes release their connections before returning
+        await asyncio.wait(pending)
+    results = {}
+    for (key, _), task in zip(probes, tasks):
+        if task in done:
+            results[key] = task.result()
+        else:
+            results[key] = ProbeTimeout(f"timed out (budget of {budget:g}s exhausted)")
+    return results
+
+
+def run_sync(coro):
+    """
+    Run a coroutine to completion from blocking code and return its result.
+    When called from a thread that already runs an event loop, the coroutine
+    runs on a fresh loop in a helper thread instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='hcp-async') as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+class BackgroundLoop:
+    """
+    One event loop running in a daemon thread for the life of the process.
+    Blocking callers submit coroutines with run(); because the loop outlives
+    each call, AsyncHTTP clients created on it keep their pooled keep-alive
+    connections between collections.
+    """
+
+    def __init__(self, name='hcp-loop'):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    def run(self, coro):
+        """Run a coroutine on the loop and block until it returns."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 30.0
+DEFAULT_MAX_ENTRIES = 32
+
+
+def default_ttl():
+    """Seconds a collected result stays fresh (HCP_DOCTOR_CACHE_TTL, default 30)."""
+    try:
+        return float(os.environ.get('HCP_DOCTOR_CACHE_TTL') or DEFAULT_TTL)
+    except ValueError:
+        return DEFAULT_TTL
+
+
+def default_max_entries():
+    """Results kept before the least recently used is evicted (HCP_DOCTOR_CACHE_SIZE, default 32)."""
+    try:
+        return int(os.environ.get('HCP_DOCTOR_CACHE_SIZE') or DEFAULT_MAX_ENTRIES)
+    except ValueError:
+        return DEFAULT_MAX_ENTRIES
+
+
+class CachedResult:
+    """A collected value together with when it was collected and whether it came from cache."""
+
+    def __init__(self, value, stored_at, hit):
+        self.value = value
+        self.stored_at = stored_at
+        self.hit = hit
+
+    @property
+    def age(self):
+        return max(time.time() - self.stored_at, 0.0)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResultCache:
+    """
+    Thread-safe TTL cache for diagnostics results with LRU eviction and
+    single-flight collection: concurrent callers asking for the same missing
+    key wait for one collection run instead of each starting their own.
+    """
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = default_ttl() if ttl is None else ttl
+        self.max_entries = max_entries or default_max_entries()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if self.ttl > 0 and time.time() - stored_at > self.ttl:
+            return None
+        self._entries.move_to_end(key)
+        return CachedResult(value, stored_at, True)
+
+    def get(self, key):
+        """Return the fresh CachedResult for key, or None."""
+        with self._lock:
+            return self._fresh(key)
+
+    def peek(self, key):
+        """
+        Return the last stored CachedResult for key even when it is stale, or
+        None. Does not count as a hit or refresh the entry's LRU position.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        return CachedResult(value, stored_at, True)
+
+    def put(self, key, value, stored_at=None):
+        """Store value under key, evicting the least recently used entries past max_entries."""
+        stored_at = time.time() if stored_at is None else stored_at
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return CachedResult(value, stored_at, False)
+
+    def get_or_collect(self, key, collect, refresh=False):
+        """
+        Return the cached result for key, running collect() on a miss.
+        Args:
+            key (hashable): Cache key, e.g. (product, address).
+            collect (callable): Produces the value on a miss.
+            refresh (bool): Ignore any cached value and collect again.
+        Returns:
+            CachedResult: The value, its collection time and whether it was a hit.
+        """
+        with self._lock:
+            if not refresh:
+                cached = self._fresh(key)
+                if cached is not None:
+                    self.hits += 1
+                    return cached
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._inflight[key] = _Flight()
+            self.misses += 1
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = self.put(key, collect())
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
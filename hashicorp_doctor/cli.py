@@ -1,11 +1,14 @@
 import click
 import json
 import os
+import time
 
-from hashicorp_doctor.vault.diagnostics import run_vault_diagnostics
-from hashicorp_doctor.consul_diag.diagnostics import run_consul_diagnostics
-from hashicorp_doctor.nomad_diag.diagnostics import run_nomad_diagnostics
-from hashicorp_doctor.utils import get_section_state
+# Diagnostics modules (aiohttp), the fleet runner and the web UI (Flask) are
+# imported inside the subcommands that use them, so --help and each product
+# command only load what they need.
+from hashicorp_doctor.probes import PROBES, load_probes, parse_probe_names, validate_probe_names
+from hashicorp_doctor.snapshot import PRODUCTS, Snapshot
+from hashicorp_doctor.renderers import REPORT_TITLE, TIMING_PHASES, PdfLayout, pdf_section, probe_timing_rows, render
 
 def print_section(title, data, pdf=None):
     click.secho(f"\n{'='*60}", fg='cyan')
@@ -14,8 +17,9 @@ def print_section(title, data, pdf=None):
 
 
     if isinstance(data, dict):
+        states = Snapshot({title: data}).states(title)
         for key, value in data.items():
-            state = get_section_state(key, value)
+            state = states[key]
             # Special color and label for Consul Autopilot Health/State
             if key in ['autopilot_health', 'autopilot_state']:
                 if state == 'Healthy':
@@ -33,69 +37,89 @@ def print_section(title, data, pdf=None):
                 click.echo(json.dumps(value, indent=4, default=str))
             else:
                 click.echo(f"  {value}")
-            if pdf is not None:
-                from fpdf.enums import XPos, YPos
-                def safe_line(line):
-                    # Replace all non-ASCII, non-printable, and problematic whitespace with '?'
-                    return ''.join((c if 32 <= ord(c) <= 126 else '?') for c in line.replace('\t', ' ').replace('\n', ' '))
-                pdf.set_font("Courier", size=10)
-                pdf.cell(0, 8, f"{key.upper()} - {state}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-                pdf.set_font("Courier", size=8)
-                text = json.dumps(value, indent=2, default=str)
-                for line in text.splitlines():
-                    safe = safe_line(line)
-                    if not safe.strip():
-                        continue
-                    # FPDFException workaround: forcibly break every character if needed
-                    i = 0
-                    while i < len(safe):
-                        chunk = safe[i:i+90]
-                        if not chunk.strip():
-                            i += 90
-                            continue
-                        pdf.multi_cell(0, 5, chunk)
-                        i += 90
-                pdf.ln(2)
     elif isinstance(data, list):
         click.echo(json.dumps(data, indent=2, default=str))
-        if pdf is not None:
-            def safe_line(line):
-                return ''.join((c if 32 <= ord(c) <= 126 else '?') for c in line.replace('\t', ' ').replace('\n', ' '))
-            pdf.set_font("Courier", size=8)
-            text = json.dumps(data, indent=2, default=str)
-            for line in text.splitlines():
-                safe = safe_line(line)
-                if not safe.strip():
-                    continue
-                i = 0
-                while i < len(safe):
-                    chunk = safe[i:i+90]
-                    if not chunk.strip():
-                        i += 90
-                        continue
-                    pdf.multi_cell(0, 5, chunk)
-                    i += 90
-            pdf.ln(2)
     else:
         click.echo(str(data))
-        if pdf is not None:
-            def safe_line(line):
-                return ''.join((c if 32 <= ord(c) <= 126 else '?') for c in line.replace('\t', ' ').replace('\n', ' '))
-            pdf.set_font("Courier", size=8)
-            text = str(data)
-            for line in text.splitlines():
-                safe = safe_line(line)
-                if not safe.strip():
-                    continue
-                i = 0
-                while i < len(safe):
-                    chunk = safe[i:i+90]
-                    if not chunk.strip():
-                        i += 90
-                        continue
-                    pdf.multi_cell(0, 5, chunk)
-                    i += 90
-            pdf.ln(2)
+    if pdf is not None:
+        # Same batched layout engine as the PDF report renderer
+        layout = PdfLayout(pdf)
+        pdf_section(layout, Snapshot({title: data}), title)
+        layout.finish()
+
+
+def write_report(snapshot, fmt, path, default_name, title=REPORT_TITLE):
+    """
+    Render a snapshot to path (or to default_name inside path when it is a directory).
+    Returns:
+        float: Seconds spent rendering, or None when the report failed.
+    """
+    report_path = path
+    if os.path.isdir(path):
+        report_path = os.path.join(path, default_name)
+    try:
+        start = time.monotonic()
+        body = render(snapshot, fmt, title=title)
+        elapsed = time.monotonic() - start
+        with open(report_path, 'wb') as f:
+            f.write(body)
+        click.secho(f"\n{fmt.upper()} report generated at: {report_path}", fg='green', bold=True)
+        return elapsed
+    except Exception as e:
+        click.secho(f"{fmt.upper()} report failed: {e}", fg='red', bold=True)
+        return None
+
+
+def print_timings(timings):
+    click.secho(f"\n{'='*60}", fg='cyan')
+    click.secho("Collection Timings", fg='green', bold=True)
+    click.secho(f"{'='*60}", fg='cyan')
+    timings = [(title, elapsed) for title, elapsed in timings if elapsed is not None]
+    width = max([10] + [len(title) for title, _ in timings])
+    for title, elapsed in timings:
+        click.echo(f"  {title:<{width}} {elapsed:8.2f}s")
+
+
+def print_probe_timings(snapshot, render_timings=()):
+    """Print where each probe spent its time, slowest first, then report rendering times."""
+    click.secho(f"\n{'='*60}", fg='cyan')
+    click.secho("Probe Timings (ms)", fg='green', bold=True)
+    click.secho(f"{'='*60}", fg='cyan')
+    rows = [(f"{section} / {key}", timing) for section, key, timing in probe_timing_rows(snapshot)]
+    render_timings = [(f"{fmt.upper()} report", elapsed) for fmt, elapsed in render_timings if elapsed is not None]
+    width = max([10] + [len(name) for name, _ in rows + render_timings])
+    click.echo(f"  {'probe':<{width}}" + ''.join(f"{phase:>9}" for phase in TIMING_PHASES) + f"{'bytes':>11}")
+    for name, timing in rows:
+        phases = ''.join(f"{timing.get(phase, 0) * 1000:9.1f}" for phase in TIMING_PHASES)
+        click.echo(f"  {name:<{width}}{phases}{timing.get('bytes', 0):>11}")
+    for name, elapsed in render_timings:
+        click.echo(f"  {name:<{width}}{'render':>9}{elapsed * 1000:9.1f}")
+
+
+def save_run(snapshot, source, targets=None):
+    """Record a snapshot in the run history (HCP_DOCTOR_STORE); never fails the command."""
+    from hashicorp_doctor.store import default_store
+    try:
+        store = default_store()
+        if store is not None:
+            run_id = store.save(snapshot, source=source, targets=targets)
+            click.secho(f"\nRun saved to history as #{run_id} ({store.path})", fg='green')
+    except Exception as e:
+        click.secho(f"Could not save run to history: {e}", fg='red')
+
+
+def _probe_names(ctx, param, value):
+    names = parse_probe_names(value)
+    try:
+        validate_probe_names(names)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    return names
+
+
+probes_option = click.option('--probes', callback=_probe_names, help='Only run these probes (comma-separated: product, key or product.key; see the probes command)')
+skip_probes_option = click.option('--skip-probes', callback=_probe_names, help='Skip these probes (comma-separated: product, key or product.key)')
+timings_option = click.option('--timings', 'show_timings', is_flag=True, help='Print per-probe DNS/connect/first-byte/parse/total times and response sizes')
 
 
 @click.group(context_settings=dict(help_option_names=['--help']))
@@ -137,76 +161,151 @@ def cli(ctx, vault_addr, vault_token, consul_addr, consul_token, nomad_addr, nom
 # Add individual product commands to the CLI
 @cli.command()
 @click.option('--html', type=click.Path(), help='Generate HTML report at the given path')
+@probes_option
+@skip_probes_option
+@timings_option
+@click.option('--all-nodes', is_flag=True, help='Also probe health, seal and raft state on every HA member, not just VAULT_ADDR')
 @click.pass_context
-def vault(ctx, html):
+def vault(ctx, html, probes, skip_probes, show_timings, all_nodes):
     """Run Vault diagnostics only."""
     click.secho('\n[Vault Diagnostics]', fg='yellow', bold=True)
     try:
-        vault_diag = run_vault_diagnostics()
+        from hashicorp_doctor.vault.diagnostics import run_vault_diagnostics
+        timings = {}
+        vault_diag = run_vault_diagnostics(probes=probes, skip_probes=skip_probes, timings=timings, all_nodes=all_nodes)
         print_section('Vault', vault_diag)
+        snapshot = Snapshot({'Vault': vault_diag}, probe_timings={'Vault': timings})
+        render_timings = []
         if html:
-            import os
-            html_path = html
-            if os.path.isdir(html):
-                html_path = os.path.join(html, 'vault_diagnostics_report.html')
-            html_lines = ["""
-<html><head><meta charset='utf-8'><title>Vault Diagnostics Report</title><style>body { font-family: Arial, sans-serif; margin: 2em; } h1 { color: #2d5fa4; } h2 { color: #1a3d6d; border-bottom: 1px solid #ccc; } pre { background: #f8f8f8; border: 1px solid #ddd; padding: 8px; overflow-x: auto; }</style></head><body><h1>Vault Diagnostics Report</h1>
-"""]
-            html_lines.append(f"<pre>{json.dumps(vault_diag, indent=4, default=str)}</pre>")
-            html_lines.append("</body></html>")
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.writelines(html_lines)
-            click.secho(f"\nHTML report generated at: {html_path}", fg='green', bold=True)
+            render_timings.append(('html', write_report(snapshot, 'html', html, 'vault_diagnostics_report.html', 'Vault Diagnostics Report')))
+        if show_timings:
+            print_probe_timings(snapshot, render_timings)
     except Exception as e:
         print(f'ERROR: Vault diagnostics failed: {e}')
 
+def print_watch_change(key, value, state, previous):
+    color = 'green' if state in ['Good', 'Healthy'] else 'red' if state in ['Failed', 'Unhealthy'] else 'white'
+    change = f"{previous} -> {state}" if previous and previous != state else state
+    click.secho(f"[{time.strftime('%H:%M:%S')}] {key}: {change}", fg=color)
+    if isinstance(value, dict) and 'by_status' in value:
+        click.echo(f"    {value.get('total', 0)} total, " + ', '.join(f"{count} {status}" for status, count in sorted(value['by_status'].items())))
+    elif isinstance(value, str):
+        click.echo(f"    {value}")
+
+
+AGENT_COLUMNS = [('name', 'AGENT'), ('role', 'ROLE'), ('datacenter', 'DC'), ('version', 'VERSION'), ('checks', 'CHECKS'),
+                 ('goroutines', 'GOROUTINES'), ('alloc_bytes', 'ALLOC MB'), ('critical', 'CRITICAL / ERRORS')]
+
+
+def _agent_cell(row, key):
+    value = row.get(key)
+    if key == 'name' and row.get('leader'):
+        return f"{value} *"
+    if key == 'checks' and value is not None:
+        return f"{value.get('passing', 0)}/{value.get('warning', 0)}/{value.get('critical', 0)}"
+    if key == 'alloc_bytes' and value is not None:
+        return f"{value / 1048576:.0f}"
+    if key == 'goroutines' and value is not None:
+        return f"{value:.0f}"
+    if key == 'critical':
+        return ', '.join(value or []) or '; '.join(f"{k}: {v}" for k, v in row.get('errors', {}).items())
+    return '' if value is None else str(value)
+
+
+def print_agent_table(rows):
+    click.secho("\nAgents (* leader, checks passing/warning/critical)", fg='green', bold=True)
+    table = [[header for _, header in AGENT_COLUMNS]] + [[_agent_cell(row, key) for key, _ in AGENT_COLUMNS] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(AGENT_COLUMNS) - 1)]
+    for line in table:
+        text = '  '.join(cell.ljust(width) for cell, width in zip(line, widths)) + '  ' + line[-1]
+        unhealthy = line is not table[0] and line[-1]
+        click.secho(text.rstrip(), fg='red' if unhealthy else None)
+
+
+def watch_consul_changes(raw, wait, duration):
+    from hashicorp_doctor.consul_diag.watch import watch_consul
+    click.echo('Watching Consul health (Ctrl-C to stop)...')
+    try:
+        watch_consul(raw=raw or None, wait=wait, on_change=print_watch_change, duration=duration)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f'ERROR: Consul watch failed: {e}')
+
+def follow_nomad_changes(duration):
+    from hashicorp_doctor.nomad_diag.events import follow_nomad_events
+    click.echo('Following the Nomad event stream (Ctrl-C to stop)...')
+    try:
+        follow_nomad_events(on_change=print_watch_change, duration=duration)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f'ERROR: Nomad event stream failed: {e}')
+
 @cli.command()
 @click.option('--html', type=click.Path(), help='Generate HTML report at the given path')
+@click.option('--raw', is_flag=True, help='Keep full Consul member/catalog payloads instead of streamed summaries')
+@probes_option
+@skip_probes_option
+@timings_option
+@click.option('--watch', is_flag=True, help='Keep running and print health changes as Consul reports them (blocking queries)')
+@click.option('--wait', type=float, help='Longest a watch query is held open by Consul, in seconds (default: HCP_DOCTOR_WATCH_WAIT or 60)')
+@click.option('--duration', type=float, help='Stop watching after this many seconds (default: until interrupted)')
+@click.option('--deep', is_flag=True, help='Also query /v1/agent/self, metrics and checks on every server from the members list')
+@click.option('--sample-clients', type=click.IntRange(min=0), default=0, show_default=True, help='Alive client agents sampled for --deep')
 @click.pass_context
-def consul(ctx, html):
+def consul(ctx, html, raw, probes, skip_probes, show_timings, watch, wait, duration, deep, sample_clients):
     """Run Consul diagnostics only."""
     click.secho('\n[Consul Diagnostics]', fg='yellow', bold=True)
+    if watch:
+        watch_consul_changes(raw, wait, duration)
+        return
     try:
-        consul_diag = run_consul_diagnostics()
-        print_section('Consul', consul_diag)
+        from hashicorp_doctor.consul_diag.diagnostics import run_consul_diagnostics
+        timings = {}
+        consul_diag = run_consul_diagnostics(raw=raw or None, probes=probes, skip_probes=skip_probes, timings=timings,
+                                             deep=deep, sample_clients=sample_clients)
+        agents = consul_diag.get('agents')
+        if isinstance(agents, dict):
+            # The per-agent table is printed as a table, not as JSON
+            print_section('Consul', dict(consul_diag, agents={k: v for k, v in agents.items() if k != 'agents'}))
+            print_agent_table(agents['agents'])
+        else:
+            print_section('Consul', consul_diag)
+        snapshot = Snapshot({'Consul': consul_diag}, probe_timings={'Consul': timings})
+        render_timings = []
         if html:
-            import os
-            html_path = html
-            if os.path.isdir(html):
-                html_path = os.path.join(html, 'consul_diagnostics_report.html')
-            html_lines = ["""
-<html><head><meta charset='utf-8'><title>Consul Diagnostics Report</title><style>body { font-family: Arial, sans-serif; margin: 2em; } h1 { color: #2d5fa4; } h2 { color: #1a3d6d; border-bottom: 1px solid #ccc; } pre { background: #f8f8f8; border: 1px solid #ddd; padding: 8px; overflow-x: auto; }</style></head><body><h1>Consul Diagnostics Report</h1>
-"""]
-            html_lines.append(f"<pre>{json.dumps(consul_diag, indent=4, default=str)}</pre>")
-            html_lines.append("</body></html>")
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.writelines(html_lines)
-            click.secho(f"\nHTML report generated at: {html_path}", fg='green', bold=True)
+            render_timings.append(('html', write_report(snapshot, 'html', html, 'consul_diagnostics_report.html', 'Consul Diagnostics Report')))
+        if show_timings:
+            print_probe_timings(snapshot, render_timings)
     except Exception as e:
         print(f'ERROR: Consul diagnostics failed: {e}')
 
 @cli.command()
 @click.option('--html', type=click.Path(), help='Generate HTML report at the given path')
+@probes_option
+@skip_probes_option
+@timings_option
+@click.option('--events', 'follow_events', is_flag=True, help='Keep running and print allocation, node, job and deployment health from the event stream')
+@click.option('--duration', type=float, help='Stop following events after this many seconds (default: until interrupted)')
 @click.pass_context
-def nomad(ctx, html):
+def nomad(ctx, html, probes, skip_probes, show_timings, follow_events, duration):
     """Run Nomad diagnostics only."""
     click.secho('\n[Nomad Diagnostics]', fg='yellow', bold=True)
+    if follow_events:
+        follow_nomad_changes(duration)
+        return
     try:
-        nomad_diag = run_nomad_diagnostics()
+        from hashicorp_doctor.nomad_diag.diagnostics import run_nomad_diagnostics
+        timings = {}
+        nomad_diag = run_nomad_diagnostics(probes=probes, skip_probes=skip_probes, timings=timings)
         print_section('Nomad', nomad_diag)
+        snapshot = Snapshot({'Nomad': nomad_diag}, probe_timings={'Nomad': timings})
+        render_timings = []
         if html:
-            import os
-            html_path = html
-            if os.path.isdir(html):
-                html_path = os.path.join(html, 'nomad_diagnostics_report.html')
-            html_lines = ["""
-<html><head><meta charset='utf-8'><title>Nomad Diagnostics Report</title><style>body { font-family: Arial, sans-serif; margin: 2em; } h1 { color: #2d5fa4; } h2 { color: #1a3d6d; border-bottom: 1px solid #ccc; } pre { background: #f8f8f8; border: 1px solid #ddd; padding: 8px; overflow-x: auto; }</style></head><body><h1>Nomad Diagnostics Report</h1>
-"""]
-            html_lines.append(f"<pre>{json.dumps(nomad_diag, indent=4, default=str)}</pre>")
-            html_lines.append("</body></html>")
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.writelines(html_lines)
-            click.secho(f"\nHTML report generated at: {html_path}", fg='green', bold=True)
+            render_timings.append(('html', write_report(snapshot, 'html', html, 'nomad_diagnostics_report.html', 'Nomad Diagnostics Report')))
+        if show_timings:
+            print_probe_timings(snapshot, render_timings)
     except Exception as e:
         print(f'ERROR: Nomad diagnostics failed: {e}')
 
@@ -214,98 +313,233 @@ def nomad(ctx, html):
 
 @cli.command(help="Run diagnostic test for all runtime products.")
 @click.option('--html', type=click.Path(), help='Generate HTML report at the given path')
+@click.option('--txt', type=click.Path(), help='Generate plain-text report at the given path')
+@click.option('--json', 'json_path', type=click.Path(), help='Generate JSON report at the given path')
+@click.option('--pdf', type=click.Path(), help='Generate PDF report at the given path')
+@click.option('--raw', is_flag=True, help='Keep full Consul member/catalog payloads instead of streamed summaries')
+@click.option('--budget', type=float, default=None, help='Upper bound in seconds for the whole run; probes still pending are reported as timed out (default: HCP_DOCTOR_RUN_BUDGET or 90)')
+@probes_option
+@skip_probes_option
+@timings_option
 @click.pass_context
-def doctor(ctx, html):
-    print('DEBUG: doctor command started')
+def doctor(ctx, html, txt, json_path, pdf, raw, budget, probes, skip_probes, show_timings):
     """Run diagnostics across all runtime products (Vault, Consul, Nomad, General)."""
-    html_writer = None
-    html_lines = []
-    if html:
-        html_writer = True
-        html_lines.append("""
-<html><head><meta charset='utf-8'><title>HashiCorp Doctor Report</title>
-<style>
-body { font-family: Arial, sans-serif; margin: 2em; }
-h1 { color: #2d5fa4; }
-h2 { color: #1a3d6d; border-bottom: 1px solid #ccc; }
-.section { margin-bottom: 2em; }
-.state-good { color: green; font-weight: bold; }
-.state-failed { color: red; font-weight: bold; }
-.state-unknown { color: #888; font-weight: bold; }
-.state-healthy { color: green; font-weight: bold; }
-.state-unhealthy { color: red; font-weight: bold; }
-pre { background: #f8f8f8; border: 1px solid #ddd; padding: 8px; overflow-x: auto; }
-</style></head><body>
-<h1>HashiCorp Doctor Diagnostics Report</h1>
-""")
-    print(f'DEBUG: HTML report requested at {html}')
-    def html_section(title, data):
-        html_lines.append(f"<div class='section'><h2>{title}</h2>")
-        if isinstance(data, dict):
-            for key, value in data.items():
-                state = get_section_state(key, value)
-                state_class = {
-                    'Good': 'state-good',
-                    'Healthy': 'state-healthy',
-                    'Failed': 'state-failed',
-                    'Unhealthy': 'state-unhealthy',
-                    'Unknown': 'state-unknown'
-                }.get(state, 'state-unknown')
-                html_lines.append(f"<div><span class='{state_class}'>{key.upper()} - {state}</span></div>")
-                html_lines.append(f"<pre>{json.dumps(value, indent=4, default=str)}</pre>")
-        elif isinstance(data, list):
-            html_lines.append(f"<pre>{json.dumps(data, indent=2, default=str)}</pre>")
+    from hashicorp_doctor.vault.diagnostics import run_vault_diagnostics
+    from hashicorp_doctor.consul_diag.diagnostics import run_consul_diagnostics
+    from hashicorp_doctor.nomad_diag.diagnostics import run_nomad_diagnostics
+    from hashicorp_doctor.executor import run_in_order, default_product_budget, default_run_budget
+    # The three products are independent: collect them concurrently, print in a stable order.
+    # Each collector gets the product budget; the run budget bounds the wait for all of them.
+    selection = dict(budget=default_product_budget(), probes=probes, skip_probes=skip_probes)
+    probe_timings = {'Vault': {}, 'Consul': {}, 'Nomad': {}}
+    collectors = [
+        ('Vault', lambda: run_vault_diagnostics(timings=probe_timings['Vault'], **selection)),
+        ('Consul', lambda: run_consul_diagnostics(raw=raw or None, timings=probe_timings['Consul'], **selection)),
+        ('Nomad', lambda: run_nomad_diagnostics(timings=probe_timings['Nomad'], **selection)),
+    ]
+    snapshot = Snapshot()
+    for title, diag, error, elapsed in run_in_order(collectors, deadline=budget or default_run_budget()):
+        click.secho(f'\n[{title} Diagnostics]', fg='yellow', bold=True)
+        if error is not None:
+            print(f'ERROR: {title} diagnostics failed: {error}')
+            diag = {'error': f"{title} diagnostics failed: {error}"}
         else:
-            html_lines.append(f"<pre>{str(data)}</pre>")
-        html_lines.append("</div>")
-    print('DEBUG: Running Vault diagnostics')
-    click.secho('\n[Vault Diagnostics]', fg='yellow', bold=True)
-    try:
-        vault_diag = run_vault_diagnostics()
-        print('DEBUG: Vault diagnostics complete')
-        print_section('Vault', vault_diag)
-        if html_writer: html_section('Vault', vault_diag)
-    except Exception as e:
-        print(f'ERROR: Vault diagnostics failed: {e}')
-    print('DEBUG: Running Consul diagnostics')
-    click.secho('\n[Consul Diagnostics]', fg='yellow', bold=True)
+            print_section(title, diag)
+        # A collector abandoned at the run deadline may still be filling its timings
+        snapshot.add(title, diag, elapsed, probe_timings=dict(probe_timings[title]))
+    print_timings(snapshot.timings.items())
+    save_run(snapshot, 'doctor')
+    # Every report format renders the same snapshot; nothing is collected twice.
+    render_timings = []
+    for fmt, path in [('html', html), ('txt', txt), ('json', json_path), ('pdf', pdf)]:
+        if path:
+            render_timings.append((fmt, write_report(snapshot, fmt, path, f'hcp_doctor_report.{fmt}')))
+    if show_timings:
+        print_probe_timings(snapshot, render_timings)
+
+# product -> the probes that carry its autopilot or raft membership payload
+RAFT_PROBES = {
+    'vault': {'autopilot'},
+    'consul': {'autopilot_state', 'autopilot_health'},
+    'nomad': {'autopilot_health', 'raft_configuration'},
+}
+RAFT_COLUMNS = [('name', 'SERVER'), ('role', 'ROLE'), ('healthy', 'HEALTHY'), ('last_index', 'INDEX'),
+                ('commit_lag', 'LAG'), ('last_contact', 'LAST CONTACT')]
+
+
+def print_raft_analysis(product, analysis):
+    tolerance = analysis['failure_tolerance']
+    click.secho(f"\n{product.capitalize()} raft (leader {analysis['leader'] or 'none'}, {analysis['voters']} voters, "
+                f"quorum {analysis['quorum']}, failure tolerance {tolerance})", fg='green', bold=True)
+    flagged = set(analysis['unhealthy']) | set(analysis['lagging']) | set(analysis['last_contact_outliers'])
+    table = [[header for _, header in RAFT_COLUMNS]]
+    for row in analysis['servers']:
+        cells = {key: '-' if row.get(key) is None else str(row[key]) for key, _ in RAFT_COLUMNS}
+        if 'last_contact' in row:
+            cells['last_contact'] = f"{row['last_contact'] * 1000:.1f}ms"
+        table.append([cells[key] for key, _ in RAFT_COLUMNS])
+    widths = [max(len(line[i]) for line in table) for i in range(len(RAFT_COLUMNS))]
+    for line, row in zip(table, [None] + analysis['servers']):
+        text = '  '.join(cell.ljust(width) for cell, width in zip(line, widths))
+        click.secho(text.rstrip(), fg='red' if row and row['name'] in flagged else None)
+    if analysis['even_voters']:
+        click.secho('  Even number of voters: one more server would raise failure tolerance', fg='yellow')
+
+
+def print_raft_trend(product, summary):
+    click.secho(f"\n{product.capitalize()} raft trend over {summary['samples']} samples", fg='green', bold=True)
+    if 'commit_rate' in summary:
+        click.echo(f"  commit rate {summary['commit_rate']}/s over {summary['window_seconds']}s, "
+                   f"{summary['leader_changes']} leader changes")
+    for name, server in sorted(summary.get('servers', {}).items()):
+        click.echo(f"  {name}: lag {server['commit_lag']} (max {server['max_commit_lag']}, mean {server['mean_commit_lag']})")
+    if summary.get('falling_behind'):
+        click.secho(f"  Falling behind: {', '.join(summary['falling_behind'])}", fg='red')
+
+
+@cli.command(help="Analyse raft replication from autopilot state: commit lag, last contact, voters and failure tolerance.")
+@click.option('--product', 'products', type=click.Choice(list(RAFT_PROBES)), multiple=True,
+              help='Product to analyse, repeatable (default: all three)')
+@click.option('--samples', type=click.IntRange(min=1), default=1, show_default=True, help='Number of samples to take')
+@click.option('--interval', type=float, default=5.0, show_default=True, help='Seconds between samples')
+def raft(products, samples, interval):
+    from hashicorp_doctor.raft import RaftTrend, raft_analytics
+    from hashicorp_doctor.vault.diagnostics import run_vault_diagnostics
+    from hashicorp_doctor.consul_diag.diagnostics import run_consul_diagnostics
+    from hashicorp_doctor.nomad_diag.diagnostics import run_nomad_diagnostics
+    collectors = {'vault': run_vault_diagnostics, 'consul': run_consul_diagnostics, 'nomad': run_nomad_diagnostics}
+    trends = {product: RaftTrend() for product in products or RAFT_PROBES}
     try:
-        consul_diag = run_consul_diagnostics()
-        print('DEBUG: Consul diagnostics complete')
-        print_section('Consul', consul_diag)
-        if html_writer: html_section('Consul', consul_diag)
-    except Exception as e:
-        print(f'ERROR: Consul diagnostics failed: {e}')
-    print('DEBUG: Running Nomad diagnostics')
-    click.secho('\n[Nomad Diagnostics]', fg='yellow', bold=True)
+        for sample in range(samples):
+            if sample:
+                time.sleep(interval)
+            for product, trend in trends.items():
+                try:
+                    result = collectors[product](probes=RAFT_PROBES[product])
+                    analysis = raft_analytics(product, result)
+                except Exception as e:
+                    print(f'ERROR: {product.capitalize()} raft analysis failed: {e}')
+                    continue
+                if analysis is None:
+                    click.echo(f"\n{product.capitalize()}: no autopilot state available")
+                    continue
+                trend.add(analysis)
+                print_raft_analysis(product, analysis)
+    except KeyboardInterrupt:
+        pass
+    if samples > 1:
+        for product, trend in trends.items():
+            if trend.samples:
+                print_raft_trend(product, trend.summary())
+
+@cli.command(name='probes', help="List the registered probes that --probes and --skip-probes can select.")
+def list_probes():
+    """List every registered probe."""
+    load_probes()
+    for product, probes in PROBES.items():
+        click.secho(f"\n{product}", fg='green', bold=True)
+        for probe in probes.values():
+            click.echo(f"  {probe.name:<36} {probe.path or '-':<52} {probe.description}")
+
+@cli.command(help="Diagnose every cluster listed in an inventory file and merge the results into one report.")
+@click.argument('inventory', type=click.Path(exists=True, dir_okay=False))
+@click.option('--max-workers', type=int, default=None, help='Clusters diagnosed at once (default: HCP_DOCTOR_FLEET_WORKERS or 4)')
+@click.option('--cluster-timeout', type=float, default=None, help='Seconds allowed per cluster (default: HCP_DOCTOR_CLUSTER_TIMEOUT or 120)')
+@click.option('--html', type=click.Path(), help='Generate HTML report at the given path')
+@click.option('--txt', type=click.Path(), help='Generate plain-text report at the given path')
+@click.option('--json', 'json_path', type=click.Path(), help='Generate JSON report at the given path')
+@click.option('--pdf', type=click.Path(), help='Generate PDF report at the given path')
+@timings_option
+@click.pass_context
+def fleet(ctx, inventory, max_workers, cluster_timeout, html, txt, json_path, pdf, show_timings):
+    """Run diagnostics for a fleet of clusters concurrently."""
+    from hashicorp_doctor.fleet import FLEET_SUMMARY_TITLE, load_inventory, run_fleet, section_title
     try:
-        nomad_diag = run_nomad_diagnostics()
-        print('DEBUG: Nomad diagnostics complete')
-        print_section('Nomad', nomad_diag)
-        if html_writer: html_section('Nomad', nomad_diag)
+        clusters = load_inventory(inventory)
     except Exception as e:
-        print(f'ERROR: Nomad diagnostics failed: {e}')
-    if html_writer:
-        print('DEBUG: Writing HTML report')
-        html_lines.append("</body></html>")
-        import os
-        html_path = html
-        if os.path.isdir(html):
-            html_path = os.path.join(html, 'hcp_doctor_report.html')
-        try:
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.writelines(html_lines)
-            click.secho(f"\nHTML report generated at: {html_path}", fg='green', bold=True)
-        except Exception as e:
-            click.secho(f"HTML report failed: {e}", fg='red', bold=True)
+        raise click.ClickException(f"Invalid inventory {inventory}: {e}")
+    click.secho(f'\n[Fleet Diagnostics] {len(clusters)} clusters', fg='yellow', bold=True)
+    snapshot = run_fleet(clusters, max_workers=max_workers, cluster_timeout=cluster_timeout)
+    click.secho(f"\n{'='*60}", fg='cyan')
+    click.secho(FLEET_SUMMARY_TITLE, fg='green', bold=True)
+    click.secho(f"{'='*60}", fg='cyan')
+    for name, products in snapshot.sections[FLEET_SUMMARY_TITLE].items():
+        healthy = all(state != 'Failed' for state in products.values())
+        click.secho(f"\n  {name}", fg='green' if healthy else 'red', bold=True)
+        for title, state in products.items():
+            click.echo(f"    {title:<8} {state}")
+    print_timings(snapshot.timings.items())
+    titles = dict(PRODUCTS)
+    save_run(snapshot, 'fleet', {section_title(cluster['name'], titles[product]): params['addr']
+                                 for cluster in clusters for product, params in cluster['products'].items()})
+    render_timings = []
+    for fmt, path in [('html', html), ('txt', txt), ('json', json_path), ('pdf', pdf)]:
+        if path:
+            render_timings.append((fmt, write_report(snapshot, fmt, path, f'hcp_doctor_fleet_report.{fmt}',
+                                                     'HashiCorp Doctor Fleet Report')))
+    if show_timings:
+        print_probe_timings(snapshot, render_timings)
+
+@cli.command(help="Show diagnostics runs recorded in the local run history.")
+@click.option('--limit', type=int, default=20, show_default=True, help='Number of runs to list or trend points to show')
+@click.option('--show', 'show_run', type=str, default=None, help="Print a stored run: a run id or 'latest'")
+@click.option('--trend', type=str, default=None, help='State history of a section or check, e.g. Vault or Vault.seal_status')
+@click.option('--html', type=click.Path(), help='With --show, write the stored run as an HTML report')
+@click.option('--json', 'json_path', type=click.Path(), help='With --show, write the stored run as a JSON report')
+def history(limit, show_run, trend, html, json_path):
+    """List, print or trend stored runs without querying any cluster."""
+    from hashicorp_doctor.store import store_enabled, SnapshotStore
+    if not store_enabled():
+        raise click.ClickException('Run history is disabled (HCP_DOCTOR_STORE=off)')
+    store = SnapshotStore()
+    if show_run:
+        run_id = None if show_run == 'latest' else int(show_run)
+        snapshot = store.load(run_id)
+        if snapshot is None:
+            raise click.ClickException(f"No stored run {show_run}")
+        for title, data in snapshot.sections.items():
+            print_section(title, data)
+        print_timings(snapshot.timings.items())
+        for fmt, path in [('html', html), ('json', json_path)]:
+            if path:
+                write_report(snapshot, fmt, path, f'hcp_doctor_run.{fmt}')
+        return
+    if trend:
+        section, _, key = trend.partition('.')
+        section = dict(PRODUCTS).get(section, section)
+        points = store.trend(section, key or None, limit=limit)
+        if not points:
+            raise click.ClickException(f"No stored results for {trend}")
+        checks = list(dict.fromkeys(check for point in points for check in point['states']))
+        click.secho(f"\n{section} trend ({len(points)} runs)", fg='green', bold=True)
+        for point in points:
+            stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(point['collected_at']))
+            cells = '  '.join(f"{check}={point['states'].get(check, '-')}" for check in checks)
+            click.echo(f"  #{point['run_id']:<6} {stamp}  {cells}")
+        return
+    runs = store.runs(limit=limit)
+    if not runs:
+        click.echo(f"No runs stored yet in {store.path}")
+        return
+    for run in runs:
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(run['collected_at']))
+        click.secho(f"\n  #{run['id']:<6} {stamp}  {run['source']}", fg='green', bold=True)
+        for title, section in run['sections'].items():
+            errors = f", {section['errors']} errors" if section['errors'] else ''
+            click.echo(f"    {title:<24} {section['ok']}/{section['total']} checks OK{errors}")
 
 @cli.command(help="Launch the web UI for visualized diagnostics and HTML report download.")
 @click.option('--host', default='127.0.0.1', help='Host for the web UI (default: 127.0.0.1)')
 @click.option('--port', default=5000, help='Port for the web UI (default: 5000)')
+@click.option('--refresh-interval', type=float, default=None, help='Seconds between background collections (default: HCP_DOCTOR_REFRESH_INTERVAL or 60, 0 disables)')
 @click.pass_context
-def web(ctx, host, port):
+def web(ctx, host, port, refresh_interval):
     """Launch the web UI for visualized diagnostics and HTML report download."""
-    from hashicorp_doctor.web import app
+    from hashicorp_doctor.web import app, start_scheduler, warm_cache
+    start_scheduler(refresh_interval)
+    seeded = warm_cache()
+    if seeded:
+        print(f"Serving stored results for {', '.join(seeded)} until the next collection")
     import webbrowser
     url = f"http://{host}:{port}/"
     print(f"Starting web UI at {url}")
@@ -0,0 +1,17 @@
+import os
+
+
+def env_number(name, default, cast=float):
+    """Read a positive number from the environment.
+
+    Returns ``default`` when the variable is unset, not a number or not
+    greater than zero.
+    """
+    raw = os.environ.get(name)
+    if raw in (None, ''):
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        return default
+    return value if value > 0 else default
@@ -0,0 +1,156 @@
+import asyncio
+import random
+from collections import Counter
+from urllib.parse import urlsplit
+
+from hashicorp_doctor.aio import RateLimiter, gather_probes
+from hashicorp_doctor.config import env_number
+from hashicorp_doctor.consul_diag.summaries import DEFAULT_TOP
+from hashicorp_doctor.executor import default_max_workers
+from hashicorp_doctor.probes import ProbeContext
+
+DEFAULT_AGENT_RATE = 50.0
+# Gauges reported per agent, matched by suffix so a custom metrics_prefix still works
+AGENT_GAUGES = {
+    'runtime.num_goroutines': 'goroutines',
+    'runtime.alloc_bytes': 'alloc_bytes',
+}
+
+
+def default_agent_rate():
+    """Agent API requests started per second by consul --deep (HCP_DOCTOR_AGENT_RATE, default 50)."""
+    return env_number('HCP_DOCTOR_AGENT_RATE', DEFAULT_AGENT_RATE, float)
+
+
+class AgentSample:
+    """
+    Picks the agents to fan out to while /v1/agent/members streams in: every
+    alive server, plus a uniform reservoir sample of at most sample_clients
+    alive clients, so memory does not grow with the size of the cluster.
+    """
+
+    def __init__(self, sample_clients=0, seed=None):
+        self.sample_clients = sample_clients
+        self.servers = []
+        self.clients = []
+        self.clients_seen = 0
+        self._random = random.Random(seed)
+
+    def add(self, member):
+        if member.get('Status') != 1 or not member.get('Addr'):
+            return
+        tags = member.get('Tags') or {}
+        agent = {'name': member.get('Name'), 'addr': member['Addr'], 'datacenter': tags.get('dc'),
+                 'role': 'server' if tags.get('role') == 'consul' else 'client'}
+        if agent['role'] == 'server':
+            self.servers.append(agent)
+            return
+        self.clients_seen += 1
+        if len(self.clients) < self.sample_clients:
+            self.clients.append(agent)
+        elif self.sample_clients:
+            slot = self._random.randrange(self.clients_seen)
+            if slot < self.sample_clients:
+                self.clients[slot] = agent
+
+    def agents(self):
+        return self.servers + self.clients
+
+
+def agent_url(base_url, addr):
+    """HTTP API address of an agent: its gossip address on the scheme and port CONSUL_HTTP_ADDR uses."""
+    base = urlsplit(base_url)
+    host = f"[{addr}]" if ':' in addr else addr
+    return f"{base.scheme}://{host}:{base.port or 8500}"
+
+
+def summarize_agent(agent, self_info, metrics, checks, top=3):
+    """One row of the per-agent table from the agent's self, metrics and checks responses."""
+    row = {'name': agent['name'], 'address': agent['addr'], 'role': agent['role'], 'datacenter': agent['datacenter']}
+    errors = {}
+    if isinstance(self_info, dict):
+        config = self_info.get('Config') or {}
+        stats = (self_info.get('Stats') or {}).get('consul') or {}
+        row['datacenter'] = config.get('Datacenter') or row['datacenter']
+        row['version'] = config.get('Version')
+        if row['role'] == 'server':
+            row['leader'] = stats.get('leader') == 'true'
+        if 'known_servers' in stats:
+            row['known_servers'] = int(stats['known_servers'])
+    elif isinstance(self_info, Exception):
+        errors['self'] = str(self_info)
+    if isinstance(metrics, dict):
+        for gauge in metrics.get('Gauges') or []:
+            for suffix, column in AGENT_GAUGES.items():
+                if gauge.get('Name', '').endswith(suffix):
+                    row[column] = gauge.get('Value')
+    elif isinstance(metrics, Exception):
+        errors['metrics'] = str(metrics)
+    if isinstance(checks, dict):
+        by_status = Counter(check.get('Status') or 'unknown' for check in checks.values())
+        row['checks'] = dict(by_status)
+        critical = sorted(check.get('Name') or check_id for check_id, check in checks.items() if check.get('Status') == 'critical')
+        if critical:
+            row['critical'] = critical[:top]
+    elif isinstance(checks, Exception):
+        errors['checks'] = str(checks)
+    if errors:
+        row['errors'] = errors
+    return {key: value for key, value in row.items() if value is not None}
+
+
+async def probe_agent(ctx, agent, limiter):
+    """Read /v1/agent/self, /v1/agent/metrics and /v1/agent/checks from one agent and return its table row."""
+    node = ProbeContext(ctx.http, agent_url(ctx.base_url, agent['addr']), ctx.headers, ctx.verify)
+
+    async def read(path):
+        await limiter.wait()
+        return await node.get(path)
+
+    # The three responses are reduced to one row before the next agent is started
+    parts = await asyncio.gather(read('/v1/agent/self'), read('/v1/agent/metrics'), read('/v1/agent/checks'),
+                                 return_exceptions=True)
+    return summarize_agent(agent, *parts)
+
+
+def summarize_agents(rows, sample, top=DEFAULT_TOP):
+    unreachable = [row['name'] for row in rows if 'errors' in row and len(row['errors']) == 3]
+    return {
+        'total': len(rows),
+        'servers': len(sample.servers),
+        'clients_sampled': len(sample.clients),
+        'clients_total': sample.clients_seen,
+        'leaders': [row['name'] for row in rows if row.get('leader')],
+        'unreachable': unreachable[:top],
+        'unreachable_count': len(unreachable),
+        'with_critical_checks': [row['name'] for row in rows if row.get('critical')][:top],
+        'versions': dict(Counter(row['version'] for row in rows if 'version' in row)),
+        'agents': rows,
+    }
+
+
+async def survey_agents(ctx, sample, limit=None, rate=None, timeout=None, budget=None):
+    """
+    Fan out to the agents of sample, an AgentSample already filled from the
+    members list: every alive server and the sampled alive clients. At most
+    limit agents are queried at once and at most rate requests start per
+    second; an agent that does not answer within timeout seconds, or is
+    still queued when budget seconds have passed, is reported as unreachable.
+    Returns:
+        dict: Counts, leaders, unreachable agents, agents with critical
+        checks, versions and the per-agent table under 'agents' (servers
+        first, then clients, each by name).
+    """
+    agents = sorted(sample.agents(), key=lambda agent: (agent['role'] != 'server', agent['name'] or ''))
+    limiter = RateLimiter(default_agent_rate() if rate is None else rate)
+    collected = await gather_probes([(index, (lambda agent=agent: probe_agent(ctx, agent, limiter)))
+                                     for index, agent in enumerate(agents)],
+                                    timeout=timeout, limit=limit or default_max_workers(), budget=budget)
+    rows = []
+    for index, agent in enumerate(agents):
+        row = collected[index]
+        if isinstance(row, Exception):
+            # Timed out or cancelled before any response was reduced
+            row = summarize_agent(agent, row, row, row)
+        rows.append(row)
+    return summarize_agents(rows, sample)
@@ -1,173 +1,195 @@
+import asyncio
 import os
-import consul
-
-
-def run_consul_diagnostics():
-    import warnings
-    from urllib3.exceptions import InsecureRequestWarning
-    import requests
-    result = {}  # Always initialize at the top
-    # Setup Consul connection and variables
-    skip_verify = os.environ.get('CONSUL_HTTP_SSL_VERIFY', 'true').lower()
-    if skip_verify in ['0', 'false', 'no']:
-        warnings.simplefilter('ignore', InsecureRequestWarning)
-        verify = False
-    else:
-        verify = True
-    consul_addr = os.environ.get('CONSUL_HTTP_ADDR', 'http://127.0.0.1:8500')
-    scheme = 'http'
-    addr = consul_addr
-    if consul_addr.startswith('http://'):
-        scheme = 'http'
-        addr = consul_addr[len('http://'):]
-    elif consul_addr.startswith('https://'):
-        scheme = 'https'
-        addr = consul_addr[len('https://'):]
-    addr = addr.rstrip('/')
-    if ':' in addr:
-        host, port = addr.split(':', 1)
-        port = int(port)
-    else:
-        host = addr
-        port = 8500
-    os.environ['CONSUL_HTTP_ADDR'] = f"{host}:{port}"
-    verify = True
-    skip_verify = os.environ.get('CONSUL_HTTP_SSL_VERIFY', 'true').lower()
-    if skip_verify in ['0', 'false', 'no']:
-        verify = False
-    # Pass verify param to python-consul only if using HTTPS, else ignore
-    if scheme == 'https':
-        c = consul.Consul(host=host, port=port, scheme=scheme, verify=verify)
-    else:
-        c = consul.Consul(host=host, port=port, scheme=scheme)
-
-    # Cluster state (members)
-    try:
-        members = c.agent.members()
-        if members:
-            result['members'] = members
-    except Exception as e:
-        result['members'] = f"Error: {e}"
-    # Raft peers
-    try:
-        peers = c.status.peers()
-        if peers:
-            result['raft_peers'] = peers
-    except Exception as e:
-        result['raft_peers'] = f"Error: {e}"
-    # Leader
-    try:
-        leader = c.status.leader()
-        if leader:
-            result['leader'] = leader
-    except Exception as e:
-        result['leader'] = f"Error: {e}"
-    # Catalog nodes (pretty-print if tuple)
-    try:
-        nodes = c.catalog.nodes()
-        if isinstance(nodes, tuple) and len(nodes) == 2 and isinstance(nodes[1], list):
-            result['catalog_nodes'] = nodes[1]
-        else:
-            result['catalog_nodes'] = nodes
-    except Exception as e:
-        result['catalog_nodes'] = f"Error: {e}"
-    # Autopilot Configuration
-    try:
-        autopilot_url = f"http://{host}:{port}/v1/operator/autopilot/configuration"
-        if scheme == 'https':
-            autopilot_url = f"https://{host}:{port}/v1/operator/autopilot/configuration"
-        headers = {}
-        consul_token = os.environ.get('CONSUL_HTTP_TOKEN')
-        if consul_token:
-            headers['X-Consul-Token'] = consul_token
-        resp = requests.get(autopilot_url, headers=headers, verify=verify)
-        if resp.ok:
-            result['autopilot_configuration'] = resp.json()
-        else:
-            result['autopilot_configuration'] = f"Error: {resp.status_code} {resp.text}"
-    except Exception as e:
-        result['autopilot_configuration'] = f"Error: {e}"
-    # Autopilot Health
-    try:
-        autopilot_health_url = f"http://{host}:{port}/v1/operator/autopilot/health"
-        if scheme == 'https':
-            autopilot_health_url = f"https://{host}:{port}/v1/operator/autopilot/health"
-        headers = {}
-        consul_token = os.environ.get('CONSUL_HTTP_TOKEN')
-        if consul_token:
-            headers['X-Consul-Token'] = consul_token
-        resp = requests.get(autopilot_health_url, headers=headers, verify=verify)
-        if resp.ok:
-            result['autopilot_health'] = resp.json()
-        else:
-            result['autopilot_health'] = f"Error: {resp.status_code} {resp.text}"
-    except Exception as e:
-        result['autopilot_health'] = f"Error: {e}"
-    # Autopilot State
-    autopilot_state_url = f"http://{host}:{port}/v1/operator/autopilot/state"
-    if scheme == 'https':
-        autopilot_state_url = f"https://{host}:{port}/v1/operator/autopilot/state"
-    headers = {}
-    consul_token = os.environ.get('CONSUL_HTTP_TOKEN')
-    if consul_token:
-        headers['X-Consul-Token'] = consul_token
-    try:
-        resp = requests.get(autopilot_state_url, headers=headers, verify=verify)
-        if resp.ok:
-            result['autopilot_state'] = resp.json()
-        else:
-            result['autopilot_state'] = f"Error: {resp.status_code} {resp.text}"
-    except Exception as e:
-        result['autopilot_state'] = f"Error: {e}"
-    # Datacenters List
-    try:
-        datacenters_url = f"http://{host}:{port}/v1/catalog/datacenters"
-        if scheme == 'https':
-            datacenters_url = f"https://{host}:{port}/v1/catalog/datacenters"
-        headers = {}
-        consul_token = os.environ.get('CONSUL_HTTP_TOKEN')
-        if consul_token:
-            headers['X-Consul-Token'] = consul_token
-        resp = requests.get(datacenters_url, headers=headers, verify=verify)
-        if resp.ok:
-            result['datacenters_list'] = resp.json()
-        else:
-            result['datacenters_list'] = f"Error: {resp.status_code} {resp.text}"
-    except Exception as e:
-        result['datacenters_list'] = f"Error: {e}"
-    # License Report
+import time
+
+from hashicorp_doctor.aio import AsyncHTTP, run_sync
+from hashicorp_doctor.consul_diag.agents import AgentSample, survey_agents
+from hashicorp_doctor.executor import default_product_budget
+from hashicorp_doctor.consul_diag.summaries import CatalogNodeSummary, MemberSummary
+from hashicorp_doctor.probes import Probe, ProbeContext, parse_addr, register_probe, run_probe_set
+from hashicorp_doctor.raft import raft_analytics
+from hashicorp_doctor.timing import ProbeTiming, timed_probe
+from hashicorp_doctor.utils import non_empty_list, register_state_rule
+
+
+def raw_payloads_requested():
+    """Whether full member/catalog payloads should be kept (HCP_DOCTOR_RAW_PAYLOADS)."""
+    return os.environ.get('HCP_DOCTOR_RAW_PAYLOADS', 'false').lower() in ['1', 'true', 'yes']
+
+
+# Cluster state (members): streamed and summarised unless raw payloads are requested
+async def _read_members(ctx, sample=None):
+    if ctx.options.get('raw'):
+        members = await ctx.get('/v1/agent/members')
+        if sample is not None and isinstance(members, list):
+            for member in members:
+                sample.add(member)
+        return members
+    summary = MemberSummary()
+    async for member in ctx.stream('/v1/agent/members'):
+        summary.add(member)
+        if sample is not None:
+            sample.add(member)
+    return summary.result()
+
+
+async def _members(ctx):
+    if ctx.options.get('members') is not None:
+        # Read once for the --deep survey too; shielded so a probe timeout leaves the survey's read running
+        return await asyncio.shield(ctx.options['members'])
+    return await _read_members(ctx)
+
+
+# Catalog nodes: streamed and summarised unless raw payloads are requested
+async def _catalog_nodes(ctx):
+    if ctx.options.get('raw'):
+        return await ctx.get('/v1/catalog/nodes')
+    summary = CatalogNodeSummary()
+    async for node in ctx.stream('/v1/catalog/nodes'):
+        summary.add(node)
+    return summary.result()
+
+
+@register_state_rule('members', product='consul')
+def _members_state(value):
+    if isinstance(value, dict) and 'by_status' in value:
+        # Streamed summary: any failed member fails the section
+        if value.get('total') and not value['by_status'].get('failed'):
+            return 'Good'
+        return 'Failed'
+    return non_empty_list(value)
+
+
+@register_state_rule('catalog_nodes', product='consul')
+def _catalog_nodes_state(value):
+    if isinstance(value, list):
+        return 'Good' if value else 'Failed'
+    if isinstance(value, dict) and 'total' in value:
+        return 'Good' if value['total'] else 'Failed'
+    return None
+
+
+# Kept current by consul --watch (consul_diag.watch)
+@register_state_rule('health_checks', product='consul')
+def _health_checks_state(value):
+    if not isinstance(value, dict) or 'by_status' not in value:
+        return None
+    if value['by_status'].get('critical'):
+        return 'Failed'
+    return 'Good' if value.get('total') else 'Unknown'
+
+
+@register_state_rule('agents', product='consul')
+def _agents_state(value):
+    if not isinstance(value, dict) or 'agents' not in value:
+        return None
+    if value.get('unreachable_count') or value.get('with_critical_checks') or not value.get('servers'):
+        return 'Failed'
+    return 'Good'
+
+
+for _probe in [
+    Probe('consul', 'members', '/v1/agent/members', fetch=_members, description='Serf LAN members by status, datacenter and segment'),
+    Probe('consul', 'raft_peers', '/v1/status/peers', description='Raft peer addresses'),
+    Probe('consul', 'leader', '/v1/status/leader', description='Current Raft leader'),
+    Probe('consul', 'catalog_nodes', '/v1/catalog/nodes', fetch=_catalog_nodes, description='Catalog nodes by datacenter and segment'),
+    Probe('consul', 'autopilot_configuration', '/v1/operator/autopilot/configuration', description='Autopilot settings'),
+    Probe('consul', 'autopilot_health', '/v1/operator/autopilot/health', description='Autopilot server health'),
+    Probe('consul', 'autopilot_state', '/v1/operator/autopilot/state', description='Autopilot state (Enterprise)'),
+    Probe('consul', 'datacenters_list', '/v1/catalog/datacenters', classify=non_empty_list,
+          description='Known datacenters'),
+    Probe('consul', 'license_report', '/v1/operator/license', description='License (Enterprise)'),
+    Probe('consul', 'operator_usage', '/v1/operator/usage', description='Service and node usage counts'),
+]:
+    register_probe(_probe)
+
+
+def consul_context(http, addr=None, token=None, verify=None, raw=None):
+    """ProbeContext for one Consul cluster; parameters default to CONSUL_HTTP_ADDR, CONSUL_HTTP_TOKEN and CONSUL_HTTP_SSL_VERIFY."""
+    if raw is None:
+        raw = raw_payloads_requested()
+    if verify is None:
+        verify = os.environ.get('CONSUL_HTTP_SSL_VERIFY', 'true').lower() not in ['0', 'false', 'no']
+    if token is None:
+        token = os.environ.get('CONSUL_HTTP_TOKEN')
+    base_url = parse_addr(addr or os.environ.get('CONSUL_HTTP_ADDR', 'http://127.0.0.1:8500'), 8500)
+    return ProbeContext(http, base_url, {'X-Consul-Token': token} if token else {}, verify, raw=raw)
+
+
+async def _survey(ctx, members, sample, budget, timings):
+    timing = ProbeTiming()
+
+    async def survey():
+        start = time.monotonic()
+        await asyncio.wait_for(asyncio.shield(members), budget)
+        return await survey_agents(ctx, sample, budget=max(budget - (time.monotonic() - start), 0))
+
     try:
-        license_url = f"http://{host}:{port}/v1/operator/license"
-        if scheme == 'https':
-            license_url = f"https://{host}:{port}/v1/operator/license"
-        headers = {}
-        consul_token = os.environ.get('CONSUL_HTTP_TOKEN')
-        if consul_token:
-            headers['X-Consul-Token'] = consul_token
-        resp = requests.get(license_url, headers=headers, verify=verify)
-        if resp.ok:
-            result['license_report'] = resp.json()
-        else:
-            result['license_report'] = f"Error: {resp.status_code} {resp.text}"
+        return await timed_probe(timing, survey)
+    except asyncio.TimeoutError:
+        return f"Error: members list not read within the budget of {budget:g}s"
     except Exception as e:
-        result['license_report'] = f"Error: {e}"
+        return f"Error: {e}"
+    finally:
+        if timings is not None:
+            timings['agents'] = timing.to_dict()
+
 
-    # Operator Usage
+async def run_consul_diagnostics_async(addr=None, token=None, verify=None, raw=None, http=None, probe_timeout=None, budget=None,
+                                       probes=None, skip_probes=None, timings=None, deep=False, sample_clients=0):
+    """
+    Run the registered Consul probes on the running event loop, all endpoints
+    concurrently. Members and catalog nodes are summarised while they stream
+    in; pass raw=True (or set HCP_DOCTOR_RAW_PAYLOADS) to keep the full lists.
+    Connection parameters default to CONSUL_HTTP_ADDR, CONSUL_HTTP_TOKEN and
+    CONSUL_HTTP_SSL_VERIFY; the environment is only read, never modified, so
+    several clusters can be diagnosed concurrently.
+    Args:
+        http (AsyncHTTP): Shared client; one is created (and closed) when omitted.
+        probe_timeout (float): Deadline for each endpoint (HCP_DOCTOR_PROBE_TIMEOUT).
+        budget (float): Deadline for the whole product (HCP_DOCTOR_PRODUCT_BUDGET);
+            endpoints still pending are cancelled and reported as timed out.
+        probes, skip_probes: Probe names to run or leave out (see select_probes()).
+        timings (dict): Filled with result key -> per-probe timing (see ProbeTiming).
+        deep (bool): Also query every server and sample_clients clients from
+            the members list directly (see survey_agents()), reported under
+            'agents'. The survey runs alongside the probes within the same budget.
+        sample_clients (int): Alive clients sampled for the deep survey.
+    """
+    owned = http is None
+    http = http or AsyncHTTP()
+    ctx = consul_context(http, addr, token, verify, raw)
+    budget = budget or default_product_budget()
     try:
-        usage_url = f"http://{host}:{port}/v1/operator/usage"
-        if scheme == 'https':
-            usage_url = f"https://{host}:{port}/v1/operator/usage"
-        headers = {}
-        consul_token = os.environ.get('CONSUL_HTTP_TOKEN')
-        if consul_token:
-            headers['X-Consul-Token'] = consul_token
-        resp = requests.get(usage_url, headers=headers, verify=verify)
-        if resp.ok:
-            result['operator_usage'] = resp.json()
+        if deep:
+            # The members probe and the survey share one read of the members list
+            sample = AgentSample(sample_clients)
+            members = ctx.options['members'] = asyncio.ensure_future(_read_members(ctx, sample))
+            try:
+                result, agents = await asyncio.gather(
+                    run_probe_set('consul', ctx, probes, skip_probes, timeout=probe_timeout, budget=budget, timings=timings),
+                    _survey(ctx, members, sample, budget, timings))
+            finally:
+                members.cancel()
+                await asyncio.gather(members, return_exceptions=True)
+            result['agents'] = agents
         else:
-            result['operator_usage'] = f"Error: {resp.status_code} {resp.text}"
-    except Exception as e:
-        result['operator_usage'] = f"Error: {e}"
+            result = await run_probe_set('consul', ctx, probes, skip_probes, timeout=probe_timeout, budget=budget,
+                                         timings=timings)
+    finally:
+        if owned:
+            await http.close()
     # Remove empty or error fields if they are just empty strings
     cleaned = {k: v for k, v in result.items() if v not in [None, '', {}, []]}
+    analytics = raft_analytics('consul', cleaned)
+    if analytics is not None:
+        cleaned['raft_analytics'] = analytics
     return cleaned
+
+
+def run_consul_diagnostics(addr=None, token=None, verify=None, raw=None, probe_timeout=None, budget=None,
+                           probes=None, skip_probes=None, timings=None, deep=False, sample_clients=0):
+    """Blocking wrapper around run_consul_diagnostics_async()."""
+    return run_sync(run_consul_diagnostics_async(addr, token, verify, raw, probe_timeout=probe_timeout, budget=budget,
+                                                 probes=probes, skip_probes=skip_probes, timings=timings,
+                                                 deep=deep, sample_clients=sample_clients))
@@ -0,0 +1,153 @@
+import heapq
+from collections import Counter
+
+from hashicorp_doctor.streaming import BoundedCounter
+
+DEFAULT_TOP = 10
+
+# Serf member status codes returned by /v1/agent/members
+MEMBER_STATUS = {0: 'none', 1: 'alive', 2: 'leaving', 3: 'left', 4: 'failed'}
+# Higher is worse; decides which offenders are kept
+_SEVERITY = {'failed': 4, 'leaving': 3, 'left': 2, 'none': 1}
+
+
+class MemberSummary:
+    """
+    Aggregates /v1/agent/members entries one at a time by status, datacenter,
+    network segment and role, keeping only the top most severe non-alive members.
+    """
+
+    def __init__(self, top=DEFAULT_TOP):
+        self.top = top
+        self.total = 0
+        self.by_status = Counter()
+        self.by_datacenter = BoundedCounter(top * 10)
+        self.by_segment = BoundedCounter(top * 10)
+        self.by_role = Counter()
+        self._offenders = []
+
+    def add(self, member):
+        seq = self.total
+        self.total += 1
+        tags = member.get('Tags') or {}
+        status = MEMBER_STATUS.get(member.get('Status'), str(member.get('Status')))
+        self.by_status[status] += 1
+        self.by_datacenter.add(tags.get('dc') or 'unknown')
+        self.by_segment.add(tags.get('segment') or '<default>')
+        self.by_role[tags.get('role') or 'unknown'] += 1
+        if status != 'alive':
+            entry = (_SEVERITY.get(status, 0), -seq, {
+                'Name': member.get('Name'),
+                'Addr': member.get('Addr'),
+                'Status': status,
+                'Datacenter': tags.get('dc'),
+                'Role': tags.get('role'),
+            })
+            if len(self._offenders) < self.top:
+                heapq.heappush(self._offenders, entry)
+            else:
+                heapq.heappushpop(self._offenders, entry)
+
+    def result(self):
+        return {
+            'total': self.total,
+            'by_status': dict(self.by_status),
+            'by_datacenter': dict(self.by_datacenter.most_common(self.top)),
+            'by_segment': dict(self.by_segment.most_common(self.top)),
+            'by_role': dict(self.by_role),
+            'offenders': [entry for _, _, entry in sorted(self._offenders, reverse=True)],
+        }
+
+
+class CatalogNodeSummary:
+    """Aggregates /v1/catalog/nodes entries one at a time by datacenter and network segment, keeping a small sample."""
+
+    def __init__(self, top=DEFAULT_TOP):
+        self.top = top
+        self.total = 0
+        self.by_datacenter = BoundedCounter(top * 10)
+        self.by_segment = BoundedCounter(top * 10)
+        self.sample = []
+
+    def add(self, node):
+        self.total += 1
+        meta = node.get('Meta') or {}
+        self.by_datacenter.add(node.get('Datacenter') or 'unknown')
+        self.by_segment.add(meta.get('consul-network-segment') or '<default>')
+        if len(self.sample) < self.top:
+            self.sample.append({'Node': node.get('Node'), 'Address': node.get('Address'), 'Datacenter': node.get('Datacenter')})
+
+    def result(self):
+        return {
+            'total': self.total,
+            'by_datacenter': dict(self.by_datacenter.most_common(self.top)),
+            'by_segment': dict(self.by_segment.most_common(self.top)),
+            'sample': self.sample,
+        }
+
+
+# Health check status, worst first
+_CHECK_SEVERITY = {'critical': 3, 'warning': 2, 'maintenance': 1}
+
+
+class HealthCheckSummary:
+    """Aggregates /v1/health/state/any checks by status, keeping the top most severe non-passing checks."""
+
+    def __init__(self, top=DEFAULT_TOP):
+        self.top = top
+        self.total = 0
+        self.by_status = Counter()
+        self.nodes_critical = set()
+        self._offenders = []
+
+    def add(self, check):
+        seq = self.total
+        self.total += 1
+        status = check.get('Status') or 'unknown'
+        self.by_status[status] += 1
+        if status == 'critical':
+            self.nodes_critical.add(check.get('Node'))
+        if status != 'passing':
+            entry = (_CHECK_SEVERITY.get(status, 0), -seq, {
+                'Node': check.get('Node'),
+                'CheckID': check.get('CheckID'),
+                'Name': check.get('Name'),
+                'Status': status,
+                'ServiceName': check.get('ServiceName') or None,
+            })
+            if len(self._offenders) < self.top:
+                heapq.heappush(self._offenders, entry)
+            else:
+                heapq.heappushpop(self._offenders, entry)
+
+    def result(self):
+        return {
+            'total': self.total,
+            'by_status': dict(self.by_status),
+            'nodes_critical': len(self.nodes_critical),
+            'offenders': [entry for _, _, entry in sorted(self._offenders, reverse=True)],
+        }
+
+
+def summarize_members(members, top=DEFAULT_TOP):
+    """Summarise an iterable of /v1/agent/members entries (see MemberSummary)."""
+    summary = MemberSummary(top)
+    for member in members:
+        summary.add(member)
+    return summary.result()
+
+
+def summarize_catalog_nodes(nodes, top=DEFAULT_TOP):
+    """Summarise an iterable of /v1/catalog/nodes entries (see CatalogNodeSummary)."""
+    summary = CatalogNodeSummary(top)
+    for node in nodes:
+        summary.add(node)
+    return summary.result()
+
+
+def summarize_health_checks(checks, top=DEFAULT_TOP):
+    """Summarise an iterable of /v1/health/state/any checks (see HealthCheckSummary)."""
+    summary = HealthCheckSummary(top)
+    for check in checks:
+        summary.add(check)
+    return summary.result()
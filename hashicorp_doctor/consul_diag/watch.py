@@ -0,0 +1,166 @@
+import asyncio
+import time
+
+from hashicorp_doctor.aio import AsyncHTTP, run_sync
+from hashicorp_doctor.config import env_number
+from hashicorp_doctor.consul_diag.diagnostics import consul_context
+from hashicorp_doctor.consul_diag.summaries import summarize_catalog_nodes, summarize_health_checks
+from hashicorp_doctor.utils import get_section_state
+
+DEFAULT_WATCH_WAIT = 60.0
+DEFAULT_POLL_INTERVAL = 1.0
+MAX_RETRY_DELAY = 30.0
+# Consul adds up to wait/16 of jitter to a blocking query; allow that plus network slack
+WAIT_SLACK = 5.0
+
+
+def default_watch_wait():
+    """Longest a blocking query is held open by Consul (HCP_DOCTOR_WATCH_WAIT, default 60, at most 600)."""
+    return min(env_number('HCP_DOCTOR_WATCH_WAIT', DEFAULT_WATCH_WAIT, float), 600.0)
+
+
+def default_poll_interval():
+    """Seconds between reads of endpoints without blocking support (HCP_DOCTOR_WATCH_POLL_INTERVAL, default 1)."""
+    return env_number('HCP_DOCTOR_WATCH_POLL_INTERVAL', DEFAULT_POLL_INTERVAL, float)
+
+
+def _catalog_nodes(ctx, body):
+    return body if ctx.options.get('raw') else summarize_catalog_nodes(body or [])
+
+
+def _health(ctx, body):
+    if not isinstance(body, list):
+        raise ValueError(f"unexpected health check payload: {type(body).__name__}")
+    return summarize_health_checks(body)
+
+
+# (result key, path, blocking, parser): catalog and health endpoints support
+# blocking queries; status and operator endpoints do not and are polled
+WATCHES = [
+    ('catalog_nodes', '/v1/catalog/nodes', True, _catalog_nodes),
+    ('health_checks', '/v1/health/state/any', True, _health),
+    ('leader', '/v1/status/leader', False, None),
+    ('autopilot_health', '/v1/operator/autopilot/health', False, None),
+]
+
+
+class ConsulWatch:
+    """
+    Keeps Consul health results current with one long-poll connection per
+    endpoint. Catalog nodes and health checks use blocking queries
+    (?index=&wait= following X-Consul-Index), so a change is seen as soon as
+    Consul commits it; leader and autopilot health, which Consul cannot
+    block on, are re-read every poll_interval. Only keys whose value changed
+    are re-classified, and on_change(key, value, state, previous_state) is
+    called for each of them.
+    """
+
+    def __init__(self, addr=None, token=None, verify=None, raw=None, wait=None, poll_interval=None, on_change=None,
+                 http=None, keys=None):
+        self.addr = addr
+        self.token = token
+        self.verify = verify
+        self.raw = raw
+        self.wait = wait or default_watch_wait()
+        self.poll_interval = poll_interval or default_poll_interval()
+        self.on_change = on_change
+        self.http = http
+        self.watches = [watch for watch in WATCHES if keys is None or watch[0] in keys]
+        self.results = {}
+        self.states = {}
+        self.indexes = {}
+        self.requests = {key: 0 for key, _, _, _ in self.watches}
+        self.changed_at = {}
+        self._stop = None
+
+    def update(self, key, value):
+        """Store a new value for key; returns True (and notifies) only when it differs from the last one."""
+        if key in self.results and self.results[key] == value:
+            return False
+        previous = self.states.get(key)
+        self.results[key] = value
+        self.states[key] = get_section_state(key, value, 'consul')
+        self.changed_at[key] = time.time()
+        if self.on_change is not None:
+            self.on_change(key, value, self.states[key], previous)
+        return True
+
+    async def _blocking(self, ctx, key, path, parse):
+        index = 0
+        failures = 0
+        while True:
+            params = {'index': index, 'wait': f"{self.wait:g}s"} if index else None
+            self.requests[key] += 1
+            try:
+                body, headers = await ctx.get_with_headers(path, params=params, timeout=self.wait * 17 / 16 + WAIT_SLACK)
+                try:
+                    new_index = int(headers.get('X-Consul-Index') or 0)
+                except ValueError:
+                    new_index = 0
+                # An unchanged index is a wait that timed out; without one, update() compares content
+                if new_index != index or not new_index:
+                    self.update(key, parse(ctx, body))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                index = 0
+                self.update(key, f"Error: {e}")
+                await asyncio.sleep(min(self.poll_interval * 2 ** failures, MAX_RETRY_DELAY))
+                continue
+            failures = 0
+            # An index that went backwards (e.g. after a snapshot restore) restarts with a full read
+            index = new_index if new_index > 0 and new_index >= index else 0
+            self.indexes[key] = index
+            if not index:
+                # Without an index the next read would return at once; never spin
+                await asyncio.sleep(self.poll_interval)
+
+    async def _poll(self, ctx, key, path, parse):
+        failures = 0
+        while True:
+            self.requests[key] += 1
+            try:
+                body = await ctx.get(path)
+                self.update(key, parse(ctx, body) if parse else body)
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                self.update(key, f"Error: {e}")
+            await asyncio.sleep(min(self.poll_interval * 2 ** max(failures - 1, 0), MAX_RETRY_DELAY))
+
+    def stop(self):
+        """Ask a running watch to finish; call from the event loop running it."""
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self, duration=None):
+        """
+        Watch until stop() is called or duration seconds have passed.
+        Returns:
+            dict: The latest result per key.
+        """
+        owned = self.http is None
+        http = self.http or AsyncHTTP()
+        ctx = consul_context(http, self.addr, self.token, self.verify, self.raw)
+        self._stop = asyncio.Event()
+        tasks = [asyncio.ensure_future((self._blocking if blocking else self._poll)(ctx, key, path, parse))
+                 for key, path, blocking, parse in self.watches]
+        stopper = asyncio.ensure_future(self._stop.wait())
+        try:
+            await asyncio.wait(tasks + [stopper], timeout=duration, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks + [stopper]:
+                task.cancel()
+            await asyncio.gather(*tasks, stopper, return_exceptions=True)
+            if owned:
+                await http.close()
+        return dict(self.results)
+
+
+def watch_consul(addr=None, token=None, verify=None, raw=None, wait=None, poll_interval=None, on_change=None, duration=None):
+    """Blocking wrapper: watch a Consul cluster for duration seconds (forever when None) and return the latest results."""
+    watch = ConsulWatch(addr, token, verify, raw, wait, poll_interval, on_change)
+    return run_sync(watch.run(duration))
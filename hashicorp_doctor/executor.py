@@ -0,0 +1,141 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout, as_completed
+
+from hashicorp_doctor.config import env_number
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PROBE_TIMEOUT = 30.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 15.0
+DEFAULT_PRODUCT_BUDGET = 60.0
+DEFAULT_RUN_BUDGET = 90.0
+DEFAULT_POOL_SIZE = 10
+
+
+def default_max_workers():
+    """Concurrency limit for probe fan-out (HCP_DOCTOR_MAX_WORKERS, default 8)."""
+    return env_number('HCP_DOCTOR_MAX_WORKERS', DEFAULT_MAX_WORKERS, int)
+
+
+def default_probe_timeout():
+    """Per-probe deadline in seconds (HCP_DOCTOR_PROBE_TIMEOUT, default 30)."""
+    return env_number('HCP_DOCTOR_PROBE_TIMEOUT', DEFAULT_PROBE_TIMEOUT, float)
+
+
+def default_connect_timeout():
+    """Seconds allowed to open a connection (HCP_DOCTOR_CONNECT_TIMEOUT, default 5)."""
+    return env_number('HCP_DOCTOR_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT, float)
+
+
+def default_read_timeout():
+    """Seconds allowed between bytes of a response (HCP_DOCTOR_READ_TIMEOUT, default 15)."""
+    return env_number('HCP_DOCTOR_READ_TIMEOUT', DEFAULT_READ_TIMEOUT, float)
+
+
+def default_pool_size():
+    """Keep-alive connections kept per cluster (HCP_DOCTOR_POOL_SIZE, default 10)."""
+    return env_number('HCP_DOCTOR_POOL_SIZE', DEFAULT_POOL_SIZE, int)
+
+
+def default_product_budget():
+    """Seconds one product's diagnostics may take in total (HCP_DOCTOR_PRODUCT_BUDGET, default 60)."""
+    return env_number('HCP_DOCTOR_PRODUCT_BUDGET', DEFAULT_PRODUCT_BUDGET, float)
+
+
+def default_run_budget():
+    """Seconds a whole doctor run may take (HCP_DOCTOR_RUN_BUDGET, default 90)."""
+    return env_number('HCP_DOCTOR_RUN_BUDGET', DEFAULT_RUN_BUDGET, float)
+
+
+class ProbeTimeout(Exception):
+    """Raised in place of a probe result when the probe missed its deadline."""
+
+
+def _timed_call(func):
+    start = time.monotonic()
+    try:
+        return func(), None, time.monotonic() - start
+    except Exception as e:
+        return None, e, time.monotonic() - start
+
+
+def _start(funcs, max_workers, name):
+    """
+    Run callables on at most max_workers daemon threads and return a Future
+    for each. Unlike ThreadPoolExecutor workers, these threads are not joined
+    at interpreter exit, so a task abandoned at a deadline never holds the
+    process open; cancelling a future skips it if it has not started yet.
+    """
+    work = queue.Queue()
+    futures = []
+    for func in funcs:
+        future = Future()
+        futures.append(future)
+        work.put((future, func))
+
+    def worker():
+        while True:
+            try:
+                future, func = work.get_nowait()
+            except queue.Empty:
+                return
+            if future.set_running_or_notify_cancel():
+                future.set_result(_timed_call(func))
+
+    for i in range(min(max_workers or len(futures), len(futures))):
+        threading.Thread(target=worker, name=f"{name}-{i}", daemon=True).start()
+    return futures
+
+
+def run_in_order(tasks, max_workers=None, deadline=None):
+    """
+    Run independent (name, callable) tasks concurrently and yield their
+    outcomes in the order the tasks were given, each as soon as it and every
+    task before it has finished.
+    Args:
+        deadline (float): Seconds, counted from the start, after which tasks
+            still running are abandoned and reported with a ProbeTimeout.
+            They run on daemon threads, so they do not delay process exit.
+    Yields:
+        tuple: (name, result, error, elapsed_seconds). error is the raised
+        exception or None.
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return
+    start = time.monotonic()
+    futures = list(zip([name for name, _ in tasks], _start([func for _, func in tasks], max_workers, 'hcp-product')))
+    try:
+        for name, future in futures:
+            try:
+                remaining = None if deadline is None else max(start + deadline - time.monotonic(), 0)
+                result, error, elapsed = future.result(timeout=remaining)
+            except FutureTimeout:
+                result, error = None, ProbeTimeout(f"timed out (run budget of {deadline:g}s exhausted)")
+                elapsed = time.monotonic() - start
+            yield name, result, error, elapsed
+    finally:
+        for _, future in futures:
+            future.cancel()
+
+
+def run_as_completed(tasks, max_workers=None):
+    """
+    Run independent (name, callable) tasks concurrently and yield each outcome
+    the moment it finishes, regardless of task order.
+    Yields:
+        tuple: (name, result, error, elapsed_seconds), as for run_in_order().
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return
+    futures = dict(zip(_start([func for _, func in tasks], max_workers, 'hcp-product'), [name for name, _ in tasks]))
+    try:
+        for future in as_completed(futures):
+            result, error, elapsed = future.result()
+            yield futures[future], result, error, elapsed
+    finally:
+        for future in futures:
+            future.cancel()
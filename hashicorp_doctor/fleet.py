@@ -0,0 +1,220 @@
+import asyncio
+import json
+import os
+import time
+
+from hashicorp_doctor.config import env_number
+from hashicorp_doctor.executor import ProbeTimeout
+from hashicorp_doctor.snapshot import PRODUCTS, Snapshot
+
+DEFAULT_FLEET_WORKERS = 4
+DEFAULT_CLUSTER_TIMEOUT = 120.0
+FLEET_SUMMARY_TITLE = 'Fleet Summary'
+# Seconds a collector may overrun its budget before its whole product is cancelled
+BUDGET_GRACE = 0.5
+
+
+def default_fleet_workers():
+    """Clusters diagnosed at once in fleet mode (HCP_DOCTOR_FLEET_WORKERS, default 4)."""
+    return env_number('HCP_DOCTOR_FLEET_WORKERS', DEFAULT_FLEET_WORKERS, int)
+
+
+def default_cluster_timeout():
+    """Seconds allowed for one cluster in fleet mode (HCP_DOCTOR_CLUSTER_TIMEOUT, default 120)."""
+    return env_number('HCP_DOCTOR_CLUSTER_TIMEOUT', DEFAULT_CLUSTER_TIMEOUT, float)
+
+
+def _product_params(name, product, entry):
+    """Turn one product block of the inventory into explicit collector keyword arguments."""
+    if isinstance(entry, str):
+        entry = {'addr': entry}
+    if not isinstance(entry, dict) or not entry.get('addr'):
+        raise ValueError(f"Cluster '{name}': {product} needs an 'addr'")
+    params = {'addr': entry['addr']}
+    if entry.get('token_env'):
+        params['token'] = os.environ.get(entry['token_env'], '')
+    else:
+        # An empty token keeps collectors from falling back to this process's own env token
+        params['token'] = entry.get('token') or ''
+    if 'skip_verify' in entry:
+        params['verify'] = not entry['skip_verify']
+    return params
+
+
+def parse_inventory(data):
+    """
+    Validate an inventory document and return its clusters as
+    [{'name': ..., 'products': {product: collector kwargs}}].
+    """
+    clusters = data.get('clusters') if isinstance(data, dict) else data
+    if not isinstance(clusters, list) or not clusters:
+        raise ValueError("Inventory must contain a non-empty 'clusters' list")
+    parsed = []
+    seen = set()
+    for index, cluster in enumerate(clusters):
+        if not isinstance(cluster, dict):
+            raise ValueError(f"Inventory cluster #{index + 1} must be a mapping")
+        name = str(cluster.get('name') or f"cluster-{index + 1}")
+        if name in seen:
+            raise ValueError(f"Duplicate cluster name in inventory: {name}")
+        seen.add(name)
+        products = {product: _product_params(name, product, cluster[product])
+                    for product, _ in PRODUCTS if cluster.get(product)}
+        if not products:
+            raise ValueError(f"Cluster '{name}' does not define vault, consul or nomad")
+        parsed.append({'name': name, 'products': products})
+    return parsed
+
+
+def load_inventory(path):
+    """
+    Read a fleet inventory file (JSON, or YAML when PyYAML is installed):
+
+        clusters:
+          - name: prod-us-east
+            vault: {addr: https://vault.us-east:8200, token_env: VAULT_TOKEN_US_EAST}
+            consul: {addr: https://consul.us-east:8501, token_env: CONSUL_TOKEN_US_EAST, skip_verify: true}
+            nomad: https://nomad.us-east:4646
+
+    token_env names an environment variable holding the token, so the file
+    itself needs no secrets; token gives it inline.
+    """
+    with open(path) as f:
+        text = f.read()
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("PyYAML is required for YAML inventories; install pyyaml or use JSON")
+        data = yaml.safe_load(text)
+    else:
+        data = json.loads(text)
+    return parse_inventory(data)
+
+
+def section_title(cluster, title):
+    return f"{cluster} / {title}"
+
+
+def _summarize_cluster(snapshot, cluster):
+    summary = {}
+    for product, title in PRODUCTS:
+        if product not in cluster['products']:
+            continue
+        section = section_title(cluster['name'], title)
+        data = snapshot.sections.get(section)
+        if not isinstance(data, dict) or 'error' in data:
+            summary[title] = 'Failed'
+            continue
+        states = snapshot.states(section)
+        errors = sum(1 for value in data.values() if isinstance(value, str) and value.startswith('Error'))
+        if errors == len(data):
+            summary[title] = 'Failed'
+            continue
+        ok = sum(1 for state in states.values() if state in ['Good', 'Healthy'])
+        summary[title] = f"{ok}/{len(states)} checks OK, {errors} errors" if errors else f"{ok}/{len(states)} checks OK"
+    return summary
+
+
+def default_async_collectors():
+    from hashicorp_doctor.vault.diagnostics import run_vault_diagnostics_async
+    from hashicorp_doctor.consul_diag.diagnostics import run_consul_diagnostics_async
+    from hashicorp_doctor.nomad_diag.diagnostics import run_nomad_diagnostics_async
+    return {
+        'vault': run_vault_diagnostics_async,
+        'consul': run_consul_diagnostics_async,
+        'nomad': run_nomad_diagnostics_async,
+    }
+
+
+async def _timed(coro):
+    start = time.monotonic()
+    try:
+        return await coro, None, time.monotonic() - start
+    except Exception as e:
+        return None, e, time.monotonic() - start
+
+
+async def _collect_cluster(cluster, collectors, http, semaphore, cluster_timeout):
+    """
+    Collect every product of one cluster concurrently once a slot is free.
+    Returns product -> (data, error, elapsed, probe timings); products still
+    running at the deadline are cancelled and reported as ProbeTimeout.
+    """
+    async with semaphore:
+        # Collectors stop at the budget themselves and keep what they gathered;
+        # the grace period only catches collectors that overrun it
+        timings = {product: {} for product in cluster['products']}
+        tasks = {product: asyncio.ensure_future(_timed(collectors[product](http=http, budget=cluster_timeout,
+                                                                           timings=timings[product], **params)))
+                 for product, params in cluster['products'].items()}
+        done, pending = await asyncio.wait(tasks.values(), timeout=cluster_timeout + BUDGET_GRACE)
+        for task in pending:
+            task.cancel()
+        outcomes = {}
+        for product, task in tasks.items():
+            if task in done:
+                outcomes[product] = task.result() + (timings[product],)
+            else:
+                outcomes[product] = (None, ProbeTimeout(f"timed out after {cluster_timeout:g}s"), cluster_timeout,
+                                     timings[product])
+        return outcomes
+
+
+async def run_fleet_async(clusters, max_workers=None, cluster_timeout=None, collectors=None, http=None):
+    """
+    Diagnose every cluster of an inventory on the running event loop and merge
+    the results into one snapshot.
+    Args:
+        clusters (list): Clusters as returned by load_inventory().
+        max_workers (int): Clusters diagnosed at once; the products of a
+            cluster are collected concurrently inside its slot.
+        cluster_timeout (float): Seconds one cluster may take, counted from
+            when its slot starts. Products still running are reported as timed out.
+        collectors (dict): product -> async collector accepting
+            addr/token/verify/http/budget/timings; defaults to the live diagnostics.
+        http (AsyncHTTP): Client shared by every cluster; one is created
+            (and closed) when omitted.
+    Returns:
+        Snapshot: A 'Fleet Summary' section followed by one
+        '<cluster> / <Product>' section per collected product.
+    """
+    from hashicorp_doctor.aio import AsyncHTTP
+    collectors = collectors or default_async_collectors()
+    max_workers = max_workers or default_fleet_workers()
+    cluster_timeout = cluster_timeout or default_cluster_timeout()
+    titles = dict(PRODUCTS)
+    owned = http is None
+    http = http or AsyncHTTP()
+    semaphore = asyncio.Semaphore(max_workers)
+    try:
+        outcomes = await asyncio.gather(*[_collect_cluster(cluster, collectors, http, semaphore, cluster_timeout)
+                                          for cluster in clusters])
+    finally:
+        if owned:
+            await http.close()
+
+    snapshot = Snapshot()
+    summary = {}
+    # Reserve the first section; it is filled in once every cluster is merged
+    snapshot.add(FLEET_SUMMARY_TITLE, summary)
+    for cluster, products in zip(clusters, outcomes):
+        for product, _ in PRODUCTS:
+            if product not in products:
+                continue
+            title = titles[product]
+            data, error, elapsed, timings = products[product]
+            if isinstance(error, ProbeTimeout):
+                data = {'error': f"{title} diagnostics {error}"}
+            elif error is not None:
+                data = {'error': f"{title} diagnostics failed: {error}"}
+            snapshot.add(section_title(cluster['name'], title), data, elapsed, product, timings)
+        summary[cluster['name']] = _summarize_cluster(snapshot, cluster)
+    snapshot.add(FLEET_SUMMARY_TITLE, summary)
+    return snapshot
+
+
+def run_fleet(clusters, max_workers=None, cluster_timeout=None, collectors=None):
+    """Blocking wrapper around run_fleet_async(); every cluster shares one event loop and connection pool."""
+    from hashicorp_doctor.aio import run_sync
+    return run_sync(run_fleet_async(clusters, max_workers, cluster_timeout, collectors))
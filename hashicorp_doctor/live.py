@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+from collections import deque
+
+DEFAULT_HISTORY = 512
+KEEPALIVE_INTERVAL = 15.0
+
+
+def _sse(event, seq, payload):
+    return f"id: {seq}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class LiveHub:
+    """
+    Fans per-section changes out to every connected dashboard. Collections
+    publish whole results; the hub diffs them against what it last saw and
+    keeps one pre-serialised Server-Sent Event per changed section, so each
+    change is classified and encoded once however many listeners there are,
+    and listeners never trigger a collection themselves.
+    """
+
+    def __init__(self, history=DEFAULT_HISTORY):
+        self._changed = threading.Condition()
+        self._seq = 0
+        self._events = deque(maxlen=history)   # (seq, product, SSE text)
+        self._current = {}                     # (product, key) -> (seq, state, payload)
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def publish(self, product, data, states):
+        """
+        Record a product's latest result. Only sections whose state or value
+        changed become events; sections that disappeared are sent as removed.
+        Returns:
+            int: Number of sections that changed.
+        """
+        if not isinstance(data, dict):
+            data, states = {'error': data}, {'error': 'Failed'}
+        changed = 0
+        with self._changed:
+            for key, value in data.items():
+                payload = json.dumps({'product': product, 'key': key, 'state': states.get(key, 'Unknown'), 'value': value},
+                                     default=str)
+                current = self._current.get((product, key))
+                if current is not None and current[2] == payload:
+                    continue
+                self._append(product, key, states.get(key, 'Unknown'), payload)
+                changed += 1
+            for gone in [k for p, k in self._current if p == product and k not in data]:
+                del self._current[(product, gone)]
+                self._seq += 1
+                self._events.append((self._seq, product, _sse('removed', self._seq, json.dumps({'product': product, 'key': gone}))))
+                changed += 1
+            if changed:
+                self._changed.notify_all()
+        return changed
+
+    def publish_section(self, product, key, value, state):
+        """Record one changed section, e.g. from a streaming source."""
+        payload = json.dumps({'product': product, 'key': key, 'state': state, 'value': value}, default=str)
+        with self._changed:
+            current = self._current.get((product, key))
+            if current is not None and current[2] == payload:
+                return 0
+            self._append(product, key, state, payload)
+            self._changed.notify_all()
+        return 1
+
+    def _append(self, product, key, state, payload):
+        self._seq += 1
+        self._current[(product, key)] = (self._seq, state, payload)
+        self._events.append((self._seq, product, _sse('section', self._seq, payload)))
+
+    def snapshot(self, products=None):
+        """(seq, SSE text) with every current section of the given products, sent to a new listener."""
+        with self._changed:
+            sections = [payload for (product, _), (_, _, payload) in self._current.items()
+                        if products is None or product in products]
+            return self._seq, _sse('snapshot', self._seq, '[' + ','.join(sections) + ']')
+
+    def since(self, seq, products=None, timeout=None):
+        """
+        Wait up to timeout seconds for events after seq.
+        Returns:
+            (int, list): The new seq and the SSE texts to send, or (seq, None)
+            when seq fell out of the history and the listener needs a snapshot.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self._seq > seq, timeout)
+            if self._seq <= seq:
+                return seq, []
+            if not self._events or self._events[0][0] > seq + 1:
+                return seq, None
+            return self._seq, [text for event_seq, product, text in self._events
+                               if event_seq > seq and (products is None or product in products)]
+
+    def listen(self, products=None, last_seq=None, keepalive=KEEPALIVE_INTERVAL, stop=None):
+        """
+        Yield the SSE stream of one listener: a snapshot (unless resuming from
+        last_seq, still in the history), then each change as it is published,
+        with a comment line every keepalive seconds so proxies keep it open.
+        """
+        seq = last_seq
+        if seq is None or seq > self._seq:
+            seq, text = self.snapshot(products)
+            yield text
+        quiet_since = time.monotonic()
+        while stop is None or not stop():
+            remaining = keepalive - (time.monotonic() - quiet_since)
+            seq, texts = self.since(seq, products, max(remaining, 0))
+            if texts is None:
+                seq, text = self.snapshot(products)
+                yield text
+            elif texts:
+                yield ''.join(texts)
+            elif remaining > 0:
+                # Only other products changed
+                continue
+            else:
+                yield ': keepalive\n\n'
+            quiet_since = time.monotonic()
@@ -0,0 +1,103 @@
+from hashicorp_doctor.renderers import TIMING_PHASES
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'hcp_doctor'
+HEALTHY_STATES = ('Good', 'Healthy')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _family(name, kind, help_text, samples):
+    """Lines of one metric family in Prometheus text format; samples are (labels, value) pairs."""
+    if not samples:
+        return []
+    lines = [f"# HELP {PREFIX}_{name} {help_text}", f"# TYPE {PREFIX}_{name} {kind}"]
+    for labels, value in samples:
+        label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        lines.append(f"{PREFIX}_{name}{{{label_text}}} {_number(value)}" if label_text else f"{PREFIX}_{name} {_number(value)}")
+    return lines
+
+
+def _is_error(value):
+    return isinstance(value, str) and value.startswith('Error')
+
+
+def snapshot_metrics(snapshot, collected_at=None):
+    """
+    Metric lines for the results in a snapshot: check states, errors, probe
+    latencies and sizes, collection durations and raft analytics.
+    Args:
+        collected_at (dict): Section title -> epoch time its result was collected.
+    """
+    states, healthy, errors, phases, sizes, durations, stamps = [], [], [], [], [], [], []
+    tolerance, voters, lags, contacts = [], [], [], []
+    for title, data in snapshot.sections.items():
+        product = snapshot.products.get(title) or title.lower()
+        if isinstance(data, dict):
+            for check, state in snapshot.states(title).items():
+                labels = {'product': product, 'check': check}
+                states.append((dict(labels, state=state), 1))
+                healthy.append((labels, 1 if state in HEALTHY_STATES else 0))
+            count = sum(1 for value in data.values() if _is_error(value)) + (1 if 'error' in data else 0)
+        else:
+            count = 1
+        errors.append(({'product': product}, count))
+        for probe, timing in snapshot.probe_timings.get(title, {}).items():
+            for phase in TIMING_PHASES:
+                phases.append(({'product': product, 'probe': probe, 'phase': phase}, timing.get(phase, 0)))
+            sizes.append(({'product': product, 'probe': probe}, timing.get('bytes', 0)))
+        if title in snapshot.timings:
+            durations.append(({'product': product}, snapshot.timings[title]))
+        if collected_at and title in collected_at:
+            stamps.append(({'product': product}, collected_at[title]))
+        raft = data.get('raft_analytics') if isinstance(data, dict) else None
+        if isinstance(raft, dict):
+            tolerance.append(({'product': product}, raft['failure_tolerance']))
+            voters.append(({'product': product}, raft['voters']))
+            for row in raft['servers']:
+                if 'commit_lag' in row:
+                    lags.append(({'product': product, 'server': row['name']}, row['commit_lag']))
+                if 'last_contact' in row:
+                    contacts.append(({'product': product, 'server': row['name']}, row['last_contact']))
+    return (
+        _family('check_state', 'gauge', 'Current state of a diagnostics check (1 for the reported state).', states)
+        + _family('check_healthy', 'gauge', 'Whether a diagnostics check is Good or Healthy.', healthy)
+        + _family('check_errors', 'gauge', 'Checks of a product that returned an error in the latest collection.', errors)
+        + _family('probe_duration_seconds', 'gauge', 'Time a probe spent in each phase in the latest collection.', phases)
+        + _family('probe_response_bytes', 'gauge', 'Response bytes read by a probe in the latest collection.', sizes)
+        + _family('collection_duration_seconds', 'gauge', 'Wall time of the latest collection of a product.', durations)
+        + _family('last_collection_timestamp_seconds', 'gauge', 'Epoch time of the latest collection of a product.', stamps)
+        + _family('raft_failure_tolerance', 'gauge', 'Voters a product\'s raft cluster can lose and keep quorum.', tolerance)
+        + _family('raft_voters', 'gauge', 'Voting servers in a product\'s raft cluster.', voters)
+        + _family('raft_commit_lag', 'gauge', 'Raft log entries a server trails the leader by.', lags)
+        + _family('raft_last_contact_seconds', 'gauge', 'Time since a follower last heard from the leader.', contacts)
+    )
+
+
+def cache_metrics(stats, scheduler_status=None):
+    """Metric lines for ResultCache.stats() and, when running, CollectionScheduler.status()."""
+    lookups = stats['hits'] + stats['misses']
+    lines = (
+        _family('cache_hits_total', 'counter', 'Result cache lookups served from cache.', [({}, stats['hits'])])
+        + _family('cache_misses_total', 'counter', 'Result cache lookups that triggered a collection.', [({}, stats['misses'])])
+        + _family('cache_hit_ratio', 'gauge', 'Share of result cache lookups served from cache.',
+                  [({}, stats['hits'] / lookups if lookups else 0)])
+        + _family('cache_entries', 'gauge', 'Results held in the result cache.', [({}, stats['entries'])])
+    )
+    if scheduler_status:
+        runs = [({'product': product}, status['runs']) for product, status in scheduler_status.items()]
+        failures = [({'product': product}, status['failures']) for product, status in scheduler_status.items()]
+        lines += (_family('collection_runs_total', 'counter', 'Background collections run per product.', runs)
+                  + _family('collection_consecutive_failures', 'gauge',
+                            'Background collections of a product that failed in a row.', failures))
+    return lines
+
+
+def render_metrics(lines):
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,93 @@
+from collections import Counter
+
+from hashicorp_doctor.streaming import BoundedCounter, iter_json_array
+
+DEFAULT_PER_PAGE = 500
+DEFAULT_TOP = 10
+
+
+class NomadAPIError(Exception):
+    """Non-200 response from the Nomad HTTP API."""
+
+    def __init__(self, status_code, text=''):
+        super().__init__(f"{status_code} {text}".strip())
+        self.status_code = status_code
+
+
+def iter_allocations(session, address, headers=None, per_page=DEFAULT_PER_PAGE, timeout=5):
+    """
+    Yield allocation stubs from /v1/allocations one page at a time, following
+    X-Nomad-NextToken. Each page is streamed and parsed incrementally, and task
+    states and resources are not requested, so memory stays bounded no matter
+    how many allocations the region holds.
+    """
+    params = {'per_page': per_page, 'task_states': 'false', 'resources': 'false'}
+    while True:
+        resp = session.get(f"{address.rstrip('/')}/v1/allocations", params=params, headers=headers or {},
+                           timeout=timeout, stream=True)
+        try:
+            if resp.status_code != 200:
+                raise NomadAPIError(resp.status_code, resp.text[:200])
+            yield from iter_json_array(resp.iter_content(chunk_size=64 * 1024))
+            next_token = resp.headers.get('X-Nomad-NextToken')
+        finally:
+            resp.close()
+        if not next_token:
+            return
+        params['next_token'] = next_token
+
+
+async def iter_pages(ctx, path, params=None, per_page=DEFAULT_PER_PAGE, indexes=None):
+    """
+    Async counterpart of iter_allocations() for any paginated Nomad list:
+    yield the items of path a page at a time, following X-Nomad-NextToken,
+    so at most per_page items are held in memory. The X-Nomad-Index of each
+    page is appended to indexes when it is given.
+    """
+    params = dict(params or {}, per_page=per_page)
+    while True:
+        page, headers = await ctx.get_with_headers(path, params=params)
+        if indexes is not None:
+            indexes.append(int(headers.get('X-Nomad-Index') or 0))
+        for item in page or []:
+            yield item
+        next_token = headers.get('X-Nomad-NextToken')
+        if not next_token:
+            return
+        params['next_token'] = next_token
+
+
+def summarize_allocations(allocations, top=DEFAULT_TOP):
+    """
+    Aggregate allocation stubs into a compact summary: counts by ClientStatus
+    and namespace, plus the jobs and nodes with the most non-running
+    allocations. Memory depends on top, not on the number of allocations.
+    """
+    by_status = Counter()
+    by_namespace = BoundedCounter(top * 10)
+    jobs = BoundedCounter(top * 10)
+    nodes = BoundedCounter(top * 10)
+    total = 0
+    for alloc in allocations:
+        total += 1
+        status = alloc.get('ClientStatus') or 'unknown'
+        by_status[status] += 1
+        namespace = alloc.get('Namespace') or 'default'
+        by_namespace.add(namespace)
+        if status != 'running':
+            jobs.add(f"{namespace}/{alloc.get('JobID')}")
+            nodes.add(alloc.get('NodeName') or alloc.get('NodeID') or 'unknown')
+    return {
+        'total': total,
+        'running': by_status.get('running', 0),
+        'not_running': total - by_status.get('running', 0),
+        'by_client_status': dict(by_status),
+        'by_namespace': dict(by_namespace.most_common(top)),
+        'top_jobs_not_running': dict(jobs.most_common(top)),
+        'top_nodes_not_running': dict(nodes.most_common(top)),
+    }
+
+
+def scan_allocations(session, address, headers=None, per_page=DEFAULT_PER_PAGE, top=DEFAULT_TOP, timeout=5):
+    """Page through every allocation and return the summarize_allocations() summary."""
+    return summarize_allocations(iter_allocations(session, address, headers, per_page, timeout), top=top)
@@ -1,119 +1,105 @@
-
 import os
-import nomad
 
-def run_nomad_diagnostics():
-    # Suppress urllib3 InsecureRequestWarning if skip verify is set
-    import warnings
-    from urllib3.exceptions import InsecureRequestWarning
-    import requests
-    result = {}  # Always initialize at the top
+from hashicorp_doctor.aio import AsyncHTTP, run_sync
+from hashicorp_doctor.executor import default_product_budget
+from hashicorp_doctor.probes import Probe, ProbeContext, parse_addr, register_probe, run_probe_set
+from hashicorp_doctor.raft import raft_analytics
+from hashicorp_doctor.utils import non_empty_list, register_state_rule
+
+
+def _raft_servers(value):
+    servers = value.get('Servers') if isinstance(value, dict) else None
+    if not servers:
+        return 'Failed'
+    return 'Good' if any(server.get('Leader') for server in servers if isinstance(server, dict)) else 'Failed'
+
+
+# Live summaries kept by the event stream (nomad_diag.events)
+@register_state_rule('allocations', product='nomad')
+@register_state_rule('deployments', product='nomad')
+def _failed_summary_state(value):
+    if not isinstance(value, dict) or 'by_status' not in value:
+        return None
+    if value.get('failed'):
+        return 'Failed'
+    return 'Good' if value.get('total') else 'Unknown'
+
+
+@register_state_rule('nodes', product='nomad')
+def _nodes_state(value):
+    if not isinstance(value, dict) or 'by_status' not in value:
+        return None
+    if value['by_status'].get('down'):
+        return 'Failed'
+    return 'Good' if value.get('total') else 'Failed'
+
+
+@register_state_rule('jobs', product='nomad')
+def _jobs_state(value):
+    if not isinstance(value, dict) or 'by_status' not in value:
+        return None
+    return 'Good' if value.get('total') else 'Unknown'
+
+
+for _probe in [
+    Probe('nomad', 'autopilot_configuration', '/v1/operator/autopilot/configuration', description='Autopilot settings'),
+    Probe('nomad', 'autopilot_health', '/v1/operator/autopilot/health', description='Autopilot server health'),
+    Probe('nomad', 'raft_configuration', '/v1/operator/raft/configuration', classify=_raft_servers,
+          description='Raft servers and current leader'),
+    Probe('nomad', 'license_info', '/v1/operator/license', description='License (Enterprise)'),
+    Probe('nomad', 'leader', '/v1/status/leader', description='Current Raft leader'),
+    Probe('nomad', 'list_peers', '/v1/status/peers', classify=non_empty_list, description='Raft peer addresses'),
+    Probe('nomad', 'scheduler', '/v1/operator/scheduler/configuration', description='Scheduler configuration'),
+]:
+    register_probe(_probe)
+
+
+def nomad_context(http, addr=None, token=None, verify=None):
+    """ProbeContext for one Nomad cluster; parameters default to NOMAD_ADDR, NOMAD_TOKEN and NOMAD_SKIP_VERIFY."""
     skip_verify = os.environ.get('NOMAD_SKIP_VERIFY', 'true').lower()
-    if skip_verify in ['0', 'false', 'no']:
-        warnings.simplefilter('ignore', InsecureRequestWarning)
-    nomad_addr = os.environ.get('NOMAD_ADDR', 'http://127.0.0.1:4646')
-    addr = nomad_addr
-    scheme = 'http'
-    if addr.startswith('http://'):
-        scheme = 'http'
-        addr = addr[len('http://'):]
-    elif addr.startswith('https://'):
-        scheme = 'https'
-        addr = addr[len('https://'):]
-    addr = addr.rstrip('/')
-    if ':' in addr:
-        host, port = addr.split(':', 1)
-        port = int(port)
-    else:
-        host = addr
-        port = 4646
-    os.environ['NOMAD_ADDR'] = f"{host}:{port}"
-    verify = not (skip_verify in ['0', 'false', 'no'])
-    n = nomad.Nomad(host=host, port=port, verify=verify)
+    if verify is None:
+        verify = not (skip_verify in ['0', 'false', 'no'])
+    if token is None:
+        token = os.environ.get('NOMAD_TOKEN')
+    base_url = parse_addr(addr or os.environ.get('NOMAD_ADDR', 'http://127.0.0.1:4646'), 4646)
+    return ProbeContext(http, base_url, {'X-Nomad-Token': token} if token else {}, verify)
+
+
+async def run_nomad_diagnostics_async(addr=None, token=None, verify=None, http=None, probe_timeout=None, budget=None,
+                                      probes=None, skip_probes=None, timings=None):
+    """
+    Run the registered Nomad probes on the running event loop, all endpoints
+    concurrently. Connection parameters default to NOMAD_ADDR, NOMAD_TOKEN and
+    NOMAD_SKIP_VERIFY; the environment is never modified.
+    Args:
+        http (AsyncHTTP): Shared client; one is created (and closed) when omitted.
+        probe_timeout (float): Deadline for each endpoint (HCP_DOCTOR_PROBE_TIMEOUT).
+        budget (float): Deadline for the whole product (HCP_DOCTOR_PRODUCT_BUDGET);
+            endpoints still pending are cancelled and reported as timed out.
+        probes, skip_probes: Probe names to run or leave out (see select_probes()).
+        timings (dict): Filled with result key -> per-probe timing (see ProbeTiming).
+    """
+    owned = http is None
+    http = http or AsyncHTTP()
+    ctx = nomad_context(http, addr, token, verify)
+    result = {}  # Always initialize at the top
     try:
-        import json
-        # Autopilot Configuration
-        try:
-            autopilot_url = f"{scheme}://{host}:{port}/v1/operator/autopilot/configuration"
-            resp = requests.get(autopilot_url, verify=verify)
-            if resp.ok:
-                result['autopilot_configuration'] = resp.json()
-            else:
-                result['autopilot_configuration'] = f"Error: {resp.status_code} {resp.text}"
-        except Exception as e:
-            result['autopilot_configuration'] = f"Error: {e}"
-
-        # Autopilot Health
-        try:
-            autopilot_health_url = f"{scheme}://{host}:{port}/v1/operator/autopilot/health"
-            resp = requests.get(autopilot_health_url, verify=verify)
-            if resp.ok:
-                result['autopilot_health'] = resp.json()
-            else:
-                result['autopilot_health'] = f"Error: {resp.status_code} {resp.text}"
-        except Exception as e:
-            result['autopilot_health'] = f"Error: {e}"
-
-        # Raft Configuration
-        try:
-            raft_url = f"{scheme}://{host}:{port}/v1/operator/raft/configuration"
-            resp = requests.get(raft_url, verify=verify)
-            if resp.ok:
-                result['raft_configuration'] = resp.json()
-            else:
-                result['raft_configuration'] = f"Error: {resp.status_code} {resp.text}"
-        except Exception as e:
-            result['raft_configuration'] = f"Error: {e}"
-
-        # License Info
-        try:
-            license_url = f"{scheme}://{host}:{port}/v1/operator/license"
-            resp = requests.get(license_url, verify=verify)
-            if resp.ok:
-                result['license_info'] = resp.json()
-            else:
-                result['license_info'] = f"Error: {resp.status_code} {resp.text}"
-        except Exception as e:
-            result['license_info'] = f"Error: {e}"
-
-        # Leader (update to use /v1/status/leader)
-        try:
-            leader_url = f"{scheme}://{host}:{port}/v1/status/leader"
-            resp = requests.get(leader_url, verify=verify)
-            if resp.ok:
-                result['leader'] = resp.json() if resp.headers.get('content-type','').startswith('application/json') else resp.text.strip()
-            else:
-                result['leader'] = f"Error: {resp.status_code} {resp.text}"
-        except Exception as e:
-            result['leader'] = f"Error: {e}"
-
-        # List Peers
-        try:
-            peers_url = f"{scheme}://{host}:{port}/v1/status/peers"
-            resp = requests.get(peers_url, verify=verify)
-            if resp.ok:
-                result['list_peers'] = resp.json()
-            else:
-                result['list_peers'] = f"Error: {resp.status_code} {resp.text}"
-        except Exception as e:
-            result['list_peers'] = f"Error: {e}"
-
-        # Scheduler configuration (new logic)
-        try:
-            scheduler_url = f"{scheme}://{host}:{port}/v1/operator/scheduler/configuration"
-            resp = requests.get(scheduler_url, verify=verify)
-            if resp.ok:
-                result['scheduler'] = resp.json()
-            else:
-                result['scheduler'] = f"Error: {resp.status_code} {resp.text}"
-        except Exception as e:
-            result['scheduler'] = f"Error: {e}"
-
-    # ...existing code...
-
-    # ...existing code...
+        result = await run_probe_set('nomad', ctx, probes, skip_probes, timeout=probe_timeout,
+                                     budget=budget or default_product_budget(), timings=timings)
     except Exception as e:
         result['error'] = f"Nomad connection or authentication failed: {e}"
+    finally:
+        if owned:
+            await http.close()
     # Remove empty or error fields if they are just empty strings
     cleaned = {k: v for k, v in result.items() if v not in [None, '', {}, []]}
+    analytics = raft_analytics('nomad', cleaned)
+    if analytics is not None:
+        cleaned['raft_analytics'] = analytics
     return cleaned
+
+
+def run_nomad_diagnostics(addr=None, token=None, verify=None, probe_timeout=None, budget=None, probes=None, skip_probes=None, timings=None):
+    """Blocking wrapper around run_nomad_diagnostics_async()."""
+    return run_sync(run_nomad_diagnostics_async(addr, token, verify, probe_timeout=probe_timeout, budget=budget,
+                                                probes=probes, skip_probes=skip_probes, timings=timings))
@@ -0,0 +1,329 @@
+import asyncio
+import time
+from collections import Counter
+
+from hashicorp_doctor.aio import AsyncHTTP, run_sync
+from hashicorp_doctor.config import env_number
+from hashicorp_doctor.nomad_diag.allocations import iter_pages
+from hashicorp_doctor.nomad_diag.diagnostics import nomad_context
+from hashicorp_doctor.utils import get_section_state
+
+DEFAULT_TOP = 10
+DEFAULT_RESYNC_INTERVAL = 3600.0
+MAX_RETRY_DELAY = 30.0
+TOPICS = ['Allocation', 'Node', 'Deployment', 'Job']
+
+
+def default_resync_interval():
+    """Seconds between full re-reads of the lists behind a live view (HCP_DOCTOR_EVENTS_RESYNC, default 3600)."""
+    return env_number('HCP_DOCTOR_EVENTS_RESYNC', DEFAULT_RESYNC_INTERVAL, float)
+
+
+def _job_key(namespace, job_id):
+    return f"{namespace or 'default'}/{job_id}"
+
+
+def _decrement(counter, key):
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
+
+
+class NomadClusterView:
+    """
+    In-memory index of a Nomad region kept current from the event stream.
+    Every object is reduced to the few fields the health summary needs, and
+    each event adjusts the counters by removing the object's old contribution
+    and adding its new one, so an event costs O(1) however large the cluster.
+    """
+
+    def __init__(self, top=DEFAULT_TOP):
+        self.top = top
+        self.index = 0
+        self.events = 0
+        self.allocations = {}   # ID -> (job key, node, ClientStatus)
+        self.alloc_status = Counter()
+        self.failed_by_job = Counter()
+        self.failed_by_node = Counter()
+        self.nodes = {}         # ID -> (Status, eligible, draining)
+        self.node_status = Counter()
+        self.ineligible = 0
+        self.draining = 0
+        self.jobs = {}          # job key -> Status
+        self.job_status = Counter()
+        self.deployments = {}   # job key -> (CreateIndex, Status) of its latest deployment
+        self.deployment_status = Counter()
+
+    def put_allocation(self, alloc):
+        alloc_id = alloc.get('ID')
+        if not alloc_id:
+            return
+        self.remove_allocation(alloc_id)
+        entry = (_job_key(alloc.get('Namespace'), alloc.get('JobID')), alloc.get('NodeName') or alloc.get('NodeID') or 'unknown',
+                 alloc.get('ClientStatus') or 'unknown')
+        self.allocations[alloc_id] = entry
+        self.alloc_status[entry[2]] += 1
+        if entry[2] == 'failed':
+            self.failed_by_job[entry[0]] += 1
+            self.failed_by_node[entry[1]] += 1
+
+    def remove_allocation(self, alloc_id):
+        entry = self.allocations.pop(alloc_id, None)
+        if entry is None:
+            return
+        _decrement(self.alloc_status, entry[2])
+        if entry[2] == 'failed':
+            _decrement(self.failed_by_job, entry[0])
+            _decrement(self.failed_by_node, entry[1])
+
+    def put_node(self, node):
+        node_id = node.get('ID')
+        if not node_id:
+            return
+        self.remove_node(node_id)
+        entry = (node.get('Status') or 'unknown', node.get('SchedulingEligibility', 'eligible') == 'eligible',
+                 bool(node.get('Drain')))
+        self.nodes[node_id] = entry
+        self.node_status[entry[0]] += 1
+        self.ineligible += not entry[1]
+        self.draining += entry[2]
+
+    def remove_node(self, node_id):
+        entry = self.nodes.pop(node_id, None)
+        if entry is None:
+            return
+        _decrement(self.node_status, entry[0])
+        self.ineligible -= not entry[1]
+        self.draining -= entry[2]
+
+    def put_job(self, job, namespace=None):
+        if not job.get('ID'):
+            return
+        key = _job_key(job.get('Namespace') or namespace, job['ID'])
+        self.remove_job(key)
+        self.jobs[key] = job.get('Status') or 'unknown'
+        self.job_status[self.jobs[key]] += 1
+
+    def remove_job(self, key):
+        status = self.jobs.pop(key, None)
+        if status is not None:
+            _decrement(self.job_status, status)
+
+    def put_deployment(self, deployment):
+        if not deployment.get('JobID'):
+            return
+        key = _job_key(deployment.get('Namespace'), deployment['JobID'])
+        created = deployment.get('CreateIndex') or 0
+        current = self.deployments.get(key)
+        if current is not None:
+            if current[0] > created:
+                # An older deployment of the job; only the latest counts
+                return
+            _decrement(self.deployment_status, current[1])
+        self.deployments[key] = (created, deployment.get('Status') or 'unknown')
+        self.deployment_status[self.deployments[key][1]] += 1
+
+    def apply(self, event):
+        """
+        Apply one event from /v1/event/stream.
+        Returns:
+            str: The topic it changed, or None when it was ignored.
+        """
+        topic = event.get('Topic')
+        kind = event.get('Type') or ''
+        payload = event.get('Payload') or {}
+        if topic == 'Allocation':
+            self.put_allocation(payload.get('Allocation') or {})
+        elif topic == 'Node':
+            if kind == 'NodeDeregistration':
+                self.remove_node(event.get('Key'))
+            else:
+                self.put_node(payload.get('Node') or {})
+        elif topic == 'Job':
+            if kind in ['JobDeregistered', 'JobBatchDeregistered']:
+                self.remove_job(_job_key(event.get('Namespace'), event.get('Key')))
+            else:
+                self.put_job(payload.get('Job') or {}, event.get('Namespace'))
+        elif topic == 'Deployment':
+            self.put_deployment(payload.get('Deployment') or {})
+        else:
+            return None
+        self.events += 1
+        self.index = max(self.index, event.get('Index') or 0)
+        return topic
+
+    def section(self, topic):
+        """Summary of one topic, in the shape reported for the matching result key (see SECTIONS)."""
+        if topic == 'Allocation':
+            return {
+                'total': len(self.allocations),
+                'by_status': dict(self.alloc_status),
+                'failed': sum(self.failed_by_job.values()),
+                'failed_by_job': dict(self.failed_by_job.most_common(self.top)),
+                'failed_by_node': dict(self.failed_by_node.most_common(self.top)),
+            }
+        if topic == 'Node':
+            return {'total': len(self.nodes), 'by_status': dict(self.node_status), 'ineligible': self.ineligible,
+                    'draining': self.draining}
+        if topic == 'Job':
+            return {'total': len(self.jobs), 'by_status': dict(self.job_status)}
+        failed = sorted(key for key, (_, status) in self.deployments.items() if status == 'failed')
+        return {'total': len(self.deployments), 'by_status': dict(self.deployment_status), 'failed': failed[:self.top]}
+
+
+# Event topic -> result key of its summary
+SECTIONS = {
+    'Allocation': 'allocations',
+    'Node': 'nodes',
+    'Job': 'jobs',
+    'Deployment': 'deployments',
+}
+
+
+class NomadEventStream:
+    """
+    Live Nomad health from /v1/event/stream. The view is seeded from the
+    node, job, deployment and allocation lists once, then kept current by
+    Allocation, Node, Deployment and Job events, so following a cluster
+    costs O(events) rather than repeated full list scans. Lists are re-read
+    after a reconnect (events may have been missed) and every
+    resync_interval seconds (allocations garbage-collected by Nomad publish
+    no event). on_change(key, value, state, previous_state) is called for
+    each summary that changed.
+    """
+
+    def __init__(self, addr=None, token=None, verify=None, on_change=None, http=None, top=DEFAULT_TOP,
+                 resync_interval=None):
+        self.addr = addr
+        self.token = token
+        self.verify = verify
+        self.on_change = on_change
+        self.http = http
+        self.top = top
+        self.resync_interval = resync_interval or default_resync_interval()
+        self.view = NomadClusterView(top)
+        self.results = {}
+        self.states = {}
+        self.connected = False
+        self.seeds = 0
+        self._stop = None
+        self._loop = None
+
+    def publish(self, topics):
+        """Re-summarise the given topics and notify the ones whose summary changed."""
+        results = dict(self.results)
+        for topic in topics:
+            key = SECTIONS[topic]
+            value = self.view.section(topic)
+            if results.get(key) == value:
+                continue
+            previous = self.states.get(key)
+            results[key] = value
+            # Readers on other threads always see a complete results dict
+            self.states = dict(self.states, **{key: get_section_state(key, value, 'nomad')})
+            self.results = results
+            if self.on_change is not None:
+                self.on_change(key, value, self.states[key], previous)
+
+    def publish_error(self, error):
+        previous = self.states.get('error')
+        message = f"Error: {error}"
+        if self.results.get('error') != message:
+            self.results = dict(self.results, error=message)
+            self.states = dict(self.states, error=get_section_state('error', message, 'nomad'))
+            if self.on_change is not None:
+                self.on_change('error', message, self.states['error'], previous)
+
+    async def seed(self, ctx):
+        """
+        Rebuild the view from the list endpoints.
+        Returns:
+            int: The Raft index to subscribe from; events replayed from there
+            are applied in order on top of the lists, which converges on the
+            current state.
+        """
+        view = NomadClusterView(self.top)
+        nodes, headers = await ctx.get_with_headers('/v1/nodes')
+        indexes = [int(headers.get('X-Nomad-Index') or 0)]
+        for node in nodes or []:
+            view.put_node(node)
+        # Every page's index is kept: each list is at least as new as its oldest page
+        async for job in iter_pages(ctx, '/v1/jobs', {'namespace': '*'}, indexes=indexes):
+            view.put_job(job)
+        async for deployment in iter_pages(ctx, '/v1/deployments', {'namespace': '*'}, indexes=indexes):
+            view.put_deployment(deployment)
+        params = {'namespace': '*', 'task_states': 'false', 'resources': 'false'}
+        async for alloc in iter_pages(ctx, '/v1/allocations', params, indexes=indexes):
+            view.put_allocation(alloc)
+        view.index = min(indexes)
+        self.view = view
+        self.seeds += 1
+        return view.index
+
+    async def follow(self, ctx, index, resync_at):
+        params = [('topic', f"{topic}:*") for topic in TOPICS] + [('namespace', '*'), ('index', index)]
+        async for frame in ctx.stream_lines('/v1/event/stream', params=params):
+            self.connected = True
+            topics = set()
+            for event in frame.get('Events') or []:
+                topic = self.view.apply(event)
+                if topic is not None:
+                    topics.add(topic)
+            if topics:
+                self.publish([topic for topic in TOPICS if topic in topics])
+            if time.monotonic() >= resync_at:
+                # Heartbeats arrive every 10s, so a quiet stream still reaches this point
+                return
+
+    async def _run(self, ctx):
+        failures = 0
+        while True:
+            try:
+                index = await self.seed(ctx)
+                self.results = {key: value for key, value in self.results.items() if key != 'error'}
+                self.states = {key: value for key, value in self.states.items() if key != 'error'}
+                self.publish(TOPICS)
+                failures = 0
+                await self.follow(ctx, index, time.monotonic() + self.resync_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.connected = False
+                failures += 1
+                self.publish_error(e)
+                await asyncio.sleep(min(2 ** failures, MAX_RETRY_DELAY))
+
+    def stop(self):
+        """Ask a running stream to finish; safe to call from any thread."""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def run(self, duration=None):
+        """
+        Follow the event stream until stop() is called or duration seconds have passed.
+        Returns:
+            dict: The latest summary per key.
+        """
+        owned = self.http is None
+        http = self.http or AsyncHTTP()
+        ctx = nomad_context(http, self.addr, self.token, self.verify)
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        task = asyncio.ensure_future(self._run(ctx))
+        stopper = asyncio.ensure_future(self._stop.wait())
+        try:
+            await asyncio.wait([task, stopper], timeout=duration, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            task.cancel()
+            stopper.cancel()
+            await asyncio.gather(task, stopper, return_exceptions=True)
+            self.connected = False
+            if owned:
+                await http.close()
+        return dict(self.results)
+
+
+def follow_nomad_events(addr=None, token=None, verify=None, on_change=None, duration=None):
+    """Blocking wrapper: follow a Nomad region for duration seconds (forever when None) and return the latest summaries."""
+    stream = NomadEventStream(addr, token, verify, on_change)
+    return run_sync(stream.run(duration))
@@ -0,0 +1,193 @@
+import importlib
+import os
+
+from hashicorp_doctor.utils import get_section_state, register_state_rule
+
+# product -> module registering its probes, imported on first use
+PRODUCT_MODULES = {
+    'vault': 'hashicorp_doctor.vault.diagnostics',
+    'consul': 'hashicorp_doctor.consul_diag.diagnostics',
+    'nomad': 'hashicorp_doctor.nomad_diag.diagnostics',
+}
+# product -> {result key: Probe}, in report order; filled in by each product's diagnostics module
+PROBES = {product: {} for product in PRODUCT_MODULES}
+
+
+class Probe:
+    """
+    One diagnostics check: the endpoint it reads and how its result is
+    parsed and classified. Every probe is executed by run_probe_set(), so all
+    of them are parallelised, bounded and selected the same way.
+    """
+
+    def __init__(self, product, key, path=None, fetch=None, classify=None, description=''):
+        """
+        Args:
+            product (str): 'vault', 'consul' or 'nomad'.
+            key (str): Result key in the product's diagnostics dict.
+            path (str): API path read with ProbeContext.get(); with fetch it only documents the endpoint.
+            fetch (callable): async fetch(ctx) for probes that need more than one GET.
+            classify (callable): value -> state, registered as the product's
+                state rule for key; error strings and None results fall back
+                to the shared rule.
+            description (str): One line shown by the probes command.
+        """
+        if path is None and fetch is None:
+            raise ValueError(f"Probe {product}.{key} needs a path or a fetch function")
+        self.product = product
+        self.key = key
+        self.path = path
+        self.fetch = fetch
+        self.classify = classify
+        self.description = description
+
+    @property
+    def name(self):
+        return f"{self.product}.{self.key}"
+
+    async def run(self, ctx):
+        return await self.fetch(ctx) if self.fetch else await ctx.get(self.path)
+
+    def state(self, value):
+        return get_section_state(self.key, value, self.product)
+
+
+def parse_addr(address, default_port):
+    """Base URL (scheme://host:port) of an address given as host, host:port or http(s)://host[:port]."""
+    scheme = 'http'
+    addr = address
+    if addr.startswith('http://'):
+        addr = addr[len('http://'):]
+    elif addr.startswith('https://'):
+        scheme = 'https'
+        addr = addr[len('https://'):]
+    addr = addr.rstrip('/')
+    if ':' in addr:
+        host, port = addr.split(':', 1)
+        port = int(port)
+    else:
+        host = addr
+        port = default_port
+    return f"{scheme}://{host}:{port}"
+
+
+class ProbeContext:
+    """Connection details of one cluster, handed to every probe of a run."""
+
+    def __init__(self, http, base_url, headers=None, verify=True, **options):
+        self.http = http
+        self.base_url = base_url.rstrip('/')
+        self.headers = headers or {}
+        self.verify = verify
+        self.options = options
+
+    async def get(self, path, allow_errors=False):
+        return await self.http.get_json(f"{self.base_url}{path}", headers=self.headers, verify=self.verify,
+                                        allow_errors=allow_errors)
+
+    async def get_with_headers(self, path, params=None, timeout=None):
+        return await self.http.get_json_with_headers(f"{self.base_url}{path}", headers=self.headers, params=params,
+                                                     verify=self.verify, timeout=timeout)
+
+    def stream(self, path):
+        return self.http.iter_json_array(f"{self.base_url}{path}", headers=self.headers, verify=self.verify)
+
+    def stream_lines(self, path, params=None):
+        return self.http.iter_json_lines(f"{self.base_url}{path}", headers=self.headers, params=params, verify=self.verify)
+
+
+def _product_rule(classify):
+    def rule(value):
+        if isinstance(value, str) and value.startswith('Error'):
+            return None
+        return classify(value)
+    return rule
+
+
+def register_probe(probe):
+    """Add a probe to the registry (replacing one with the same name) and return it."""
+    PROBES.setdefault(probe.product, {})[probe.key] = probe
+    if probe.classify is not None:
+        register_state_rule(probe.key, _product_rule(probe.classify), probe.product)
+    return probe
+
+
+def load_probes(products=None):
+    """Import the modules of the given products (default: all) so their probes are registered; returns PROBES."""
+    for product in products or PRODUCT_MODULES:
+        if product in PRODUCT_MODULES:
+            importlib.import_module(PRODUCT_MODULES[product])
+    return PROBES
+
+
+def probe_state(product, key, value):
+    """State of one result, using the probe's own classifier when it has one."""
+    if product and not PROBES.get(product):
+        load_probes([product])
+    return get_section_state(key, value, product)
+
+
+def parse_probe_names(spec):
+    """Split a comma-separated probe selection ('consul.leader,seal_status,nomad') into a set of names."""
+    if not spec:
+        return None
+    if isinstance(spec, str):
+        spec = spec.split(',')
+    names = {name.strip() for name in spec if name and name.strip()}
+    return names or None
+
+
+def _matches(probe, names):
+    return probe.product in names or probe.key in names or probe.name in names
+
+
+def validate_probe_names(names):
+    """
+    Raises:
+        ValueError: If a name matches no registered product, probe key or product.key.
+    """
+    if not names:
+        return
+    load_probes()
+    known = [probe for probes in PROBES.values() for probe in probes.values()]
+    unknown = sorted(name for name in names or () if not any(_matches(probe, {name}) for probe in known))
+    if unknown:
+        raise ValueError(f"Unknown probe(s): {', '.join(unknown)}. Available: {', '.join(p.name for p in known)}")
+
+
+def select_probes(product, only=None, skip=None):
+    """
+    Registered probes of one product, in report order, after selection.
+    Names may be a product ('vault'), a key shared by products ('leader') or
+    a single probe ('consul.leader'). only and skip default to
+    HCP_DOCTOR_PROBES and HCP_DOCTOR_SKIP_PROBES.
+    """
+    only = parse_probe_names(only if only is not None else os.environ.get('HCP_DOCTOR_PROBES'))
+    skip = parse_probe_names(skip if skip is not None else os.environ.get('HCP_DOCTOR_SKIP_PROBES'))
+    selected = []
+    for probe in PROBES.get(product, {}).values():
+        if only and not _matches(probe, only):
+            continue
+        if skip and _matches(probe, skip):
+            continue
+        selected.append(probe)
+    return selected
+
+
+async def run_probe_set(product, ctx, only=None, skip=None, timeout=None, limit=None, budget=None, timings=None):
+    """
+    Execute the selected probes of a product concurrently against one cluster.
+    When timings is a dict it is filled with result key -> ProbeTiming.to_dict()
+    for every probe that started.
+    Returns:
+        dict: Result key -> value in registry order; failures are stored as
+        "Error: ..." strings, timed-out probes as "Error: timed out ...".
+    """
+    from hashicorp_doctor.aio import gather_probes
+    probes = select_probes(product, only, skip)
+    measured = {} if timings is not None else None
+    collected = await gather_probes([(probe.key, (lambda probe=probe: probe.run(ctx))) for probe in probes],
+                                    timeout=timeout, limit=limit, budget=budget, timings=measured)
+    if timings is not None:
+        timings.update((key, timing.to_dict()) for key, timing in measured.items())
+    return {key: f"Error: {value}" if isinstance(value, Exception) else value for key, value in collected.items()}
@@ -0,0 +1,203 @@
+import re
+import statistics
+import time
+from collections import deque
+
+# Autopilot's own defaults: a server trailing the leader by more than
+# MaxTrailingLogs entries, or not heard from for LastContactThreshold, is unhealthy
+MAX_TRAILING_LOGS = 250
+LAST_CONTACT_THRESHOLD = 0.2
+# A follower is a last-contact outlier when it is also this many times slower than the median follower
+OUTLIER_FACTOR = 3.0
+DEFAULT_TREND_SIZE = 60
+# Consecutive growing lag samples before a server is reported as falling behind
+FALLING_BEHIND_SAMPLES = 3
+
+_DURATION = re.compile(r'(\d+(?:\.\d+)?)(ns|us|µs|ms|s|m|h)')
+_UNITS = {'ns': 1e-9, 'us': 1e-6, 'µs': 1e-6, 'ms': 1e-3, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+def duration_seconds(value):
+    """Seconds in a Go duration string ('1m2.5s', '150µs'), or None when it is not one."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str) or not value:
+        return None
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _UNITS[unit] for number, unit in parts)
+
+
+def _server(name, address=None, leader=False, voter=True, healthy=None, last_index=None, last_term=None,
+            last_contact=None, version=None):
+    return {'name': name, 'address': address, 'leader': bool(leader), 'voter': bool(voter), 'healthy': healthy,
+            'last_index': last_index, 'last_term': last_term, 'last_contact': duration_seconds(last_contact),
+            'version': version or None}
+
+
+def normalize_vault(payload):
+    """Server model of /v1/sys/storage/raft/autopilot/state."""
+    state = payload.get('data', payload) if isinstance(payload, dict) else None
+    if not isinstance(state, dict) or not isinstance(state.get('servers'), dict):
+        return None
+    servers = [_server(s.get('name') or server_id, s.get('address'), s.get('status') == 'leader',
+                       s.get('status') != 'non-voter', s.get('healthy'), s.get('last_index'), s.get('last_term'),
+                       s.get('last_contact'), s.get('version'))
+               for server_id, s in state['servers'].items()]
+    return {'healthy': state.get('healthy'), 'failure_tolerance': state.get('failure_tolerance'), 'servers': servers}
+
+
+def normalize_autopilot(payload):
+    """
+    Server model of Consul's /v1/operator/autopilot/state (Servers keyed by
+    ID, with Status) or the /v1/operator/autopilot/health format Consul and
+    Nomad share (a Servers list with Leader and Voter flags).
+    """
+    if not isinstance(payload, dict):
+        return None
+    servers = payload.get('Servers')
+    if isinstance(servers, dict):
+        servers = [_server(s.get('Name') or server_id, s.get('Address'), s.get('Status') == 'leader',
+                           s.get('Status') != 'non-voter', s.get('Healthy'), s.get('LastIndex'), s.get('LastTerm'),
+                           s.get('LastContact'), s.get('Version'))
+                   for server_id, s in servers.items()]
+    elif isinstance(servers, list):
+        servers = [_server(s.get('Name') or s.get('ID'), s.get('Address'), s.get('Leader'), s.get('Voter', True),
+                           s.get('Healthy'), s.get('LastIndex'), s.get('LastTerm'), s.get('LastContact'), s.get('Version'))
+                   for s in servers if isinstance(s, dict)]
+    else:
+        return None
+    return {'healthy': payload.get('Healthy'), 'failure_tolerance': payload.get('FailureTolerance'), 'servers': servers}
+
+
+def normalize_raft_configuration(payload):
+    """Server model of Nomad's /v1/operator/raft/configuration: membership and roles only, no indexes."""
+    servers = payload.get('Servers') if isinstance(payload, dict) else None
+    if not isinstance(servers, list):
+        return None
+    return {'healthy': None, 'failure_tolerance': None,
+            'servers': [_server(s.get('Node') or s.get('ID'), s.get('Address'), s.get('Leader'), s.get('Voter', True))
+                        for s in servers if isinstance(s, dict)]}
+
+
+def cluster_model(product, result):
+    """
+    The normalised server model of one product's diagnostics result, taken
+    from the richest autopilot payload it holds, or None when it holds none.
+    """
+    if not isinstance(result, dict):
+        return None
+    if product == 'vault':
+        return normalize_vault(result.get('autopilot'))
+    if product == 'consul':
+        return normalize_autopilot(result.get('autopilot_state')) or normalize_autopilot(result.get('autopilot_health'))
+    if product == 'nomad':
+        return normalize_autopilot(result.get('autopilot_health')) or normalize_raft_configuration(result.get('raft_configuration'))
+    return None
+
+
+def analyze(model):
+    """
+    Raft health figures of a server model: commit index lag behind the
+    leader, last-contact outliers, voter balance and failure tolerance.
+    Returns:
+        dict: Summary figures plus one row per server under 'servers'.
+    """
+    servers = model['servers']
+    voters = [s for s in servers if s['voter']]
+    leader = next((s for s in servers if s['leader']), None)
+    indexes = [s['last_index'] for s in servers if isinstance(s['last_index'], int)]
+    leader_index = leader['last_index'] if leader and isinstance(leader['last_index'], int) else max(indexes, default=None)
+    lag = {s['name']: leader_index - s['last_index'] for s in servers
+           if leader_index is not None and isinstance(s['last_index'], int)}
+    contacts = {s['name']: s['last_contact'] for s in servers if not s['leader'] and s['last_contact'] is not None}
+    median = statistics.median(contacts.values()) if contacts else 0.0
+    limit = max(LAST_CONTACT_THRESHOLD, OUTLIER_FACTOR * median)
+    quorum = len(voters) // 2 + 1 if voters else 0
+    healthy_voters = sum(1 for s in voters if s['healthy'] is not False)
+    computed_tolerance = max(healthy_voters - quorum, 0) if voters else 0
+    rows = []
+    for s in servers:
+        rows.append({key: value for key, value in {
+            'name': s['name'],
+            'role': 'leader' if s['leader'] else 'voter' if s['voter'] else 'non-voter',
+            'healthy': s['healthy'],
+            'last_index': s['last_index'],
+            'commit_lag': lag.get(s['name']),
+            'last_contact': s['last_contact'],
+            'version': s['version'],
+        }.items() if value is not None})
+    return {
+        'leader': leader['name'] if leader else None,
+        'healthy': model['healthy'],
+        'voters': len(voters),
+        'non_voters': len(servers) - len(voters),
+        'quorum': quorum,
+        'even_voters': bool(voters) and len(voters) % 2 == 0,
+        'failure_tolerance': model['failure_tolerance'] if model['failure_tolerance'] is not None else computed_tolerance,
+        'unhealthy': sorted(s['name'] for s in servers if s['healthy'] is False),
+        'leader_index': leader_index,
+        'max_commit_lag': max(lag.values(), default=None),
+        'lagging': sorted(name for name, behind in lag.items() if behind > MAX_TRAILING_LOGS),
+        'last_contact_outliers': sorted(name for name, contact in contacts.items() if contact > limit),
+        'servers': rows,
+    }
+
+
+def raft_analytics(product, result):
+    """analyze() of a diagnostics result's autopilot payloads, or None when there are none to analyse."""
+    model = cluster_model(product, result)
+    if model is None or not model['servers']:
+        return None
+    return analyze(model)
+
+
+class RaftTrend:
+    """
+    The last size analyses of one cluster, so replication behaviour can be
+    followed across repeated collections: commit throughput, leader
+    changes, and per-server lag that keeps growing.
+    """
+
+    def __init__(self, size=DEFAULT_TREND_SIZE):
+        self.samples = deque(maxlen=size)
+
+    def add(self, analysis, at=None):
+        lag = {row['name']: row['commit_lag'] for row in analysis['servers'] if 'commit_lag' in row}
+        contact = {row['name']: row['last_contact'] for row in analysis['servers'] if 'last_contact' in row}
+        self.samples.append({'at': time.time() if at is None else at, 'leader': analysis['leader'],
+                             'leader_index': analysis['leader_index'], 'lag': lag, 'last_contact': contact})
+
+    def summary(self):
+        """
+        Returns:
+            dict: Sample count and window, commit rate (index/s), leader
+            changes, and per server its current, peak and mean lag and last
+            contact; servers whose lag grew over the last
+            FALLING_BEHIND_SAMPLES samples are listed as falling_behind.
+        """
+        samples = list(self.samples)
+        summary = {'samples': len(samples)}
+        if not samples:
+            return summary
+        first, last = samples[0], samples[-1]
+        window = last['at'] - first['at']
+        summary['window_seconds'] = round(window, 3)
+        if window > 0 and first['leader_index'] is not None and last['leader_index'] is not None:
+            summary['commit_rate'] = round((last['leader_index'] - first['leader_index']) / window, 3)
+        summary['leader_changes'] = sum(1 for a, b in zip(samples, samples[1:]) if a['leader'] != b['leader'])
+        servers = {}
+        for name in last['lag']:
+            history = [sample['lag'][name] for sample in samples if name in sample['lag']]
+            servers[name] = {'commit_lag': history[-1], 'max_commit_lag': max(history),
+                             'mean_commit_lag': round(sum(history) / len(history), 1)}
+            if name in last['last_contact']:
+                servers[name]['last_contact'] = last['last_contact'][name]
+        summary['servers'] = servers
+        recent = samples[-FALLING_BEHIND_SAMPLES:]
+        summary['falling_behind'] = sorted(
+            name for name in last['lag']
+            if len(recent) == FALLING_BEHIND_SAMPLES and all(name in s['lag'] for s in recent)
+            and all(a['lag'][name] < b['lag'][name] for a, b in zip(recent, recent[1:])))
+        return summary
@@ -0,0 +1,365 @@
+import html
+import json
+
+REPORT_TITLE = 'HashiCorp Doctor Diagnostics Report'
+
+HTML_HEAD = """
+<html><head><meta charset='utf-8'><title>{page_title}</title>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 2em; }}
+h1 {{ color: #2d5fa4; }}
+h2 {{ color: #1a3d6d; border-bottom: 1px solid #ccc; }}
+.section {{ margin-bottom: 2em; }}
+.state-good {{ color: green; font-weight: bold; }}
+.state-failed {{ color: red; font-weight: bold; }}
+.state-unknown {{ color: #888; font-weight: bold; }}
+.state-healthy {{ color: green; font-weight: bold; }}
+.state-unhealthy {{ color: red; font-weight: bold; }}
+pre {{ background: #f8f8f8; border: 1px solid #ddd; padding: 8px; overflow-x: auto; }}
+table.timings {{ border-collapse: collapse; font-size: 0.9em; }}
+table.timings th, table.timings td {{ border: 1px solid #ddd; padding: 3px 8px; text-align: right; }}
+table.timings th:first-child, table.timings td:first-child {{ text-align: left; }}
+</style></head><body>
+<h1>{title}</h1>
+"""
+
+STATE_CLASSES = {
+    'Good': 'state-good',
+    'Healthy': 'state-healthy',
+    'Failed': 'state-failed',
+    'Unhealthy': 'state-unhealthy',
+    'Unknown': 'state-unknown',
+}
+
+# Largest piece of a JSON dump held in memory while streaming HTML
+STREAM_CHUNK_SIZE = 64 * 1024
+
+TIMINGS_TITLE = 'Timings'
+# ProbeTiming phases shown in timing tables, in milliseconds
+TIMING_PHASES = ['dns', 'connect', 'ttfb', 'parse', 'total']
+
+
+def _pre(text):
+    return f"<pre>{html.escape(text, quote=False)}</pre>"
+
+
+# HTML
+def html_header(title=REPORT_TITLE, page_title='HashiCorp Doctor Report'):
+    return HTML_HEAD.format(title=html.escape(title), page_title=html.escape(page_title))
+
+
+def html_footer():
+    return "</body></html>"
+
+
+def _iter_pre(value, indent):
+    """Yield an escaped <pre> block for value in bounded chunks, never holding the whole dump."""
+    yield "<pre>"
+    buffer = []
+    size = 0
+    for piece in json.JSONEncoder(indent=indent, default=str).iterencode(value):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= STREAM_CHUNK_SIZE:
+            yield html.escape(''.join(buffer), quote=False)
+            buffer = []
+            size = 0
+    if buffer:
+        yield html.escape(''.join(buffer), quote=False)
+    yield "</pre>"
+
+
+def iter_html_section(snapshot, title):
+    data = snapshot.sections[title]
+    yield f"<div class='section'><h2>{html.escape(title)}</h2>"
+    if isinstance(data, dict):
+        for key, value in data.items():
+            state = snapshot.state(title, key)
+            state_class = STATE_CLASSES.get(state, 'state-unknown')
+            yield f"<div><span class='{state_class}'>{html.escape(key.upper())} - {state}</span></div>"
+            yield from _iter_pre(value, 4)
+    elif isinstance(data, list):
+        yield from _iter_pre(data, 2)
+    else:
+        yield _pre(str(data))
+    yield "</div>"
+
+
+def html_section(snapshot, title):
+    return ''.join(iter_html_section(snapshot, title))
+
+
+def probe_timing_rows(snapshot):
+    """(section, key, timing) for every measured probe, slowest first."""
+    rows = [(section, key, timing) for section, timings in snapshot.probe_timings.items()
+            for key, timing in timings.items()]
+    return sorted(rows, key=lambda row: row[2].get('total', 0), reverse=True)
+
+
+def iter_html_timings(snapshot):
+    yield f"<div class='section'><h2>{TIMINGS_TITLE}</h2>"
+    if snapshot.timings:
+        yield "<table class='timings'><tr><th>Section</th><th>Collection (s)</th></tr>"
+        for section, elapsed in snapshot.timings.items():
+            yield f"<tr><td>{html.escape(section)}</td><td>{elapsed:.2f}</td></tr>"
+        yield "</table><br>"
+    rows = probe_timing_rows(snapshot)
+    if rows:
+        header = ''.join(f"<th>{phase} (ms)</th>" for phase in TIMING_PHASES)
+        yield f"<table class='timings'><tr><th>Probe</th>{header}<th>bytes</th><th>requests</th></tr>"
+        for section, key, timing in rows:
+            cells = ''.join(f"<td>{timing.get(phase, 0) * 1000:.1f}</td>" for phase in TIMING_PHASES)
+            yield (f"<tr><td>{html.escape(section)} / {html.escape(key)}</td>{cells}"
+                   f"<td>{timing.get('bytes', 0)}</td><td>{timing.get('requests', 0)}</td></tr>")
+        yield "</table>"
+    yield "</div>"
+
+
+def iter_html(snapshot, title=REPORT_TITLE, sections=None):
+    """
+    Yield the HTML report piece by piece. The header is yielded before any
+    section is available; when sections is given it must be an iterable of
+    (title, data) pairs, each added to the snapshot and rendered as it arrives.
+    A Timings section closes the report when the snapshot has any timings.
+    """
+    yield html_header(title)
+    if sections is None:
+        for section in list(snapshot.sections):
+            yield from iter_html_section(snapshot, section)
+    else:
+        for section, data in sections:
+            snapshot.add(section, data)
+            yield from iter_html_section(snapshot, section)
+    if snapshot.timings or snapshot.probe_timings:
+        yield from iter_html_timings(snapshot)
+    yield html_footer()
+
+
+def render_html(snapshot, title=REPORT_TITLE):
+    return ''.join(iter_html(snapshot, title))
+
+
+# TXT
+def txt_section(snapshot, title):
+    data = snapshot.sections[title]
+    lines = [f"\n{'='*60}\n{title}\n{'='*60}\n"]
+    if isinstance(data, dict):
+        for key, value in data.items():
+            state = snapshot.state(title, key)
+            lines.append(f"  {key.upper()} - {state}\n  {'-'*len(key)}\n")
+            lines.append(json.dumps(value, indent=4, default=str) + "\n")
+    elif isinstance(data, list):
+        lines.append(json.dumps(data, indent=2, default=str) + "\n")
+    else:
+        lines.append(str(data) + "\n")
+    return ''.join(lines)
+
+
+def render_txt(snapshot, title=REPORT_TITLE):
+    return f"{title}\n" + ''.join(txt_section(snapshot, section) for section in snapshot.sections)
+
+
+# JSON
+def render_json(snapshot, title=REPORT_TITLE):
+    payload = {'title': title}
+    payload.update(snapshot.to_dict())
+    return json.dumps(payload, indent=2, default=str)
+
+
+# PDF
+# Layout budget: a payload longer than PDF_INLINE_LINES is summarised in place
+# and excerpted in an appendix (at most PDF_APPENDIX_LINES per payload and
+# PDF_APPENDIX_TOTAL_LINES overall); the JSON report always has everything.
+# With these limits a snapshot holding 10,000 catalog nodes renders in well
+# under a second and stays within a few dozen pages.
+PDF_LINE_CHARS = 100
+PDF_INLINE_LINES = 40
+PDF_APPENDIX_LINES = 400
+PDF_APPENDIX_TOTAL_LINES = 4000
+
+# Core PDF fonts are latin-1 only: tabs become spaces, other control characters '?'
+_PDF_CONTROL_CHARS = {i: '?' for i in range(32) if i != 10}
+_PDF_CONTROL_CHARS.update({9: ' ', 127: '?'})
+
+
+def _safe_text(text):
+    return text.encode('ascii', 'replace').decode('ascii').translate(_PDF_CONTROL_CHARS)
+
+
+def _safe_line(line):
+    return _safe_text(line).replace('\n', ' ')
+
+
+def _wrap(text, width=PDF_LINE_CHARS):
+    lines = []
+    for line in _safe_text(text).splitlines():
+        if not line.strip():
+            continue
+        lines.extend(line[i:i+width] for i in range(0, len(line), width))
+    return lines
+
+
+def _dump_lines(value, limit):
+    """
+    Return up to limit wrapped lines of value's JSON dump and whether it was cut
+    short. The dump is encoded lazily, so huge payloads are never serialised in full.
+    """
+    if isinstance(value, str):
+        lines = _wrap(value)
+        return lines[:limit], len(lines) > limit
+    pieces = []
+    newlines = 0
+    truncated = False
+    for piece in json.JSONEncoder(indent=2, default=str).iterencode(value):
+        pieces.append(piece)
+        newlines += piece.count('\n')
+        if newlines > limit:
+            truncated = True
+            break
+    lines = _wrap(''.join(pieces))
+    return lines[:limit], truncated or len(lines) > limit
+
+
+def _summarize(value):
+    if isinstance(value, list):
+        return f"list with {len(value)} items"
+    if isinstance(value, dict):
+        keys = list(value)
+        more = f", ... {len(keys) - 10} more" if len(keys) > 10 else ''
+        return f"object with {len(keys)} keys: {', '.join(str(k) for k in keys[:10])}{more}"
+    return f"{type(value).__name__} value"
+
+
+class PdfLayout:
+    """
+    Lays out pre-wrapped monospaced lines on an FPDF document with pdf.text()
+    and manual page breaks, which is an order of magnitude cheaper than one
+    multi_cell() call per line.
+    """
+
+    def __init__(self, pdf, margin=10, bottom=15):
+        self.pdf = pdf
+        self.margin = margin
+        self.bottom = pdf.h - bottom
+        self.y = max(pdf.get_y(), margin)
+
+    def lines(self, lines, size=8, style=''):
+        pdf = self.pdf
+        pdf.set_font("Courier", style=style, size=size)
+        height = size * 0.3528 * 1.25
+        for line in lines:
+            if self.y + height > self.bottom:
+                pdf.add_page()
+                pdf.set_font("Courier", style=style, size=size)
+                self.y = self.margin
+            self.y += height
+            pdf.text(self.margin, self.y, line)
+
+    def text(self, text, size=8, style=''):
+        self.lines(_wrap(text), size=size, style=style)
+
+    def gap(self, height=2):
+        self.y += height
+
+    def finish(self):
+        self.pdf.set_y(min(self.y, self.bottom))
+
+
+class PdfAppendix:
+    """Collects excerpts of payloads too large to print inline."""
+
+    def __init__(self):
+        self.entries = []
+        self.remaining = PDF_APPENDIX_TOTAL_LINES
+
+    def add(self, label, lines):
+        """Keep an excerpt of lines under label and return its appendix number, or None when full."""
+        if self.remaining <= 0:
+            return None
+        kept = lines[:self.remaining]
+        self.remaining -= len(kept)
+        if len(kept) < len(lines):
+            kept.append("... remaining lines omitted (appendix budget exhausted, see the JSON report)")
+        self.entries.append((label, kept))
+        return len(self.entries)
+
+    def write(self, layout):
+        if not self.entries:
+            return
+        layout.pdf.add_page()
+        layout.y = layout.margin
+        layout.lines(["Appendix: large payloads"], size=12, style='B')
+        for number, (label, lines) in enumerate(self.entries, 1):
+            layout.gap()
+            layout.lines([_safe_line(f"A{number}. {label}")], size=10, style='B')
+            layout.lines(lines)
+
+
+def pdf_value(layout, label, value, appendix=None):
+    """Print one payload: inline when short, otherwise as a summary plus an appendix excerpt."""
+    lines, truncated = _dump_lines(value, PDF_APPENDIX_LINES)
+    if len(lines) <= PDF_INLINE_LINES and not truncated:
+        layout.lines(lines)
+        return
+    if appendix is None:
+        layout.lines(lines[:PDF_INLINE_LINES] + ["... truncated, see the JSON report"])
+        return
+    if truncated:
+        lines.append("... remaining lines omitted (see the JSON report for the full payload)")
+    number = appendix.add(label, lines)
+    summary = [_summarize(value)]
+    summary.extend(lines[:10])
+    where = f"appendix A{number}" if number else "the JSON report (appendix budget exhausted)"
+    summary.append(f"... truncated, see {where}")
+    layout.lines(summary)
+
+
+def pdf_section(layout, snapshot, title, appendix=None):
+    data = snapshot.sections[title]
+    layout.gap()
+    layout.lines([_safe_line(f"[{title} Diagnostics]")], size=12, style='B')
+    if isinstance(data, dict):
+        for key, value in data.items():
+            state = snapshot.state(title, key)
+            layout.lines([_safe_line(f"{key.upper()} - {state}")], size=10, style='B')
+            pdf_value(layout, f"{title} / {key}", value, appendix)
+            layout.gap(1)
+    else:
+        pdf_value(layout, title, data, appendix)
+    layout.gap()
+
+
+def render_pdf(snapshot, title=REPORT_TITLE):
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=False)
+    pdf.add_page()
+    pdf.set_font("Courier", size=12)
+    pdf.cell(0, 10, _safe_line(title), new_x='LMARGIN', new_y='NEXT', align='C')
+    layout = PdfLayout(pdf)
+    appendix = PdfAppendix()
+    for section in snapshot.sections:
+        pdf_section(layout, snapshot, section, appendix)
+    appendix.write(layout)
+    return bytes(pdf.output())
+
+
+# name -> (render function, mimetype, file extension)
+RENDERERS = {
+    'html': (render_html, 'text/html', 'html'),
+    'txt': (render_txt, 'text/plain', 'txt'),
+    'json': (render_json, 'application/json', 'json'),
+    'pdf': (render_pdf, 'application/pdf', 'pdf'),
+}
+
+
+def register_renderer(name, func, mimetype, extension):
+    """Add an output format. func(snapshot, title=...) must return str or bytes."""
+    RENDERERS[name] = (func, mimetype, extension)
+
+
+def render(snapshot, fmt, title=REPORT_TITLE):
+    """Render a snapshot in the named format, returning bytes."""
+    func, _, _ = RENDERERS[fmt]
+    output = func(snapshot, title=title)
+    return output.encode('utf-8') if isinstance(output, str) else output
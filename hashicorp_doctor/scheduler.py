@@ -0,0 +1,110 @@
+import os
+import random
+import threading
+import time
+
+DEFAULT_INTERVAL = 60.0
+DEFAULT_JITTER = 0.1
+DEFAULT_MAX_BACKOFF = 600.0
+
+
+def default_interval():
+    """Background re-collection interval in seconds (HCP_DOCTOR_REFRESH_INTERVAL, default 60, 0 disables)."""
+    try:
+        return float(os.environ.get('HCP_DOCTOR_REFRESH_INTERVAL') or DEFAULT_INTERVAL)
+    except ValueError:
+        return DEFAULT_INTERVAL
+
+
+def is_failing(result):
+    """True when a collected result shows the cluster could not be reached or queried."""
+    if not isinstance(result, dict) or not result:
+        return True
+    if 'error' in result:
+        return True
+    return all(isinstance(v, str) and v.startswith('Error') for v in result.values())
+
+
+class CollectionScheduler:
+    """
+    Re-collects each product in its own daemon thread and publishes every
+    result into a ResultCache, so web requests are served pre-computed data.
+    Runs are spread out with random jitter, and a product whose cluster keeps
+    failing is retried with exponential backoff up to max_backoff seconds.
+    """
+
+    def __init__(self, cache, jobs, interval=None, jitter=DEFAULT_JITTER, max_backoff=DEFAULT_MAX_BACKOFF):
+        """
+        Args:
+            cache (ResultCache): Where results are published.
+            jobs (dict): product -> (key_func, collector). key_func() returns
+                the cache key for the product's current target.
+            interval (float): Seconds between successful collections.
+            jitter (float): Fraction of the delay randomly added or removed.
+            max_backoff (float): Upper bound on the delay while failing.
+        """
+        self.cache = cache
+        self.jobs = jobs
+        self.interval = default_interval() if interval is None else interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self._stop = threading.Event()
+        self._threads = []
+        self._status = {product: {'runs': 0, 'failures': 0, 'last_run': None, 'next_run': None} for product in jobs}
+        self._status_lock = threading.Lock()
+
+    def next_delay(self, failures):
+        delay = self.interval
+        if failures:
+            delay = min(self.interval * (2 ** min(failures, 16)), max(self.max_backoff, self.interval))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def run_once(self, product):
+        """Collect one product now, publish it and return whether it succeeded."""
+        key_func, collector = self.jobs[product]
+        key = key_func()
+        try:
+            # Goes through the cache's single-flight path, so a page request that
+            # misses while this run is in progress waits for it instead of re-collecting.
+            result = self.cache.get_or_collect(key, collector, refresh=True).value
+        except Exception as e:
+            result = {'error': f"{product.capitalize()} diagnostics failed: {e}"}
+            self.cache.put(key, result)
+        failing = is_failing(result)
+        with self._status_lock:
+            status = self._status[product]
+            status['runs'] += 1
+            status['last_run'] = time.time()
+            status['failures'] = status['failures'] + 1 if failing else 0
+        return not failing
+
+    def _loop(self, product):
+        while not self._stop.is_set():
+            self.run_once(product)
+            with self._status_lock:
+                delay = self.next_delay(self._status[product]['failures'])
+                self._status[product]['next_run'] = time.time() + delay
+            self._stop.wait(delay)
+
+    def start(self):
+        if self._threads or self.interval <= 0:
+            return
+        self._stop.clear()
+        for product in self.jobs:
+            thread = threading.Thread(target=self._loop, args=(product,), name=f'hcp-scheduler-{product}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    @property
+    def running(self):
+        return bool(self._threads)
+
+    def status(self):
+        with self._status_lock:
+            return {product: dict(status) for product, status in self._status.items()}
@@ -0,0 +1,119 @@
+import time
+
+from hashicorp_doctor.probes import probe_state
+
+# product key -> section title, in report order
+PRODUCTS = [
+    ('vault', 'Vault'),
+    ('consul', 'Consul'),
+    ('nomad', 'Nomad'),
+]
+
+
+def product_for_title(title):
+    """Product key for a section title ('Vault' -> 'vault'), or None."""
+    for product, product_title in PRODUCTS:
+        if title == product_title:
+            return product
+    return None
+
+
+def default_collectors():
+    from hashicorp_doctor.vault.diagnostics import run_vault_diagnostics
+    from hashicorp_doctor.consul_diag.diagnostics import run_consul_diagnostics
+    from hashicorp_doctor.nomad_diag.diagnostics import run_nomad_diagnostics
+    return {
+        'vault': run_vault_diagnostics,
+        'consul': run_consul_diagnostics,
+        'nomad': run_nomad_diagnostics,
+    }
+
+
+class Snapshot:
+    """
+    One collected set of diagnostics results. Collected once and handed to any
+    number of renderers, none of which query the clusters again.
+    """
+
+    def __init__(self, sections=None, collected_at=None, timings=None, probe_timings=None):
+        """
+        Args:
+            sections (dict): Section title -> product result, in report order.
+            collected_at (float): Epoch time of the oldest result in the snapshot.
+            timings (dict): Section title -> collection time in seconds.
+            probe_timings (dict): Section title -> {result key: ProbeTiming.to_dict()}.
+        """
+        self.sections = dict(sections or {})
+        self.collected_at = time.time() if collected_at is None else collected_at
+        self.timings = dict(timings or {})
+        self.probe_timings = dict(probe_timings or {})
+        self.products = {title: product_for_title(title) for title in self.sections}
+        self._states = {}
+
+    def add(self, title, data, elapsed=None, product=None, probe_timings=None):
+        self.sections[title] = data
+        self.products[title] = product or product_for_title(title)
+        self._states.pop(title, None)
+        if elapsed is not None:
+            self.timings[title] = elapsed
+        if probe_timings:
+            self.probe_timings[title] = probe_timings
+
+    def states(self, title):
+        """Section key -> state for one product, classified once per snapshot."""
+        if title not in self._states:
+            data = self.sections.get(title)
+            product = self.products.get(title)
+            if isinstance(data, dict):
+                self._states[title] = {key: probe_state(product, key, value) for key, value in data.items()}
+            else:
+                self._states[title] = {}
+        return self._states[title]
+
+    def state(self, title, key):
+        return self.states(title).get(key, 'Unknown')
+
+    def to_dict(self):
+        return {
+            'collected_at': self.collected_at,
+            'timings': self.timings,
+            'probe_timings': self.probe_timings,
+            'sections': self.sections,
+            'states': {title: self.states(title) for title in self.sections},
+        }
+
+    @classmethod
+    def collect(cls, collectors=None, products=None):
+        """
+        Collect every product concurrently and return the snapshot.
+        Args:
+            collectors (dict): product -> collector; defaults to the live diagnostics.
+            products (list): Product keys to include; defaults to all.
+        """
+        from hashicorp_doctor.executor import run_in_order
+        collectors = collectors or default_collectors()
+        titles = dict(PRODUCTS)
+        wanted = [p for p, _ in PRODUCTS if (products is None or p in products) and p in collectors]
+        snapshot = cls()
+        for product, data, error, elapsed in run_in_order([(p, collectors[p]) for p in wanted]):
+            if error is not None:
+                data = {'error': f"{titles[product]} diagnostics failed: {error}"}
+            snapshot.add(titles[product], data, elapsed, product)
+        return snapshot
+
+    @classmethod
+    def from_cached(cls, cached, probe_timings=None, timings=None):
+        """
+        Build a snapshot from web cache entries (product -> CachedResult) and,
+        optionally, the per-probe timings and durations of those collections
+        (product -> dict and product -> seconds).
+        """
+        titles = dict(PRODUCTS)
+        probe_timings = probe_timings or {}
+        timings = timings or {}
+        collected_at = min((entry.stored_at for entry in cached.values()), default=None)
+        snapshot = cls(collected_at=collected_at)
+        for product, entry in cached.items():
+            snapshot.add(titles.get(product, product.capitalize()), entry.value, timings.get(product), product,
+                         probe_timings.get(product))
+        return snapshot
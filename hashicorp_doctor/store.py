@@ -0,0 +1,269 @@
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+from hashicorp_doctor.config import env_number
+from hashicorp_doctor.snapshot import Snapshot
+
+DEFAULT_STORE_PATH = os.path.join('~', '.hcp-doctor', 'history.db')
+DEFAULT_RETENTION_DAYS = 30.0
+DEFAULT_MAX_RUNS = 500
+# The web UI records every background collection of every product: a day's
+# worth at the default interval is kept apart from doctor and fleet runs
+DEFAULT_MAX_WEB_RUNS = 4320
+
+# product -> environment variable holding the address of the cluster it diagnoses
+TARGET_ENV = {
+    'vault': 'VAULT_ADDR',
+    'consul': 'CONSUL_HTTP_ADDR',
+    'nomad': 'NOMAD_ADDR',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    collected_at REAL NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sections (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    product TEXT,
+    target TEXT,
+    elapsed REAL,
+    ok INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    probe_timings BLOB,
+    PRIMARY KEY (run_id, title)
+);
+CREATE TABLE IF NOT EXISTS states (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    key TEXT NOT NULL,
+    state TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_collected_at ON runs (collected_at);
+CREATE INDEX IF NOT EXISTS sections_latest ON sections (product, target, run_id);
+CREATE INDEX IF NOT EXISTS states_check ON states (title, key, run_id);
+CREATE INDEX IF NOT EXISTS states_run ON states (run_id);
+"""
+
+
+def default_store_path():
+    """SQLite file holding run history (HCP_DOCTOR_STORE, default ~/.hcp-doctor/history.db; 'off' disables it)."""
+    return os.path.expanduser(os.environ.get('HCP_DOCTOR_STORE') or DEFAULT_STORE_PATH)
+
+
+def store_enabled():
+    return os.environ.get('HCP_DOCTOR_STORE', '').lower() not in ['off', 'false', '0', 'no']
+
+
+def default_retention_days():
+    """Days a stored run is kept (HCP_DOCTOR_STORE_RETENTION_DAYS, default 30, 0 keeps runs forever)."""
+    return env_number('HCP_DOCTOR_STORE_RETENTION_DAYS', DEFAULT_RETENTION_DAYS, float)
+
+
+def default_max_runs():
+    """Stored runs kept before the oldest are pruned (HCP_DOCTOR_STORE_MAX_RUNS, default 500)."""
+    return env_number('HCP_DOCTOR_STORE_MAX_RUNS', DEFAULT_MAX_RUNS, int)
+
+
+def default_max_web_runs():
+    """Web UI collections kept before the oldest are pruned (HCP_DOCTOR_STORE_MAX_WEB_RUNS, default 4320)."""
+    return env_number('HCP_DOCTOR_STORE_MAX_WEB_RUNS', DEFAULT_MAX_WEB_RUNS, int)
+
+
+def current_target(product):
+    """Address of the cluster a product is diagnosed against, as configured in the environment."""
+    address = os.environ.get(TARGET_ENV.get(product, ''), '')
+    for prefix in ('http://', 'https://'):
+        if address.startswith(prefix):
+            address = address[len(prefix):]
+    return address.rstrip('/')
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, default=str).encode())
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob)) if blob is not None else None
+
+
+def _counts(snapshot, title):
+    data = snapshot.sections[title]
+    if not isinstance(data, dict):
+        return 0, 0, 1
+    states = snapshot.states(title)
+    ok = sum(1 for state in states.values() if state in ['Good', 'Healthy'])
+    errors = sum(1 for value in data.values() if isinstance(value, str) and value.startswith('Error'))
+    return ok, len(states), errors + (1 if 'error' in data else 0)
+
+
+class SnapshotStore:
+    """
+    Run history in a local SQLite file. Each saved snapshot becomes a run with
+    its per-section results (zlib-compressed JSON), states, timings and
+    health counts, so reports and trends can be served from disk without
+    querying a cluster. Old runs are pruned on every save; web UI collections
+    are capped by max_web_runs so they never push out doctor and fleet runs.
+    """
+
+    def __init__(self, path=None, retention_days=None, max_runs=None, max_web_runs=None):
+        self.path = path or default_store_path()
+        self.retention_days = default_retention_days() if retention_days is None else retention_days
+        self.max_runs = default_max_runs() if max_runs is None else max_runs
+        self.max_web_runs = default_max_web_runs() if max_web_runs is None else max_web_runs
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        # One short-lived connection per call keeps the store safe to share between web threads
+        db = sqlite3.connect(self.path, timeout=10)
+        db.execute('PRAGMA foreign_keys = ON')
+        db.execute('PRAGMA journal_mode = WAL')
+        return _Closing(db)
+
+    def save(self, snapshot, source='doctor', targets=None):
+        """
+        Record a snapshot as one run and prune old runs.
+        Args:
+            source (str): What produced it: 'doctor', 'fleet' or 'web'.
+            targets (dict): Section title -> cluster address; defaults to the
+                environment's address for each product section.
+        Returns:
+            int: The new run id.
+        """
+        targets = targets or {}
+        with self._connect() as db:
+            run_id = db.execute('INSERT INTO runs (collected_at, source) VALUES (?, ?)',
+                                (snapshot.collected_at, source)).lastrowid
+            for position, (title, data) in enumerate(snapshot.sections.items()):
+                product = snapshot.products.get(title)
+                target = targets.get(title, current_target(product) if product else None)
+                ok, total, errors = _counts(snapshot, title)
+                timings = snapshot.probe_timings.get(title)
+                db.execute('INSERT INTO sections VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                           (run_id, position, title, product, target, snapshot.timings.get(title), ok, total, errors,
+                            _pack(data), _pack(timings) if timings else None))
+                db.executemany('INSERT INTO states VALUES (?, ?, ?, ?)',
+                               [(run_id, title, key, state) for key, state in snapshot.states(title).items()])
+            self._prune(db, source)
+        return run_id
+
+    def _prune(self, db, source):
+        if self.retention_days > 0:
+            db.execute('DELETE FROM runs WHERE collected_at < ?', (time.time() - self.retention_days * 86400,))
+        # Only the pool the new run joined can have grown past its cap
+        web = source == 'web'
+        limit = self.max_web_runs if web else self.max_runs
+        if limit > 0:
+            pool = "source = 'web'" if web else "source != 'web'"
+            db.execute(f'DELETE FROM runs WHERE {pool} AND id NOT IN '
+                       f'(SELECT id FROM runs WHERE {pool} ORDER BY collected_at DESC, id DESC LIMIT ?)', (limit,))
+
+    def runs(self, limit=20, source=None):
+        """
+        Most recent runs first, as dicts with id, collected_at, source and
+        sections (title -> {'ok', 'total', 'errors', 'elapsed'}).
+        """
+        query = 'SELECT id, collected_at, source FROM runs'
+        params = []
+        if source:
+            query += ' WHERE source = ?'
+            params.append(source)
+        query += ' ORDER BY collected_at DESC, id DESC LIMIT ?'
+        params.append(limit)
+        with self._connect() as db:
+            runs = [{'id': row[0], 'collected_at': row[1], 'source': row[2], 'sections': {}}
+                    for row in db.execute(query, params)]
+            for run in runs:
+                for title, ok, total, errors, elapsed in db.execute(
+                        'SELECT title, ok, total, errors, elapsed FROM sections WHERE run_id = ? ORDER BY position',
+                        (run['id'],)):
+                    run['sections'][title] = {'ok': ok, 'total': total, 'errors': errors, 'elapsed': elapsed}
+        return runs
+
+    def load(self, run_id=None):
+        """Rebuild the Snapshot of a run (the latest when run_id is None), or None when there is none."""
+        with self._connect() as db:
+            if run_id is None:
+                row = db.execute('SELECT id, collected_at FROM runs ORDER BY collected_at DESC, id DESC LIMIT 1').fetchone()
+            else:
+                row = db.execute('SELECT id, collected_at FROM runs WHERE id = ?', (run_id,)).fetchone()
+            if row is None:
+                return None
+            snapshot = Snapshot(collected_at=row[1])
+            for title, product, elapsed, data, timings in db.execute(
+                    'SELECT title, product, elapsed, data, probe_timings FROM sections WHERE run_id = ? ORDER BY position',
+                    (row[0],)):
+                snapshot.add(title, _unpack(data), elapsed, product, _unpack(timings))
+        return snapshot
+
+    def latest(self, product, target=None):
+        """
+        (data, collected_at, probe_timings) of the newest stored result for a
+        product against target (default: the environment's address), or None.
+        """
+        target = current_target(product) if target is None else target
+        with self._connect() as db:
+            row = db.execute('SELECT s.data, r.collected_at, s.probe_timings FROM sections s JOIN runs r ON r.id = s.run_id '
+                             'WHERE s.product = ? AND s.target = ? ORDER BY r.collected_at DESC, r.id DESC LIMIT 1',
+                             (product, target)).fetchone()
+        if row is None:
+            return None
+        return _unpack(row[0]), row[1], _unpack(row[2]) or {}
+
+    def trend(self, title, key=None, limit=50):
+        """
+        State history of one section across runs, oldest first: dicts with
+        run_id, collected_at and, per check, its state ({key: state}).
+        """
+        query = ('SELECT r.id, r.collected_at, st.key, st.state FROM states st JOIN runs r ON r.id = st.run_id '
+                 'WHERE st.title = ?')
+        params = [title]
+        if key:
+            query += ' AND st.key = ?'
+            params.append(key)
+        query += ' AND r.id IN (SELECT run_id FROM sections WHERE title = ? ORDER BY run_id DESC LIMIT ?)'
+        params += [title, limit]
+        points = {}
+        with self._connect() as db:
+            for run_id, collected_at, check, state in db.execute(query, params):
+                points.setdefault(run_id, {'run_id': run_id, 'collected_at': collected_at, 'states': {}})
+                points[run_id]['states'][check] = state
+        return sorted(points.values(), key=lambda point: (point['collected_at'], point['run_id']))
+
+
+class _Closing:
+    """Commit (or roll back) and close a connection when the with block ends."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            if exc_type is None:
+                self.db.commit()
+            else:
+                self.db.rollback()
+        finally:
+            self.db.close()
+
+
+def default_store():
+    """The SnapshotStore configured by the environment, or None when HCP_DOCTOR_STORE is 'off'."""
+    if not store_enabled():
+        return None
+    return SnapshotStore()
@@ -0,0 +1,104 @@
+import codecs
+import json
+from collections import Counter
+
+_WHITESPACE = ' \t\n\r'
+
+
+class JsonArrayParser:
+    """
+    Push parser for a JSON array: feed() it chunks of bytes or str as they
+    arrive and it returns the elements completed so far. Only the element
+    being parsed is buffered, so arbitrarily large arrays use bounded memory.
+    Shared by the blocking and asyncio readers.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self.started = False
+        self.finished = False
+
+    def feed(self, chunk):
+        """
+        Returns:
+            list: Elements completed by this chunk.
+        Raises:
+            ValueError: If the stream is not a JSON array.
+        """
+        if self.finished:
+            return []
+        buf = self._buf + (self._utf8.decode(chunk) if isinstance(chunk, bytes) else chunk)
+        items = []
+        pos = 0
+        while True:
+            while pos < len(buf) and (buf[pos] in _WHITESPACE or (self.started and buf[pos] == ',')):
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not self.started:
+                if buf[pos] != '[':
+                    raise ValueError(f"Expected a JSON array, got {buf[pos]!r}")
+                self.started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                self.finished = True
+                break
+            try:
+                item, end = self._decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break
+            if end >= len(buf) and not isinstance(item, (dict, list, str)):
+                # A bare number or literal may continue in the next chunk
+                break
+            items.append(item)
+            pos = end
+        self._buf = buf[pos:]
+        return items
+
+    def close(self):
+        """Raises ValueError unless the closing bracket has been seen."""
+        if not self.finished:
+            raise ValueError("Truncated JSON array")
+
+
+def iter_json_array(chunks):
+    """
+    Incrementally parse a JSON array from an iterable of bytes or str chunks,
+    yielding each element as soon as it is complete.
+    Raises:
+        ValueError: If the stream is not a well-formed JSON array.
+    """
+    parser = JsonArrayParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.finished:
+            break
+    parser.close()
+
+
+class BoundedCounter:
+    """
+    Counter that keeps memory bounded when the number of distinct keys is
+    unbounded: once it holds more than 2 * capacity keys, only the capacity
+    largest counts are kept. Counts for frequent keys stay exact in practice;
+    rare keys may be dropped. total is always exact.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = Counter()
+        self.total = 0
+        self.pruned = False
+
+    def add(self, key, amount=1):
+        self.counts[key] += amount
+        self.total += amount
+        if len(self.counts) > 2 * self.capacity:
+            self.counts = Counter(dict(self.counts.most_common(self.capacity)))
+            self.pruned = True
+
+    def most_common(self, n=None):
+        return self.counts.most_common(n)
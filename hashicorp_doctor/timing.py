@@ -0,0 +1,94 @@
+import contextvars
+import time
+
+import aiohttp
+
+# Timing of the probe running in the current task; child tasks of a probe inherit it
+_current = contextvars.ContextVar('hcp_doctor_probe_timing', default=None)
+
+
+class ProbeTiming:
+    """
+    Where one probe spent its time. Phases are summed over every request the
+    probe makes (Vault replication status reads three endpoints), so they can
+    add up to more than total when those requests overlap.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.reused = 0      # requests served on an already open connection
+        self.dns = 0.0       # host name resolution
+        self.connect = 0.0   # TCP connect, including the TLS handshake on https
+        self.ttfb = 0.0      # request start until response headers arrived
+        self.total = 0.0     # whole probe, from when it got a slot until its value was ready
+        self.bytes = 0       # response bodies read
+        self.parse = 0.0     # JSON decoding and streaming summaries
+
+    def add_parse(self, started):
+        self.parse += time.monotonic() - started
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'reused': self.reused,
+            'dns': round(self.dns, 6),
+            'connect': round(self.connect, 6),
+            'ttfb': round(self.ttfb, 6),
+            'total': round(self.total, 6),
+            'bytes': self.bytes,
+            'parse': round(self.parse, 6),
+        }
+
+
+def current_timing():
+    """ProbeTiming of the probe running in this task, or None outside an instrumented probe."""
+    return _current.get()
+
+
+async def timed_probe(timing, factory):
+    """Await factory() with timing as the current ProbeTiming and record its total duration."""
+    token = _current.set(timing)
+    start = time.monotonic()
+    try:
+        return await factory()
+    finally:
+        timing.total += time.monotonic() - start
+        _current.reset(token)
+
+
+async def _dns_start(session, ctx, params):
+    ctx.dns_started = time.monotonic()
+
+
+async def _dns_end(session, ctx, params):
+    if ctx.trace_request_ctx is not None:
+        ctx.trace_request_ctx.dns += time.monotonic() - ctx.dns_started
+
+
+async def _connect_start(session, ctx, params):
+    ctx.connect_started = time.monotonic()
+
+
+async def _connect_end(session, ctx, params):
+    if ctx.trace_request_ctx is not None:
+        ctx.trace_request_ctx.connect += time.monotonic() - ctx.connect_started
+
+
+async def _connection_reused(session, ctx, params):
+    if ctx.trace_request_ctx is not None:
+        ctx.trace_request_ctx.reused += 1
+
+
+def trace_config():
+    """
+    aiohttp hooks feeding DNS and connect time into the ProbeTiming passed as
+    trace_request_ctx. aiohttp reports the TLS handshake as part of connection
+    creation, so it is counted in connect.
+    """
+    config = aiohttp.TraceConfig()
+    config.on_dns_resolvehost_start.append(_dns_start)
+    config.on_dns_resolvehost_end.append(_dns_end)
+    config.on_connection_create_start.append(_connect_start)
+    config.on_connection_create_end.append(_connect_end)
+    config.on_connection_reuseconn.append(_connection_reused)
+    return config
@@ -0,0 +1,66 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from hashicorp_doctor.executor import default_connect_timeout, default_pool_size, default_read_timeout
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default (connect, read) timeout to requests made without one."""
+
+    def __init__(self, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def get_session(product, address, verify=True, cert=None, pool_size=None):
+    """
+    Return the shared keep-alive session for one product/cluster address.
+    Every probe against the same cluster reuses the same connection pool, so
+    the TCP and TLS handshakes are paid once per cluster rather than once per
+    endpoint. Sessions are keyed by product, address and TLS settings. Requests
+    made without an explicit timeout get the default connect and read timeouts
+    (HCP_DOCTOR_CONNECT_TIMEOUT / HCP_DOCTOR_READ_TIMEOUT), so a blackholed node
+    cannot hang a caller for the OS TCP timeout.
+    Args:
+        product (str): 'vault', 'consul' or 'nomad'.
+        address (str): Base URL of the cluster, e.g. https://vault:8200.
+        verify (bool|str): TLS verification flag or CA bundle path.
+        cert (str|tuple): Optional client certificate.
+        pool_size (int): Connections kept alive for this cluster.
+    Returns:
+        requests.Session: The pooled session.
+    """
+    key = (product, address.rstrip('/'), verify, cert)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            size = pool_size or default_pool_size()
+            session = requests.Session()
+            adapter = TimeoutHTTPAdapter(timeout=(default_connect_timeout(), default_read_timeout()),
+                                         pool_connections=1, pool_maxsize=size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.verify = verify
+            if cert:
+                session.cert = cert
+            _sessions[key] = session
+    return session
+
+
+def close_sessions():
+    """Close and forget every pooled session."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
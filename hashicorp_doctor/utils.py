@@ -1,172 +1,167 @@
-from typing import Any
+from typing import Any, Callable, Dict, Optional, Tuple
 
-def get_section_state(section: str, value: Any) -> str:
+# (product, section) -> rule; product None holds the rules shared by every product
+_STATE_RULES: Dict[Tuple[Optional[str], str], Callable[[Any], Optional[str]]] = {}
+
+
+def register_state_rule(section: str, rule: Callable = None, product: str = None):
+    """
+    Register how a section is classified. rule(value) returns a state, or None
+    to defer: a product's rule defers to the shared rule for the section, and
+    the shared rule to 'Unknown'. Without rule, returns a decorator.
+    Args:
+        section (str): The section name.
+        rule (callable): value -> state or None.
+        product (str): 'vault', 'consul' or 'nomad'; None registers a shared rule.
+    """
+    if rule is None:
+        return lambda func: register_state_rule(section, func, product)
+    _STATE_RULES[(product, section)] = rule
+    return rule
+
+
+def get_section_state(section: str, value: Any, product: str = None) -> str:
     """
     Determine the health/state of a diagnostic section based on its value.
+    One dictionary lookup finds the rule; payloads are never stringified.
     Args:
         section (str): The section name.
         value (Any): The value to evaluate.
+        product (str): Product whose own rules are tried first.
     Returns:
         str: The state ('Good', 'Failed', 'Healthy', 'Unhealthy', 'Unknown').
     """
-    # Consul Autopilot Health/State logic
-    if section == 'autopilot_health' and isinstance(value, dict):
-        if value.get('Healthy') is True:
-            return 'Healthy'
-        elif value.get('Healthy') is False:
-            return 'Unhealthy'
-        else:
-            return 'Unknown'
-    if section == 'autopilot_state' and isinstance(value, dict):
-        if value.get('Healthy') is True:
-            return 'Healthy'
-        elif value.get('Healthy') is False:
-            return 'Unhealthy'
-        else:
-            return 'Unknown'
-    if section == 'license_report' and isinstance(value, dict):
-        if value.get('Valid') is True:
-            return 'Good'
-        elif value.get('Valid') is False:
-            return 'Failed'
-        else:
-            return 'Unknown'
-    if section == 'raft_peers':
-        if isinstance(value, list) and len(value) > 0:
-            return 'Good'
-        else:
-            return 'Failed'
-    if section == 'leader':
-        if isinstance(value, str) and value:
-            return 'Good'
-        elif isinstance(value, dict) and (value.get('ha_enabled') is False or value.get('is_self') or value.get('leader_address')):
-            return 'Good'
-        else:
-            return 'Failed'
-    if section == 'members':
-        if isinstance(value, list) and len(value) > 0:
-            return 'Good'
-        else:
-            return 'Failed'
-    if section == 'ha_status' and isinstance(value, dict):
-        nodes = value.get('nodes') or value.get('data', {}).get('nodes')
-        if nodes and any(n.get('active_node') for n in nodes if isinstance(n, dict)):
-            return 'Good'
-        else:
-            return 'Failed'
-    if section == 'system_health' and isinstance(value, dict):
-        if value.get('initialized') and not value.get('sealed') and not value.get('standby'):
-            return 'Good'
-        elif value.get('sealed'):
-            return 'Failed'
-        else:
-            return 'Unknown'
-    if section == 'seal_status' and isinstance(value, dict):
-        if value.get('sealed') is False:
-            return 'Good'
-        elif value.get('sealed') is True:
-            return 'Failed'
-        else:
-            return 'Unknown'
-    if section == 'license' and isinstance(value, dict):
-        if 'autoloaded' in value or 'expiration_time' in value:
-            return 'Good'
-        else:
-            return 'Unknown'
-    if section == 'replication_status' and isinstance(value, dict):
-        for k in ['dr', 'performance', 'summary']:
-            v = value.get(k, {})
-            if isinstance(v, dict) and v.get('mode') not in ['unsupported', None]:
-                return 'Good'
+    if product is not None:
+        rule = _STATE_RULES.get((product, section))
+        if rule is not None:
+            state = rule(value)
+            if state is not None:
+                return state
+    rule = _STATE_RULES.get((None, section))
+    if rule is not None:
+        state = rule(value)
+        if state is not None:
+            return state
+    return 'Unknown'
+
+
+def mentions(value, *phrases):
+    return isinstance(value, str) and any(phrase in value.lower() for phrase in phrases)
+
+
+def non_empty_list(value):
+    return 'Good' if isinstance(value, list) and value else 'Failed'
+
+
+# Consul Autopilot Health/State logic
+@register_state_rule('autopilot_health')
+@register_state_rule('autopilot_state')
+def _autopilot_health(value):
+    if isinstance(value, dict):
+        return {True: 'Healthy', False: 'Unhealthy'}.get(value.get('Healthy'), 'Unknown')
+    return None
+
+
+@register_state_rule('license_report')
+def _license_report(value):
+    if isinstance(value, dict):
+        return {True: 'Good', False: 'Failed'}.get(value.get('Valid'), 'Unknown')
+    return None
+
+
+register_state_rule('raft_peers', non_empty_list)
+
+
+@register_state_rule('leader')
+def _leader(value):
+    if isinstance(value, str) and value:
+        return 'Good'
+    if isinstance(value, dict) and (value.get('ha_enabled') is False or value.get('is_self') or value.get('leader_address')):
+        return 'Good'
+    return 'Failed'
+
+
+@register_state_rule('license')
+def _license(value):
+    if isinstance(value, dict):
+        return 'Good' if 'autoloaded' in value or 'expiration_time' in value else 'Unknown'
+    return None
+
+
+@register_state_rule('autopilot')
+def _autopilot(value):
+    if isinstance(value, dict) and not value.get('errors'):
+        return 'Good'
+    if mentions(value, 'not enabled'):
         return 'Unknown'
-    if section == 'autopilot':
-        if isinstance(value, dict) and not value.get('errors'):
-            return 'Good'
-        elif isinstance(value, str) and 'not enabled' in value.lower():
-            return 'Unknown'
-        elif isinstance(value, str) and 'error' in value.lower():
-            return 'Failed'
-        else:
-            return 'Unknown'
-    if section == 'rate_limit_quotas' and isinstance(value, dict):
-        return 'Good' if value else 'Unknown'
-    if section == 'lease_count_quota':
-        if isinstance(value, str) and 'no global lease count quota set' in value.lower():
-            return 'Unknown'
-        elif isinstance(value, dict) and value:
-            return 'Good'
-        elif isinstance(value, str) and 'error' in value.lower():
-            return 'Failed'
-        else:
-            return 'Unknown'
-    if section == 'token_lookup_self' and isinstance(value, dict):
-        if value.get('data', {}).get('id'):
-            return 'Good'
-        elif 'permission denied' in str(value).lower() or 'invalid token' in str(value).lower():
-            return 'Failed'
-        else:
-            return 'Unknown'
-    if section == 'catalog_nodes' and isinstance(value, list):
-        if value:
-            return 'Good'
-        else:
-            return 'Failed'
-    if section == 'acl_bootstrap':
-        if isinstance(value, dict) and value.get('ID'):
-            return 'Good'
-        elif isinstance(value, str) and 'not available' in value.lower():
-            return 'Unknown'
-        elif isinstance(value, str) and 'error' in value.lower():
-            return 'Failed'
-        else:
-            return 'Unknown'
-    if section == 'jobs' and isinstance(value, list):
-        if value:
-            return 'Good'
-        else:
-            return 'Failed'
-    if section == 'plugins':
-        if isinstance(value, str) and 'not available' in value.lower():
-            return 'Unknown'
-        elif isinstance(value, dict) and value:
-            return 'Good'
-        else:
-            return 'Unknown'
-    if section == 'cpu_percent':
-        if isinstance(value, (int, float)) and value < 90:
-            return 'Good'
-        elif isinstance(value, (int, float)) and value >= 90:
-            return 'Failed'
-        else:
-            return 'Unknown'
-    if section == 'memory' and isinstance(value, dict):
-        if value.get('percent', 0) < 90:
-            return 'Good'
-        elif value.get('percent', 0) >= 90:
-            return 'Failed'
-        else:
-            return 'Unknown'
-    if section == 'disk' and isinstance(value, dict):
-        if value.get('percent', 0) < 90:
-            return 'Good'
-        elif value.get('percent', 0) >= 90:
-            return 'Failed'
-        else:
-            return 'Unknown'
-    if section == 'os' and isinstance(value, str):
+    return 'Failed' if mentions(value, 'error') else 'Unknown'
+
+
+@register_state_rule('acl_bootstrap')
+def _acl_bootstrap(value):
+    if isinstance(value, dict) and value.get('ID'):
+        return 'Good'
+    if mentions(value, 'not available'):
+        return 'Unknown'
+    return 'Failed' if mentions(value, 'error') else 'Unknown'
+
+
+@register_state_rule('jobs')
+def _jobs(value):
+    if isinstance(value, list):
+        return 'Good' if value else 'Failed'
+    return None
+
+
+@register_state_rule('plugins')
+def _plugins(value):
+    if mentions(value, 'not available'):
+        return 'Unknown'
+    return 'Good' if isinstance(value, dict) and value else 'Unknown'
+
+
+@register_state_rule('cpu_percent')
+def _cpu_percent(value):
+    if isinstance(value, (int, float)):
+        return 'Good' if value < 90 else 'Failed'
+    return 'Unknown'
+
+
+@register_state_rule('memory')
+@register_state_rule('disk')
+def _usage_percent(value):
+    if isinstance(value, dict):
+        return 'Good' if value.get('percent', 0) < 90 else 'Failed'
+    return None
+
+
+@register_state_rule('os')
+def _os(value):
+    if isinstance(value, str):
         return 'Good' if value else 'Unknown'
-    if section == 'upgrade_precheck':
-        if isinstance(value, str) and 'no upgrade blockers' in value.lower():
-            return 'Good'
-        else:
-            return 'Unknown'
-    if section == 'snapshot_validation':
-        if isinstance(value, str) and 'not implemented' in value.lower():
-            return 'Unknown'
-        elif isinstance(value, str) and 'valid' in value.lower():
-            return 'Good'
-        else:
-            return 'Unknown'
-    if section == 'error':
+    return None
+
+
+@register_state_rule('upgrade_precheck')
+def _upgrade_precheck(value):
+    return 'Good' if mentions(value, 'no upgrade blockers') else 'Unknown'
+
+
+@register_state_rule('snapshot_validation')
+def _snapshot_validation(value):
+    if mentions(value, 'not implemented'):
+        return 'Unknown'
+    return 'Good' if mentions(value, 'valid') else 'Unknown'
+
+
+# Raft analytics derived from the autopilot payloads (hashicorp_doctor.raft)
+@register_state_rule('raft_analytics')
+def _raft_analytics(value):
+    if not isinstance(value, dict) or 'servers' not in value:
+        return None
+    if value.get('leader') is None or value.get('unhealthy') or value.get('lagging') or value.get('last_contact_outliers'):
         return 'Failed'
-    return 'Unknown'
+    return 'Good'
+
+
+register_state_rule('error', lambda value: 'Failed')
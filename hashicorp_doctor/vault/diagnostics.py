@@ -1,144 +1,307 @@
+import asyncio
 import os
-import hvac
 
-def run_vault_diagnostics():
-    # You can set VAULT_ADDR and VAULT_TOKEN as env vars or pass them here
-    vault_addr = os.environ.get('VAULT_ADDR', 'http://127.0.0.1:8200')
-    vault_token = os.environ.get('VAULT_TOKEN', None)
+from hashicorp_doctor.aio import AsyncHTTP, run_sync
+from hashicorp_doctor.executor import default_max_workers, default_probe_timeout, default_product_budget
+from hashicorp_doctor.probes import Probe, ProbeContext, register_probe, run_probe_set
+from hashicorp_doctor.raft import raft_analytics
+from hashicorp_doctor.utils import mentions, register_state_rule
+from hashicorp_doctor.vault.nodes import discover_nodes, probe_nodes
+
+
+def _data_or_raw(resp):
+    if resp and isinstance(resp, dict) and 'data' in resp:
+        return resp['data']
+    return resp
+
+
+# HA_STATUS
+async def _ha_status(ctx):
+    try:
+        ha_resp = await ctx.get('/v1/sys/ha-status')
+        if ha_resp and isinstance(ha_resp, dict):
+            return ha_resp
+        return 'No HA status information returned.'
+    except Exception as e:
+        return f"Error: {e}"
+
+
+# SYSTEM_HEALTH
+async def _system_health(ctx):
+    try:
+        health_resp = await ctx.get('/v1/sys/health')
+        if health_resp and isinstance(health_resp, dict):
+            return health_resp
+        return 'No health information returned.'
+    except Exception as e:
+        return f"Error: {e}"
+
+
+# TOKEN_LOOKUP_SELF
+async def _token_lookup_self(ctx):
+    try:
+        token_info = await ctx.get('/v1/auth/token/lookup-self')
+        if token_info:
+            return token_info
+    except Exception as e:
+        msg = str(e)
+        if 'permission denied' in msg or 'invalid token' in msg:
+            return 'Permission denied or invalid token. Please check your Vault token.'
+        return f"Error: {msg}"
+    return None
+
+
+# SEAL_STATUS
+async def _seal_status(ctx):
+    try:
+        seal_status = await ctx.get('/v1/sys/seal-status')
+        if seal_status:
+            return seal_status
+    except Exception as e:
+        return f"Error: {e}"
+    return None
+
+
+# LEADER
+async def _leader(ctx):
+    try:
+        leader = await ctx.get('/v1/sys/leader')
+        if leader:
+            return leader
+    except Exception as e:
+        return f"Error: {e}"
+    return None
+
+
+# LICENSE
+async def _license(ctx):
+    try:
+        license_resp = await ctx.get('/v1/sys/license/status')
+        if license_resp and isinstance(license_resp, dict) and 'data' in license_resp:
+            return license_resp['data']
+        license_info = await ctx.get('/v1/sys/license')
+        if license_info and isinstance(license_info, dict):
+            if 'data' in license_info:
+                return license_info['data']
+            return license_info
+        return 'No license information returned (Vault OSS or insufficient permissions).'
+    except Exception as e:
+        msg = str(e) or 'No license information returned (Vault OSS or insufficient permissions).'
+        return f"Error: {msg}"
+
+
+# REPLICATION_STATUS (the three status calls run concurrently)
+REPLICATION_PATHS = {
+    'dr': '/v1/sys/replication/dr/status',
+    'performance': '/v1/sys/replication/performance/status',
+    'summary': '/v1/sys/replication/status',
+}
+
+
+async def _replication_status(ctx):
+    parts = await asyncio.gather(*[ctx.get(path) for path in REPLICATION_PATHS.values()], return_exceptions=True)
+    for part in parts:
+        if isinstance(part, Exception):
+            msg = str(part) or 'No replication status returned (feature not enabled or insufficient permissions).'
+            return f"Error: {msg}"
+    return {name: _data_or_raw(part) for name, part in zip(REPLICATION_PATHS, parts)}
+
+
+# CONFIG
+async def _config(ctx):
+    try:
+        return _data_or_raw(await ctx.get('/v1/sys/config/state/sanitized'))
+    except Exception as e:
+        return f"Error: {e}"
+
+
+# AUTOPILOT
+async def _autopilot(ctx):
+    try:
+        autopilot_resp = await ctx.get('/v1/sys/storage/raft/autopilot/state')
+        if autopilot_resp and isinstance(autopilot_resp, dict):
+            if 'errors' in autopilot_resp:
+                return f"Error: {autopilot_resp['errors']} (This endpoint is only available for Raft/Integrated Storage)"
+            return autopilot_resp
+        return 'Autopilot not enabled or not available (OSS or insufficient permissions).'
+    except Exception as e:
+        msg = str(e)
+        return f"Error: {msg} (Autopilot endpoint failed or not available)"
+
+
+# RATE_LIMIT_QUOTAS
+async def _rate_limit_quotas(ctx):
+    try:
+        return _data_or_raw(await ctx.get('/v1/sys/quotas/config'))
+    except Exception as e:
+        return f"Error: {e}"
+
+
+# LEASE_COUNT_QUOTA
+async def _lease_count_quota(ctx):
+    try:
+        # A 404 with {"errors": []} is returned as-is so it can be told apart from real failures
+        lease_quota_resp = await ctx.get('/v1/sys/quotas/lease-count/global-lease-count-quota', allow_errors=True)
+        # If Vault returns {"errors":[]} it means no quota is set
+        if lease_quota_resp and isinstance(lease_quota_resp, dict):
+            if 'errors' in lease_quota_resp and lease_quota_resp['errors'] == []:
+                return 'No global lease count quota set.'
+        return lease_quota_resp
+    except Exception as e:
+        return f"Error: {e}"
+
+
+# NODE_HEALTH (every HA member, only when all_nodes is requested)
+async def _node_health(ctx):
+    if not ctx.options.get('all_nodes'):
+        return None
+    try:
+        return await probe_nodes(ctx, await discover_nodes(ctx), limit=ctx.options.get('max_workers'),
+                                 budget=ctx.options.get('budget'))
+    except Exception as e:
+        return f"Error: {e}"
+
+
+def _node_health_state(value):
+    if not isinstance(value, dict) or 'nodes' not in value:
+        return None
+    if value['unreachable'] or value['sealed'] or len(value['active']) != 1:
+        return 'Failed'
+    return 'Good'
+
+
+@register_state_rule('ha_status', product='vault')
+def _ha_status_state(value):
+    if not isinstance(value, dict):
+        return None
+    nodes = value.get('nodes') or value.get('data', {}).get('nodes')
+    if nodes and any(n.get('active_node') for n in nodes if isinstance(n, dict)):
+        return 'Good'
+    return 'Failed'
+
+
+@register_state_rule('system_health', product='vault')
+def _system_health_state(value):
+    if not isinstance(value, dict):
+        return None
+    if value.get('initialized') and not value.get('sealed') and not value.get('standby'):
+        return 'Good'
+    return 'Failed' if value.get('sealed') else 'Unknown'
+
+
+@register_state_rule('seal_status', product='vault')
+def _seal_status_state(value):
+    if isinstance(value, dict):
+        return {False: 'Good', True: 'Failed'}.get(value.get('sealed'), 'Unknown')
+    return None
+
+
+@register_state_rule('replication_status', product='vault')
+def _replication_status_state(value):
+    if not isinstance(value, dict):
+        return None
+    for k in ['dr', 'performance', 'summary']:
+        v = value.get(k, {})
+        if isinstance(v, dict) and v.get('mode') not in ['unsupported', None]:
+            return 'Good'
+    return 'Unknown'
+
+
+@register_state_rule('rate_limit_quotas', product='vault')
+def _rate_limit_quotas_state(value):
+    if isinstance(value, dict):
+        return 'Good' if value else 'Unknown'
+    return None
+
+
+@register_state_rule('lease_count_quota', product='vault')
+def _lease_count_quota_state(value):
+    if mentions(value, 'no global lease count quota set'):
+        return 'Unknown'
+    if isinstance(value, dict) and value:
+        return 'Good'
+    return 'Failed' if mentions(value, 'error') else 'Unknown'
+
+
+@register_state_rule('token_lookup_self', product='vault')
+def _token_lookup_self_state(value):
+    if not isinstance(value, dict):
+        return None
+    if value.get('data', {}).get('id'):
+        return 'Good'
+    # Only the API's error messages are inspected, not the (possibly large) token data
+    errors = value.get('errors')
+    if isinstance(errors, list) and any(mentions(e, 'permission denied', 'invalid token') for e in errors):
+        return 'Failed'
+    return 'Unknown'
+
+
+for _probe in [
+    Probe('vault', 'ha_status', '/v1/sys/ha-status', fetch=_ha_status, description='HA cluster nodes and active node'),
+    Probe('vault', 'system_health', '/v1/sys/health', fetch=_system_health, description='Initialized/sealed/standby health'),
+    Probe('vault', 'token_lookup_self', '/v1/auth/token/lookup-self', fetch=_token_lookup_self, description='Token used by the doctor'),
+    Probe('vault', 'seal_status', '/v1/sys/seal-status', fetch=_seal_status, description='Seal status'),
+    Probe('vault', 'leader', '/v1/sys/leader', fetch=_leader, description='HA leader'),
+    Probe('vault', 'license', '/v1/sys/license/status', fetch=_license, description='License (Enterprise)'),
+    Probe('vault', 'replication_status', '/v1/sys/replication/*', fetch=_replication_status, description='DR and performance replication'),
+    Probe('vault', 'config', '/v1/sys/config/state/sanitized', fetch=_config, description='Sanitized server configuration'),
+    Probe('vault', 'autopilot', '/v1/sys/storage/raft/autopilot/state', fetch=_autopilot, description='Raft autopilot state (integrated storage)'),
+    Probe('vault', 'rate_limit_quotas', '/v1/sys/quotas/config', fetch=_rate_limit_quotas, description='Rate limit quota configuration'),
+    Probe('vault', 'lease_count_quota', '/v1/sys/quotas/lease-count/global-lease-count-quota', fetch=_lease_count_quota, description='Global lease count quota'),
+    Probe('vault', 'node_health', '/v1/sys/health', fetch=_node_health, classify=_node_health_state,
+          description='Health, seal and raft state of every HA member (--all-nodes)'),
+]:
+    register_probe(_probe)
+
+
+async def run_vault_diagnostics_async(addr=None, token=None, verify=None, max_workers=None, probe_timeout=None, budget=None,
+                                      http=None, probes=None, skip_probes=None, timings=None, all_nodes=False):
+    """
+    Run the registered Vault probes on the running event loop, with up to
+    max_workers endpoints probed at once. Connection parameters default to
+    VAULT_ADDR, VAULT_TOKEN and VAULT_SKIP_VERIFY.
+    Args:
+        probe_timeout (float): Deadline for each endpoint (HCP_DOCTOR_PROBE_TIMEOUT).
+        budget (float): Deadline for the whole product (HCP_DOCTOR_PRODUCT_BUDGET);
+            endpoints still pending are cancelled and reported as timed out.
+        http (AsyncHTTP): Shared client; one is created (and closed) when omitted.
+        probes, skip_probes: Probe names to run or leave out (see select_probes()).
+        timings (dict): Filled with result key -> per-probe timing (see ProbeTiming).
+        all_nodes (bool): Also probe every HA member directly (node_health),
+            not just the node behind VAULT_ADDR.
+    """
+    vault_addr = addr or os.environ.get('VAULT_ADDR', 'http://127.0.0.1:8200')
+    vault_token = token if token is not None else os.environ.get('VAULT_TOKEN', None)
     if not vault_addr.startswith('http://') and not vault_addr.startswith('https://'):
         vault_addr = f'http://{vault_addr}'
-    skip_verify = os.environ.get('VAULT_SKIP_VERIFY', 'false').lower() in ['1', 'true', 'yes']
-    client = hvac.Client(url=vault_addr, token=vault_token, verify=not skip_verify)
+    if verify is None:
+        verify = os.environ.get('VAULT_SKIP_VERIFY', 'false').lower() not in ['1', 'true', 'yes']
+    max_workers = max_workers or default_max_workers()
+    probe_timeout = probe_timeout or default_probe_timeout()
+    budget = budget or default_product_budget()
+    owned = http is None
+    http = http or AsyncHTTP(limit_per_host=max_workers, timeout=probe_timeout)
+    ctx = ProbeContext(http, vault_addr, {'X-Vault-Token': vault_token} if vault_token else {}, verify,
+                       all_nodes=all_nodes, max_workers=max_workers, budget=budget)
     result = {}
     try:
-        # HA_STATUS
-        try:
-            ha_resp = client.adapter.get('/v1/sys/ha-status')
-            if ha_resp and isinstance(ha_resp, dict):
-                result['ha_status'] = ha_resp
-            else:
-                result['ha_status'] = 'No HA status information returned.'
-        except Exception as e:
-            result['ha_status'] = f"Error: {e}"
-        # SYSTEM_HEALTH
-        try:
-            health_resp = client.adapter.get('/v1/sys/health')
-            if health_resp and isinstance(health_resp, dict):
-                result['system_health'] = health_resp
-            else:
-                result['system_health'] = 'No health information returned.'
-        except Exception as e:
-            result['system_health'] = f"Error: {e}"
-        # TOKEN_LOOKUP_SELF
-        try:
-            token_info = client.auth.token.lookup_self()
-            if token_info:
-                result['token_lookup_self'] = token_info
-        except Exception as e:
-            msg = str(e)
-            if 'permission denied' in msg or 'invalid token' in msg:
-                result['token_lookup_self'] = 'Permission denied or invalid token. Please check your Vault token.'
-            else:
-                result['token_lookup_self'] = f"Error: {msg}"
-        # SEAL_STATUS
-        try:
-            seal_status = client.sys.read_seal_status()
-            if seal_status:
-                result['seal_status'] = seal_status
-        except Exception as e:
-            result['seal_status'] = f"Error: {e}"
-        # LEADER
-        try:
-            leader = client.sys.read_leader_status()
-            if leader:
-                result['leader'] = leader
-        except Exception as e:
-            result['leader'] = f"Error: {e}"
-        # LICENSE
-        try:
-            license_resp = client.adapter.get('/v1/sys/license/status')
-            if license_resp and isinstance(license_resp, dict) and 'data' in license_resp:
-                result['license'] = license_resp['data']
-            else:
-                license_info = client.sys.read_license()
-                if license_info and isinstance(license_info, dict):
-                    if 'data' in license_info:
-                        result['license'] = license_info['data']
-                    else:
-                        result['license'] = license_info
-                else:
-                    result['license'] = 'No license information returned (Vault OSS or insufficient permissions).'
-        except Exception as e:
-            msg = str(e) or 'No license information returned (Vault OSS or insufficient permissions).'
-            result['license'] = f"Error: {msg}"
-        # REPLICATION_STATUS
-        try:
-            rep_summary = {}
-            dr_resp = client.adapter.get('/v1/sys/replication/dr/status')
-            if dr_resp and isinstance(dr_resp, dict) and 'data' in dr_resp:
-                rep_summary['dr'] = dr_resp['data']
-            else:
-                rep_summary['dr'] = dr_resp
-            perf_resp = client.adapter.get('/v1/sys/replication/performance/status')
-            if perf_resp and isinstance(perf_resp, dict) and 'data' in perf_resp:
-                rep_summary['performance'] = perf_resp['data']
-            else:
-                rep_summary['performance'] = perf_resp
-            top_resp = client.adapter.get('/v1/sys/replication/status')
-            if top_resp and isinstance(top_resp, dict) and 'data' in top_resp:
-                rep_summary['summary'] = top_resp['data']
-            else:
-                rep_summary['summary'] = top_resp
-            result['replication_status'] = rep_summary
-        except Exception as e:
-            msg = str(e) or 'No replication status returned (feature not enabled or insufficient permissions).'
-            result['replication_status'] = f"Error: {msg}"
-        # CONFIG
-        try:
-            config_resp = client.adapter.get('/v1/sys/config/state/sanitized')
-            if config_resp and isinstance(config_resp, dict) and 'data' in config_resp:
-                result['config'] = config_resp['data']
-            else:
-                result['config'] = config_resp
-        except Exception as e:
-            result['config'] = f"Error: {e}"
-        # AUTOPILOT
-        try:
-            autopilot_resp = client.adapter.get('/v1/sys/storage/raft/autopilot/state')
-            if autopilot_resp and isinstance(autopilot_resp, dict):
-                if 'errors' in autopilot_resp:
-                    result['autopilot'] = f"Error: {autopilot_resp['errors']} (This endpoint is only available for Raft/Integrated Storage)"
-                else:
-                    result['autopilot'] = autopilot_resp
-            else:
-                result['autopilot'] = 'Autopilot not enabled or not available (OSS or insufficient permissions).'
-        except Exception as e:
-            msg = str(e)
-            result['autopilot'] = f"Error: {msg} (Autopilot endpoint failed or not available)"
-        # RATE_LIMIT_QUOTAS
-        try:
-            quotas_resp = client.adapter.get('/v1/sys/quotas/config')
-            if quotas_resp and isinstance(quotas_resp, dict) and 'data' in quotas_resp:
-                result['rate_limit_quotas'] = quotas_resp['data']
-            else:
-                result['rate_limit_quotas'] = quotas_resp
-        except Exception as e:
-            result['rate_limit_quotas'] = f"Error: {e}"
-
-        # LEASE_COUNT_QUOTA
-        try:
-            lease_quota_resp = client.adapter.get('/v1/sys/quotas/lease-count/global-lease-count-quota')
-            # If Vault returns {"errors":[]} it means no quota is set
-            if lease_quota_resp and isinstance(lease_quota_resp, dict):
-                if 'errors' in lease_quota_resp and lease_quota_resp['errors'] == []:
-                    result['lease_count_quota'] = 'No global lease count quota set.'
-                else:
-                    result['lease_count_quota'] = lease_quota_resp
-            else:
-                result['lease_count_quota'] = lease_quota_resp
-        except Exception as e:
-            result['lease_count_quota'] = f"Error: {e}"
+        result = await run_probe_set('vault', ctx, probes, skip_probes, timeout=probe_timeout, limit=max_workers,
+                                     budget=budget, timings=timings)
     except Exception as e:
         result['error'] = f"Vault connection or authentication failed: {e}"
+    finally:
+        if owned:
+            await http.close()
     cleaned = {k: v for k, v in result.items() if v not in [None, '', {}, []]}
+    analytics = raft_analytics('vault', cleaned)
+    if analytics is not None:
+        cleaned['raft_analytics'] = analytics
     return cleaned
+
+
+def run_vault_diagnostics(addr=None, token=None, verify=None, max_workers=None, probe_timeout=None, budget=None,
+                          probes=None, skip_probes=None, timings=None, all_nodes=False):
+    """Blocking wrapper around run_vault_diagnostics_async()."""
+    return run_sync(run_vault_diagnostics_async(addr, token, verify, max_workers, probe_timeout, budget,
+                                                probes=probes, skip_probes=skip_probes, timings=timings,
+                                                all_nodes=all_nodes))
@@ -0,0 +1,114 @@
+from collections import Counter
+from urllib.parse import urlsplit
+
+from hashicorp_doctor.aio import gather_probes
+from hashicorp_doctor.executor import default_connect_timeout, default_max_workers, default_read_timeout
+from hashicorp_doctor.probes import ProbeContext
+
+# (result key, path) read from every node. All three are answered by the node
+# itself rather than forwarded to the active node, and need no token.
+NODE_PATHS = [
+    ('system_health', '/v1/sys/health'),
+    ('seal_status', '/v1/sys/seal-status'),
+    ('leader', '/v1/sys/leader'),
+]
+
+
+def _ha_nodes(ha_resp):
+    if not isinstance(ha_resp, dict):
+        return []
+    nodes = ha_resp.get('nodes') or (ha_resp.get('data') or {}).get('nodes') or []
+    return [(node.get('hostname') or node['api_address'], node['api_address'].rstrip('/'))
+            for node in nodes if isinstance(node, dict) and node.get('api_address')]
+
+
+def _raft_nodes(raft_resp, base_url):
+    # The raft configuration only has cluster addresses (port 8201); assume
+    # every node serves the API on the scheme and port VAULT_ADDR uses
+    servers = (((raft_resp or {}).get('data') or {}).get('config') or {}).get('servers') or []
+    base = urlsplit(base_url)
+    port = f":{base.port}" if base.port else ''
+    nodes = []
+    for server in servers:
+        host = (server.get('address') or '').rsplit(':', 1)[0]
+        if host:
+            nodes.append((server.get('node_id') or host, f"{base.scheme}://{host}{port}"))
+    return nodes
+
+
+async def discover_nodes(ctx):
+    """
+    (name, API address) of every HA member, from /v1/sys/ha-status or, when
+    that lists none, the raft configuration.
+    Raises:
+        ValueError: When neither endpoint names any node.
+    """
+    try:
+        nodes = _ha_nodes(await ctx.get('/v1/sys/ha-status'))
+    except Exception:
+        nodes = []
+    if not nodes:
+        nodes = _raft_nodes(await ctx.get('/v1/sys/storage/raft/configuration'), ctx.base_url)
+    if not nodes:
+        raise ValueError('no HA members found in sys/ha-status or the raft configuration')
+    return nodes
+
+
+def summarize_node(address, results):
+    """Compact per-node view of the system_health, seal_status and leader responses."""
+    node = {'api_address': address}
+    errors = {key: str(value) for key, value in results.items() if isinstance(value, Exception)}
+    health = results.get('system_health') if isinstance(results.get('system_health'), dict) else {}
+    seal = results.get('seal_status') if isinstance(results.get('seal_status'), dict) else {}
+    leader = results.get('leader') if isinstance(results.get('leader'), dict) else {}
+    node['reachable'] = len(errors) < len(results)
+    node['initialized'] = health.get('initialized', seal.get('initialized'))
+    node['sealed'] = seal.get('sealed', health.get('sealed'))
+    if seal.get('sealed'):
+        node['unseal_progress'] = f"{seal.get('progress', 0)}/{seal.get('t')}"
+    node['standby'] = health.get('standby')
+    node['performance_standby'] = health.get('performance_standby')
+    node['active'] = leader.get('is_self')
+    node['version'] = health.get('version') or seal.get('version')
+    node['raft_committed_index'] = leader.get('raft_committed_index')
+    node['raft_applied_index'] = leader.get('raft_applied_index')
+    if errors:
+        node['errors'] = errors
+    return {key: value for key, value in node.items() if value is not None}
+
+
+def summarize_nodes(nodes):
+    """Cluster-wide view of the per-node summaries: who is sealed, unreachable or active, versions and raft lag."""
+    reachable = {name: node for name, node in nodes.items() if node['reachable']}
+    committed = [node['raft_committed_index'] for node in reachable.values() if 'raft_committed_index' in node]
+    applied = [node['raft_applied_index'] for node in reachable.values() if 'raft_applied_index' in node]
+    return {
+        'total': len(nodes),
+        'reachable': len(reachable),
+        'active': sorted(name for name, node in reachable.items() if node.get('active')),
+        'sealed': sorted(name for name, node in reachable.items() if node.get('sealed')),
+        'unreachable': sorted(name for name in nodes if name not in reachable),
+        'versions': dict(Counter(node['version'] for node in reachable.values() if 'version' in node)),
+        'raft_index_lag': max(committed) - min(applied) if committed and applied else None,
+        'nodes': nodes,
+    }
+
+
+async def probe_nodes(ctx, nodes, limit=None, timeout=None, budget=None):
+    """
+    Read NODE_PATHS from every node concurrently, at most limit requests at
+    once, and return summarize_nodes() of the results. Every request gets
+    one connect and one read window by default, so a dead node is reported
+    as unreachable instead of exhausting the probe's own deadline; requests
+    still unanswered after budget seconds are reported the same way.
+    """
+    contexts = {name: ProbeContext(ctx.http, address, verify=ctx.verify) for name, address in nodes}
+    # standby (429), sealed (503) and similar answers still carry the health body
+    probes = [((name, key), (lambda node=contexts[name], path=path: node.get(path, allow_errors=True)))
+              for name, _ in nodes for key, path in NODE_PATHS]
+    collected = await gather_probes(probes, timeout=timeout or default_connect_timeout() + default_read_timeout(),
+                                    limit=limit or default_max_workers(), budget=budget)
+    summaries = {}
+    for name, address in nodes:
+        summaries[name] = summarize_node(address, {key: collected[(name, key)] for key, _ in NODE_PATHS})
+    return summarize_nodes(summaries)
@@ -1,178 +1,276 @@
-from flask import Flask, render_template_string, jsonify, send_file
+from flask import Flask, Response, render_template_string, jsonify, send_file, request, stream_with_context
 import json
+from html import escape
 import io
-from hashicorp_doctor.utils import get_section_state
-from hashicorp_doctor.vault.diagnostics import run_vault_diagnostics
-from hashicorp_doctor.consul_diag.diagnostics import run_consul_diagnostics
-from hashicorp_doctor.nomad_diag.diagnostics import run_nomad_diagnostics
+import threading
+import time
+from hashicorp_doctor.aio import AsyncHTTP, BackgroundLoop, run_sync
+from hashicorp_doctor.cache import ResultCache, CachedResult
+from hashicorp_doctor.live import LiveHub
+from hashicorp_doctor.executor import run_in_order, run_as_completed
+from hashicorp_doctor.scheduler import CollectionScheduler
+from hashicorp_doctor.snapshot import Snapshot, PRODUCTS
+from hashicorp_doctor.renderers import RENDERERS, render, iter_html
+from hashicorp_doctor.raft import RaftTrend
+from hashicorp_doctor.metrics import CONTENT_TYPE, cache_metrics, render_metrics, snapshot_metrics
+from hashicorp_doctor.store import current_target, default_store
+from hashicorp_doctor.vault.diagnostics import run_vault_diagnostics_async
+from hashicorp_doctor.consul_diag.diagnostics import run_consul_diagnostics_async
+from hashicorp_doctor.nomad_diag.diagnostics import run_nomad_diagnostics_async
+from hashicorp_doctor.nomad_diag.events import NomadEventStream
 
 app = Flask(__name__)
 
+# product -> (env var holding the target address, async collector)
+COLLECTORS = {
+    'vault': ('VAULT_ADDR', run_vault_diagnostics_async),
+    'consul': ('CONSUL_HTTP_ADDR', run_consul_diagnostics_async),
+    'nomad': ('NOMAD_ADDR', run_nomad_diagnostics_async),
+}
+
+result_cache = ResultCache()
+scheduler = None
+# product -> per-probe timings and duration of the collection last stored in result_cache
+probe_timings = {}
+collection_timings = {}
+# (cache signature, metric lines) of the results last exported by /metrics
+_metrics_cache = (None, [])
+# cache key -> RaftTrend over the raft analytics of successive collections
+raft_trends = {}
+# Per-section changes pushed to every open dashboard through /events
+live_hub = LiveHub()
+# SnapshotStore shared by every request, opened on first use (False when HCP_DOCTOR_STORE is off)
+_history = None
+
+# Every collection runs on one long-lived loop, with one AsyncHTTP per cache key,
+# so repeated collections of a cluster reuse its keep-alive connections
+_collection_loop = None
+_http_clients = {}
+_http_lock = threading.Lock()
+
+# Nomad event stream followed in a background thread from the first /nomad/live request on
+nomad_events = None
+_nomad_events_lock = threading.Lock()
+
+
+def _refresh_requested():
+    return request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+
+
+def cache_key(product):
+    return (product, current_target(product))
+
+
+def history_store():
+    """The run history store, or None when it is disabled or cannot be opened."""
+    global _history
+    if _history is None:
+        try:
+            _history = default_store() or False
+        except Exception as e:
+            app.logger.warning(f"Run history disabled: {e}")
+            _history = False
+    return _history or None
+
+
+def record(product, value, timings, elapsed):
+    """Save one collected product to the run history; failures never affect the response."""
+    store = history_store()
+    if store is None:
+        return
+    title = dict(PRODUCTS)[product]
+    try:
+        store.save(Snapshot({title: value}, timings={title: elapsed}, probe_timings={title: timings}), source='web')
+    except Exception as e:
+        app.logger.warning(f"Could not record {title} run: {e}")
+
+
+def publish_live(product, value):
+    """Push a product's new result to the dashboards; only changed sections are sent."""
+    title = dict(PRODUCTS)[product]
+    live_hub.publish(product, value, Snapshot({title: value}).states(title))
+
+
+def warm_cache():
+    """
+    Seed the result cache with the newest stored result of each product for
+    the configured clusters, so the first page is served from disk.
+    Returns:
+        list: Products that were seeded.
+    """
+    store = history_store()
+    seeded = []
+    if store is None:
+        return seeded
+    for product in COLLECTORS:
+        key = cache_key(product)
+        try:
+            latest = store.latest(product, key[1])
+        except Exception as e:
+            app.logger.warning(f"Could not read run history: {e}")
+            break
+        if latest is not None and result_cache.peek(key) is None:
+            value, collected_at, timings = latest
+            result_cache.put(key, value, stored_at=collected_at)
+            probe_timings[product] = timings
+            publish_live(product, value)
+            seeded.append(product)
+    return seeded
+
+
+def collection_client(product):
+    """The shared event loop and the AsyncHTTP kept for the product's current target."""
+    global _collection_loop
+    with _http_lock:
+        if _collection_loop is None:
+            _collection_loop = BackgroundLoop('hcp-collect')
+        client = _http_clients.get(cache_key(product))
+        if client is None:
+            client = _http_clients[cache_key(product)] = AsyncHTTP()
+    return _collection_loop, client
+
+
+def timed_collector(product):
+    """The product's collector, recording its timings in probe_timings and collection_timings."""
+    _, collector = COLLECTORS[product]
+
+    def run():
+        timings = {}
+        start = time.monotonic()
+        loop, http = collection_client(product)
+        value = loop.run(collector(http=http, timings=timings))
+        collection_timings[product] = time.monotonic() - start
+        probe_timings[product] = timings
+        record(product, value, timings, collection_timings[product])
+        publish_live(product, value)
+        if isinstance(value, dict) and isinstance(value.get('raft_analytics'), dict):
+            raft_trends.setdefault(cache_key(product), RaftTrend()).add(value['raft_analytics'])
+        return value
+    return run
+
+
+def collect(product, refresh=False):
+    """Return the CachedResult for one product, collecting it only when stale or missing."""
+    return result_cache.get_or_collect(cache_key(product), timed_collector(product), refresh=refresh)
+
+
+def start_scheduler(interval=None):
+    """
+    Start background collection of every product. While it runs, cached results
+    do not expire on their own: the scheduler replaces them on every interval.
+    """
+    global scheduler
+    if scheduler is None:
+        jobs = {product: ((lambda p=product: cache_key(p)), timed_collector(product)) for product in COLLECTORS}
+        scheduler = CollectionScheduler(result_cache, jobs, interval=interval)
+    if scheduler.interval > 0:
+        result_cache.ttl = 0
+        scheduler.start()
+    return scheduler
+
+
+def start_nomad_events():
+    """Follow the Nomad event stream in a daemon thread (once) and return the NomadEventStream."""
+    global nomad_events
+    with _nomad_events_lock:
+        if nomad_events is None:
+            nomad_events = NomadEventStream(on_change=lambda key, value, state, previous:
+                                            live_hub.publish_section('nomad-live', key, value, state))
+            threading.Thread(target=run_sync, args=(nomad_events.run(),), name='hcp-nomad-events', daemon=True).start()
+    return nomad_events
+
+
+def collect_all(refresh=False):
+    """Return CachedResults for every product; misses are collected concurrently."""
+    cached = {}
+    for product, entry, error, _ in run_in_order([(p, lambda p=p: collect(p, refresh)) for p in COLLECTORS]):
+        if error is not None:
+            entry = CachedResult({'error': f"{product.capitalize()} diagnostics failed: {error}"}, time.time(), False)
+        cached[product] = entry
+    return cached
+
+
+def cache_headers(*entries):
+    """Response headers describing the cached results a response was built from."""
+    return {
+        'X-HCP-Doctor-Cache': 'HIT' if all(e.hit for e in entries) else 'MISS',
+        'X-HCP-Doctor-Cache-Age': f"{max(e.age for e in entries):.1f}",
+    }
+
+def current_snapshot(refresh=False):
+    """Return (Snapshot, cache entries) for all products, built from the shared cache."""
+    cached = collect_all(refresh)
+    return Snapshot.from_cached(cached, probe_timings, collection_timings), cached
+
+
+def report_response(fmt, as_attachment):
+    snapshot, cached = current_snapshot(_refresh_requested())
+    _, mimetype, extension = RENDERERS[fmt]
+    body = io.BytesIO(render(snapshot, fmt))
+    resp = send_file(body, mimetype=mimetype, as_attachment=as_attachment, download_name=f'hcp_doctor_report.{extension}')
+    resp.headers.update(cache_headers(*cached.values()))
+    return resp
+
+
 @app.route('/report/html')
 def report_html():
-    html_lines = []
-    html_lines.append("""
-<html><head><meta charset='utf-8'><title>HashiCorp Doctor Report</title>
-<style>
-body { font-family: Arial, sans-serif; margin: 2em; }
-h1 { color: #2d5fa4; }
-h2 { color: #1a3d6d; border-bottom: 1px solid #ccc; }
-.section { margin-bottom: 2em; }
-.state-good { color: green; font-weight: bold; }
-.state-failed { color: red; font-weight: bold; }
-.state-unknown { color: #888; font-weight: bold; }
-.state-healthy { color: green; font-weight: bold; }
-.state-unhealthy { color: red; font-weight: bold; }
-pre { background: #f8f8f8; border: 1px solid #ddd; padding: 8px; overflow-x: auto; }
-</style></head><body>
-<h1>HashiCorp Doctor Diagnostics Report</h1>
-""")
-    def html_section(title, data):
-        html_lines.append(f"<div class='section'><h2>{title}</h2>")
-        if isinstance(data, dict):
-            for key, value in data.items():
-                state = get_section_state(key, value)
-                state_class = {
-                    'Good': 'state-good', 'Healthy': 'state-healthy',
-                    'Failed': 'state-failed', 'Unhealthy': 'state-unhealthy',
-                    'Unknown': 'state-unknown'
-                }.get(state, 'state-unknown')
-                html_lines.append(f"<div><span class='{state_class}'>{key.upper()} - {state}</span></div>")
-                html_lines.append(f"<pre>{json.dumps(value, indent=4, default=str)}</pre>")
-        elif isinstance(data, list):
-            html_lines.append(f"<pre>{json.dumps(data, indent=2, default=str)}</pre>")
-        else:
-            html_lines.append(f"<pre>{str(data)}</pre>")
-        html_lines.append("</div>")
-    html_section('Vault', run_vault_diagnostics())
-    html_section('Consul', run_consul_diagnostics())
-    html_section('Nomad', run_nomad_diagnostics())
-    html_lines.append("</body></html>")
-    html_str = ''.join(html_lines)
-    return html_str, 200, {'Content-Type': 'text/html; charset=utf-8'}
+    refresh = _refresh_requested()
+    cached = {p: result_cache.get(cache_key(p)) for p in COLLECTORS}
+    if not refresh and all(cached.values()):
+        snapshot = Snapshot.from_cached(cached, probe_timings, collection_timings)
+        headers = cache_headers(*cached.values())
+        return Response(stream_with_context(iter_html(snapshot)), mimetype='text/html', headers=headers)
+    # Stream the header right away, then each product section as soon as its collector finishes.
+    titles = dict(PRODUCTS)
+
+    snapshot = Snapshot()
+
+    def sections():
+        tasks = [(p, lambda p=p: collect(p, refresh)) for p in COLLECTORS]
+        for product, entry, error, _ in run_as_completed(tasks):
+            data = entry.value if error is None else {'error': f"{titles[product]} diagnostics failed: {error}"}
+            if error is None and probe_timings.get(product):
+                snapshot.probe_timings[titles[product]] = probe_timings[product]
+            yield titles[product], data
+
+    headers = {'X-HCP-Doctor-Cache': 'MISS'}
+    return Response(stream_with_context(iter_html(snapshot, sections=sections())), mimetype='text/html', headers=headers)
 
 @app.route('/report/html/download')
 def report_html_download():
-    html_lines = []
-    html_lines.append("""
-<html><head><meta charset='utf-8'><title>HashiCorp Doctor Report</title>
-<style>
-body { font-family: Arial, sans-serif; margin: 2em; }
-h1 { color: #2d5fa4; }
-h2 { color: #1a3d6d; border-bottom: 1px solid #ccc; }
-.section { margin-bottom: 2em; }
-.state-good { color: green; font-weight: bold; }
-.state-failed { color: red; font-weight: bold; }
-.state-unknown { color: #888; font-weight: bold; }
-.state-healthy { color: green; font-weight: bold; }
-.state-unhealthy { color: red; font-weight: bold; }
-pre { background: #f8f8f8; border: 1px solid #ddd; padding: 8px; overflow-x: auto; }
-</style></head><body>
-<h1>HashiCorp Doctor Diagnostics Report</h1>
-""")
-    def html_section(title, data):
-        html_lines.append(f"<div class='section'><h2>{title}</h2>")
-        if isinstance(data, dict):
-            for key, value in data.items():
-                state = get_section_state(key, value)
-                state_class = {
-                    'Good': 'state-good', 'Healthy': 'state-healthy',
-                    'Failed': 'state-failed', 'Unhealthy': 'state-unhealthy',
-                    'Unknown': 'state-unknown'
-                }.get(state, 'state-unknown')
-                html_lines.append(f"<div><span class='{state_class}'>{key.upper()} - {state}</span></div>")
-                html_lines.append(f"<pre>{json.dumps(value, indent=4, default=str)}</pre>")
-        elif isinstance(data, list):
-            html_lines.append(f"<pre>{json.dumps(data, indent=2, default=str)}</pre>")
-        else:
-            html_lines.append(f"<pre>{str(data)}</pre>")
-        html_lines.append("</div>")
-    html_section('Vault', run_vault_diagnostics())
-    html_section('Consul', run_consul_diagnostics())
-    html_section('Nomad', run_nomad_diagnostics())
-    html_lines.append("</body></html>")
-    html_bytes = ''.join(html_lines).encode('utf-8')
-    html_io = io.BytesIO(html_bytes)
-    html_io.seek(0)
-    return send_file(html_io, mimetype='text/html', as_attachment=True, download_name='hcp_doctor_report.html')
+    return report_response('html', as_attachment=True)
+
 @app.route('/report/txt')
 def report_txt():
-    import tempfile, os
-    txt_lines = []
-    txt_lines.append("HashiCorp Doctor Diagnostics Report\n")
-    def txt_section(title, data):
-        txt_lines.append(f"\n{'='*60}\n{title}\n{'='*60}\n")
-        if isinstance(data, dict):
-            for key, value in data.items():
-                state = get_section_state(key, value)
-                txt_lines.append(f"  {key.upper()} - {state}\n  {'-'*len(key)}\n")
-                txt_lines.append(json.dumps(value, indent=4, default=str) + "\n")
-        elif isinstance(data, list):
-            txt_lines.append(json.dumps(data, indent=2, default=str) + "\n")
-        else:
-            txt_lines.append(str(data) + "\n")
-    txt_section('Vault', run_vault_diagnostics())
-    txt_section('Consul', run_consul_diagnostics())
-    txt_section('Nomad', run_nomad_diagnostics())
-    with tempfile.NamedTemporaryFile('w+', delete=False, encoding='utf-8', suffix='.txt') as f:
-        f.writelines(txt_lines)
-        temp_path = f.name
-    return send_file(temp_path, mimetype='text/plain', as_attachment=True, download_name='hcp_doctor_report.txt')
-
-def generate_pdf_report():
-    from fpdf import FPDF
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Courier", size=12)
-    pdf.cell(0, 10, "HashiCorp Doctor Diagnostics Report", ln=True, align='C')
-    sections = [
-        ("Vault", run_vault_diagnostics()),
-        ("Consul", run_consul_diagnostics()),
-        ("Nomad", run_nomad_diagnostics()),
-    ]
-    for title, data in sections:
-        pdf.set_font("Courier", size=12)
-        pdf.cell(0, 10, f"[{title} Diagnostics]", new_x=None, new_y=None)
-        if isinstance(data, dict):
-            for key, value in data.items():
-                state = get_section_state(key, value)
-                pdf.set_font("Courier", size=10)
-                pdf.multi_cell(0, 6, f"{key.upper()} - {state}")
-                pdf.set_font("Courier", size=8)
-                text = json.dumps(value, indent=2, default=str)
-                for line in text.splitlines():
-                    i = 0
-                    while i < len(line):
-                        chunk = line[i:i+90]
-                        pdf.multi_cell(0, 5, chunk)
-                        i += 90
-        elif isinstance(data, list):
-            pdf.set_font("Courier", size=8)
-            text = json.dumps(data, indent=2, default=str)
-            for line in text.splitlines():
-                i = 0
-                while i < len(line):
-                    chunk = line[i:i+90]
-                    pdf.multi_cell(0, 5, chunk)
-                    i += 90
-        else:
-            pdf.set_font("Courier", size=8)
-            text = str(data)
-            for line in text.splitlines():
-                i = 0
-                while i < len(line):
-                    chunk = line[i:i+90]
-                    pdf.multi_cell(0, 5, chunk)
-                    i += 90
-    pdf_bytes = pdf.output(dest='S').encode('latin1')
-    return io.BytesIO(pdf_bytes)
+    return report_response('txt', as_attachment=True)
+
+@app.route('/report/json')
+def report_json():
+    return report_response('json', as_attachment=False)
 
 @app.route('/report/pdf')
 def report_pdf():
-    pdf_io = generate_pdf_report()
-    pdf_io.seek(0)
-    return send_file(pdf_io, mimetype='application/pdf', as_attachment=True, download_name='hcp_doctor_report.pdf')
+    return report_response('pdf', as_attachment=True)
+
+@app.route('/metrics')
+def metrics():
+    """
+    Prometheus metrics for the latest cached results. Never collects: stale
+    results are exported as they are, products not collected yet are left out,
+    and the result lines are only rebuilt when the cache holds new results.
+    """
+    global _metrics_cache
+    cached = {p: result_cache.peek(cache_key(p)) for p in COLLECTORS}
+    cached = {p: entry for p, entry in cached.items() if entry is not None}
+    signature = tuple((p, entry.stored_at) for p, entry in cached.items())
+    if _metrics_cache[0] != signature:
+        snapshot = Snapshot.from_cached(cached, probe_timings, collection_timings)
+        collected_at = {title: cached[product].stored_at for title, product in snapshot.products.items()}
+        _metrics_cache = (signature, snapshot_metrics(snapshot, collected_at))
+    status = scheduler.status() if scheduler is not None and scheduler.running else None
+    lines = _metrics_cache[1] + cache_metrics(result_cache.stats(), status)
+    return Response(render_metrics(lines), mimetype=CONTENT_TYPE)
+
 
 @app.route('/')
 def index():
@@ -182,40 +280,170 @@ def index():
     <li><a href="/vault">Vault Diagnostics</a></li>
     <li><a href="/consul">Consul Diagnostics</a></li>
     <li><a href="/nomad">Nomad Diagnostics</a></li>
+    <li><a href="/nomad/live">Nomad Live (event stream)</a></li>
     <li><a href="/report/html" target="_blank"><b>View HTML Report</b></a></li>
     <li><a href="/report/html/download" download><b>Download HTML Report</b></a></li>
+    <li><a href="/report/txt" download>Download TXT Report</a></li>
+    <li><a href="/report/pdf" download>Download PDF Report</a></li>
+    <li><a href="/report/json" target="_blank">View JSON Report</a></li>
+    <li><a href="/metrics" target="_blank">Prometheus Metrics</a></li>
+    <li><a href="/raft" target="_blank">Raft Analytics (JSON)</a></li>
+    <li><a href="/history">Run History</a></li>
     </ul>
     ''')
 
 
-def render_diagnostics(title, data):
+# Patches the sections of a diagnostics page from /events; sections keep the ids render_diagnostics() gives them
+LIVE_SCRIPT = """
+<script>
+(function () {
+  var colors = {Good: 'green', Healthy: 'green', Failed: 'red', Unhealthy: 'red'};
+  function patch(section) {
+    var el = document.getElementById('section-' + section.key);
+    if (!el) {
+      el = document.createElement('div');
+      el.id = 'section-' + section.key;
+      el.style.marginBottom = '1em';
+      el.innerHTML = '<b></b><br><pre style="background:#f8f8f8;border:1px solid #ddd;padding:8px;"></pre>';
+      document.getElementById('sections').appendChild(el);
+    }
+    var label = el.querySelector('b');
+    label.textContent = section.key.toUpperCase() + ' - ' + section.state;
+    label.style.color = colors[section.state] || 'gray';
+    el.querySelector('pre').textContent = JSON.stringify(section.value, null, 4);
+  }
+  var source = new EventSource('/events?products=PRODUCT');
+  source.addEventListener('snapshot', function (e) { JSON.parse(e.data).forEach(patch); });
+  source.addEventListener('section', function (e) { patch(JSON.parse(e.data)); });
+  source.addEventListener('removed', function (e) {
+    var el = document.getElementById('section-' + JSON.parse(e.data).key);
+    if (el) { el.parentNode.removeChild(el); }
+  });
+})();
+</script>
+"""
+
+
+def render_diagnostics(title, data, states=None, heading=None, live=None):
     # Render HTML with section states and pretty JSON
-    html = f'<h2>{title} Diagnostics</h2>'
+    html = f'<h2>{heading or title + " Diagnostics"}</h2>'
+    html += '<div id="sections">'
     if isinstance(data, dict):
+        states = states or Snapshot({title: data}).states(title)
         for key, value in data.items():
-            state = get_section_state(key, value)
+            state = states[key]
             color = {'Good': 'green', 'Healthy': 'green', 'Failed': 'red', 'Unhealthy': 'red', 'Unknown': 'gray'}.get(state, 'gray')
-            html += f'<div style="margin-bottom:1em;">'
+            html += f'<div id="section-{key}" style="margin-bottom:1em;">'
             html += f'<b style="color:{color};">{key.upper()} - {state}</b><br>'
-            html += f'<pre style="background:#f8f8f8;border:1px solid #ddd;padding:8px;">{json.dumps(value, indent=4, default=str)}</pre>'
+            html += f'<pre style="background:#f8f8f8;border:1px solid #ddd;padding:8px;">{escape(json.dumps(value, indent=4, default=str), quote=False)}</pre>'
             html += '</div>'
     else:
-        html += f'<pre>{json.dumps(data, indent=4, default=str)}</pre>'
+        html += f'<pre>{escape(json.dumps(data, indent=4, default=str), quote=False)}</pre>'
+    html += '</div>'
+    if live:
+        html += LIVE_SCRIPT.replace('PRODUCT', live)
     html += '<a href="/">Back</a>'
     return html
 
 @app.route('/vault')
 def vault():
-    data = run_vault_diagnostics()
-    return render_template_string(render_diagnostics('Vault', data))
+    cached = collect('vault', _refresh_requested())
+    # Collected values come straight from the cluster, so the page is never run through Jinja
+    return Response(render_diagnostics('Vault', cached.value, live='vault'), mimetype='text/html', headers=cache_headers(cached))
 
 @app.route('/consul')
 def consul():
-
-    data = run_consul_diagnostics()
-    return render_template_string(render_diagnostics('Consul', data))
+    cached = collect('consul', _refresh_requested())
+    return Response(render_diagnostics('Consul', cached.value, live='consul'), mimetype='text/html', headers=cache_headers(cached))
 
 @app.route('/nomad')
 def nomad():
-    data = run_nomad_diagnostics()
-    return render_template_string(render_diagnostics('Nomad', data))
+    cached = collect('nomad', _refresh_requested())
+    return Response(render_diagnostics('Nomad', cached.value, live='nomad'), mimetype='text/html', headers=cache_headers(cached))
+
+
+@app.route('/nomad/live')
+def nomad_live():
+    stream = start_nomad_events()
+    html = render_diagnostics('Nomad', stream.results, stream.states, heading='Nomad Live', live='nomad-live')
+    status = 'connected' if stream.connected else 'connecting'
+    html = html.replace('</h2>', f'</h2><p>Event stream {status}: index {stream.view.index}, {stream.view.events} events applied.</p>', 1)
+    # Job and node names come straight from the cluster, so the page is never run through Jinja
+    return Response(html, mimetype='text/html')
+
+
+@app.route('/nomad/live/json')
+def nomad_live_json():
+    stream = start_nomad_events()
+    return jsonify({'connected': stream.connected, 'index': stream.view.index, 'events': stream.view.events,
+                    'results': stream.results, 'states': stream.states})
+
+
+@app.route('/events')
+def events():
+    """
+    Server-Sent Events with per-section changes (?products=vault,consul to
+    filter). Listeners only read what the shared collector published, so any
+    number of open dashboards cost the clusters nothing extra. A reconnecting
+    browser resumes from Last-Event-ID when the change is still held.
+    """
+    products = set(request.args.get('products', '').split(',')) - {''} or None
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(live_hub.listen(products, last_id)), mimetype='text/event-stream', headers=headers)
+
+
+@app.route('/raft')
+def raft():
+    """Latest raft analytics and their trend over the collections made by this process, per product, as JSON."""
+    report = {}
+    for product in COLLECTORS:
+        key = cache_key(product)
+        cached = result_cache.peek(key)
+        latest = cached.value.get('raft_analytics') if cached is not None and isinstance(cached.value, dict) else None
+        trend = raft_trends.get(key)
+        if latest is not None or trend is not None:
+            report[product] = {'latest': latest, 'trend': trend.summary() if trend is not None else {'samples': 0}}
+    return jsonify(report)
+
+
+@app.route('/history')
+def history():
+    store = history_store()
+    if store is None:
+        return render_template_string('<h1>Run History</h1><p>Run history is disabled (HCP_DOCTOR_STORE=off).</p><a href="/">Back</a>')
+    runs = store.runs(limit=request.args.get('limit', 50, type=int))
+    return render_template_string('''
+    <h1>Run History</h1>
+    <table border="1" cellpadding="4" style="border-collapse:collapse;">
+    <tr><th>Run</th><th>Collected</th><th>Source</th><th>Sections</th></tr>
+    {% for run in runs %}
+    <tr>
+      <td><a href="/history/{{ run.id }}">#{{ run.id }}</a></td>
+      <td>{{ run.collected }}</td>
+      <td>{{ run.source }}</td>
+      <td>{% for title, s in run.sections.items() %}{{ title }}: {{ s.ok }}/{{ s.total }} OK{% if s.errors %}, {{ s.errors }} errors{% endif %}<br>{% endfor %}</td>
+    </tr>
+    {% endfor %}
+    </table>
+    <a href="/">Back</a>
+    ''', runs=[dict(run, collected=time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(run['collected_at']))) for run in runs])
+
+
+@app.route('/history/<int:run_id>')
+def history_run(run_id):
+    store = history_store()
+    snapshot = store.load(run_id) if store is not None else None
+    if snapshot is None:
+        return Response(f"Run {run_id} not found", status=404, mimetype='text/plain')
+    return Response(stream_with_context(iter_html(snapshot, title=f"HashiCorp Doctor Run #{run_id}")), mimetype='text/html')
+
+
+@app.route('/history/trend')
+def history_trend():
+    """State history of one section (?section=Vault) or check (&key=seal_status) as JSON."""
+    store = history_store()
+    section = request.args.get('section', '')
+    if store is None or not section:
+        return jsonify({'error': 'run history is disabled' if store is None else 'section is required'}), 400
+    return jsonify(store.trend(section, request.args.get('key'), limit=request.args.get('limit', 50, type=int)))
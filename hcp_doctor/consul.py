@@ -1,16 +1,17 @@
 import os
-import requests
 import glob
 import json
+from hashicorp_doctor.transport import get_session
 """Consul health checks"""
 def check_consul_health(addr=None, token=None, profile='auto'):
     results = {"status": "ok", "details": [], "warnings": []}
     CONSUL_HTTP_ADDR = addr or os.environ.get("CONSUL_HTTP_ADDR", "http://127.0.0.1:8500")
     CONSUL_HTTP_TOKEN = token or os.environ.get("CONSUL_HTTP_TOKEN", None)
     headers = {"X-Consul-Token": CONSUL_HTTP_TOKEN} if CONSUL_HTTP_TOKEN else {}
+    session = get_session('consul', CONSUL_HTTP_ADDR)
     # --- Autopilot Health & State ---
     try:
-        r = requests.get(f"{CONSUL_HTTP_ADDR}/v1/operator/autopilot/health", headers=headers, timeout=5)
+        r = session.get(f"{CONSUL_HTTP_ADDR}/v1/operator/autopilot/health", headers=headers, timeout=5)
         results['details'].append({
             'endpoint': '/v1/operator/autopilot/health',
             'status_code': r.status_code,
@@ -26,7 +27,7 @@ def check_consul_health(addr=None, token=None, profile='auto'):
     return results
     # --- Autopilot Health & State ---
     try:
-        r = requests.get(f"{CONSUL_HTTP_ADDR}/v1/operator/autopilot/health", headers=headers, timeout=5)
+        r = session.get(f"{CONSUL_HTTP_ADDR}/v1/operator/autopilot/health", headers=headers, timeout=5)
         if r.status_code == 200:
             results['details'].append({'autopilot_health': r.json()})
         else:
@@ -4,19 +4,22 @@ import requests
 import glob
 import json
 import dateutil.parser
+from hashicorp_doctor.transport import get_session
+from hashicorp_doctor.nomad_diag.allocations import NomadAPIError, scan_allocations
 
 """Nomad health checks"""
 def check_nomad_health(addr=None, token=None, profile='auto'):
     NOMAD_ADDR = addr or os.environ.get("NOMAD_ADDR", "http://127.0.0.1:4646")
     NOMAD_TOKEN = token or os.environ.get("NOMAD_TOKEN", None)
     headers = {"X-Nomad-Token": NOMAD_TOKEN} if NOMAD_TOKEN else {}
+    session = get_session('nomad', NOMAD_ADDR)
     results = {"status": "ok", "details": [], "warnings": []}
 
     # --- Autopilot Operator State ---
 
     # --- Raft Configuration ---
     try:
-        r = requests.get(f"{NOMAD_ADDR}/v1/operator/raft/configuration", headers=headers, timeout=5)
+        r = session.get(f"{NOMAD_ADDR}/v1/operator/raft/configuration", headers=headers, timeout=5)
         if r.status_code == 200:
             results['details'].append({'raft_configuration': r.json()})
         else:
@@ -26,7 +29,7 @@ def check_nomad_health(addr=None, token=None, profile='auto'):
 
     # --- Peers ---
     try:
-        r = requests.get(f"{NOMAD_ADDR}/v1/status/peers", headers=headers, timeout=5)
+        r = session.get(f"{NOMAD_ADDR}/v1/status/peers", headers=headers, timeout=5)
         if r.status_code == 200:
             results['details'].append({'peers': r.json()})
         else:
@@ -38,7 +41,7 @@ def check_nomad_health(addr=None, token=None, profile='auto'):
     # Version and uptime check
     try:
     # datetime is imported at the top
-        r = requests.get(f"{NOMAD_ADDR}/v1/agent/self", headers=headers, timeout=5)
+        r = session.get(f"{NOMAD_ADDR}/v1/agent/self", headers=headers, timeout=5)
         if r.status_code == 200:
             agent = r.json().get('config', {})
             version = agent.get('Version')
@@ -106,10 +109,11 @@ def check_nomad_health(addr=None, token=None, profile='auto'):
     NOMAD_ADDR = addr or os.environ.get("NOMAD_ADDR", "http://127.0.0.1:4646")
     NOMAD_TOKEN = token or os.environ.get("NOMAD_TOKEN", None)
     headers = {"X-Nomad-Token": NOMAD_TOKEN} if NOMAD_TOKEN else {}
+    session = get_session('nomad', NOMAD_ADDR)
     results = {"status": "ok", "details": []}
     # Scheduler/leader health
     try:
-        r = requests.get(f"{NOMAD_ADDR}/v1/status/leader", headers=headers, timeout=5)
+        r = session.get(f"{NOMAD_ADDR}/v1/status/leader", headers=headers, timeout=5)
         if r.status_code == 200:
             try:
                 leader = r.json() if r.text else None
@@ -138,26 +142,24 @@ def check_nomad_health(addr=None, token=None, profile='auto'):
         results["status"] = "fail"
         results["details"].append(f"Leader check exception: {e}")
 
-    # Job allocations across clients
+    # Job allocations across clients (paged, streamed and aggregated, never held in memory)
     try:
-        r = requests.get(f"{NOMAD_ADDR}/v1/allocations", headers=headers, timeout=5)
-        if r.status_code == 200:
-            allocs = r.json()
-            if not allocs:
-                results["details"].append("No job allocations found.")
-            else:
-                failed = [a for a in allocs if a.get("ClientStatus") != "running"]
-                if failed:
-                    results["status"] = "fail"
-                    results["details"].append(f"Failed allocations: {len(failed)}")
+        summary = scan_allocations(session, NOMAD_ADDR, headers=headers)
+        if not summary['total']:
+            results["details"].append("No job allocations found.")
         else:
-            results["details"].append(f"Allocations API error: {r.status_code}")
+            results["details"].append({"allocations": summary})
+            if summary['not_running']:
+                results["status"] = "fail"
+                results["details"].append(f"Failed allocations: {summary['not_running']}")
+    except NomadAPIError as e:
+        results["details"].append(f"Allocations API error: {e.status_code}")
     except Exception as e:
         results["details"].append(f"Allocations check exception: {e}")
 
     # Plugin status (CSI, CNI)
     try:
-        r = requests.get(f"{NOMAD_ADDR}/v1/plugins", headers=headers, timeout=5)
+        r = session.get(f"{NOMAD_ADDR}/v1/plugins", headers=headers, timeout=5)
         if r.status_code == 200:
             plugins = r.json()
             for plugin in plugins:
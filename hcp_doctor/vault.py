@@ -1,18 +1,19 @@
 import os
-import requests
 import glob
 import json
 import datetime
+from hashicorp_doctor.transport import get_session
 """Vault health checks"""
 def check_vault_health(addr=None, token=None, profile='auto'):
     results = {"status": "ok", "details": [], "warnings": []}
     VAULT_ADDR = addr or os.environ.get("VAULT_ADDR", "http://127.0.0.1:8200")
     VAULT_TOKEN = token or os.environ.get("VAULT_TOKEN", None)
     headers = {"X-Vault-Token": VAULT_TOKEN} if VAULT_TOKEN else {}
+    session = get_session('vault', VAULT_ADDR)
 
     # --- DR & PR Replication Status ---
     try:
-        r = requests.get(f"{VAULT_ADDR}/v1/sys/replication/performance/status", headers=headers, timeout=5)
+        r = session.get(f"{VAULT_ADDR}/v1/sys/replication/performance/status", headers=headers, timeout=5)
         if r.status_code == 200:
             results['details'].append({'replication_performance_status': r.json()})
         else:
@@ -21,7 +22,7 @@ def check_vault_health(addr=None, token=None, profile='auto'):
         results['warnings'].append(f"Performance replication status check error: {e}")
 
     try:
-        r = requests.get(f"{VAULT_ADDR}/v1/sys/replication/dr/status", headers=headers, timeout=5)
+        r = session.get(f"{VAULT_ADDR}/v1/sys/replication/dr/status", headers=headers, timeout=5)
         if r.status_code == 200:
             results['details'].append({'replication_dr_status': r.json()})
         else:
@@ -31,7 +32,7 @@ def check_vault_health(addr=None, token=None, profile='auto'):
 
     # --- Raft (Integrated Storage) Checks ---
     try:
-        r = requests.get(f"{VAULT_ADDR}/v1/sys/storage/raft/configuration", headers=headers, timeout=5)
+        r = session.get(f"{VAULT_ADDR}/v1/sys/storage/raft/configuration", headers=headers, timeout=5)
         if r.status_code == 200:
             results['details'].append({'raft_configuration': r.json()})
         else:
@@ -40,7 +41,7 @@ def check_vault_health(addr=None, token=None, profile='auto'):
         results['warnings'].append(f"Raft configuration check error: {e}")
 
     try:
-        r = requests.get(f"{VAULT_ADDR}/v1/sys/storage/raft/autopilot/state", headers=headers, timeout=5)
+        r = session.get(f"{VAULT_ADDR}/v1/sys/storage/raft/autopilot/state", headers=headers, timeout=5)
         if r.status_code == 200:
             results['details'].append({'raft_autopilot_state': r.json()})
         else:
@@ -49,7 +50,7 @@ def check_vault_health(addr=None, token=None, profile='auto'):
         results['warnings'].append(f"Raft autopilot state check error: {e}")
 
     try:
-        r = requests.get(f"{VAULT_ADDR}/v1/sys/storage/raft/autopilot/configuration", headers=headers, timeout=5)
+        r = session.get(f"{VAULT_ADDR}/v1/sys/storage/raft/autopilot/configuration", headers=headers, timeout=5)
         if r.status_code == 200:
             results['details'].append({'raft_autopilot_config': r.json()})
         else:
@@ -59,7 +60,7 @@ def check_vault_health(addr=None, token=None, profile='auto'):
 
     # --- HA Status ---
     try:
-        r = requests.get(f"{VAULT_ADDR}/v1/sys/ha/status", headers=headers, timeout=5)
+        r = session.get(f"{VAULT_ADDR}/v1/sys/ha/status", headers=headers, timeout=5)
         if r.status_code == 200:
             results['details'].append({'ha_status': r.json()})
         else:
@@ -69,7 +70,7 @@ def check_vault_health(addr=None, token=None, profile='auto'):
     # ...existing code for all checks, properly indented inside this function...
     # Version and uptime check
     try:
-        r = requests.get(f"{VAULT_ADDR}/v1/sys/health", headers=headers, timeout=5)
+        r = session.get(f"{VAULT_ADDR}/v1/sys/health", headers=headers, timeout=5)
         if r.status_code == 200:
             health = r.json()
             version = health.get('version')
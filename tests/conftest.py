@@ -0,0 +1,10 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_history(tmp_path_factory):
+    # Keep runs recorded by CLI and web tests out of the user's ~/.hcp-doctor
+    os.environ['HCP_DOCTOR_STORE'] = str(tmp_path_factory.mktemp('history') / 'history.db')
+    yield
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from hashicorp_doctor.aio import APIError, AsyncHTTP, gather_probes, run_sync
+from hashicorp_doctor.executor import ProbeTimeout
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/v1/nodes':
+            status, body = 200, json.dumps([{'Node': f'n{i}'} for i in range(500)])
+        elif self.path == '/v1/leader':
+            status, body = 200, '"10.0.0.1:8300"'
+        else:
+            status, body = 403, json.dumps({'errors': ['permission denied']})
+        data = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+def test_async_http_reads_json_streams_arrays_and_raises_api_errors(server):
+    async def main():
+        async with AsyncHTTP(limit=4) as http:
+            leader = await http.get_json(f"{server}/v1/leader")
+            nodes = [node async for node in http.iter_json_array(f"{server}/v1/nodes")]
+            with pytest.raises(APIError) as excinfo:
+                await http.get_json(f"{server}/v1/secret")
+            body = await http.get_json(f"{server}/v1/secret", allow_errors=True)
+            return leader, nodes, excinfo.value, body
+    leader, nodes, error, body = run_sync(main())
+    assert leader == '10.0.0.1:8300'
+    assert len(nodes) == 500 and nodes[-1] == {'Node': 'n499'}
+    assert error.status_code == 403 and str(error) == '403 permission denied'
+    assert body == {'errors': ['permission denied']}
+
+
+def test_gather_probes_limits_concurrency_and_times_out():
+    active = []
+    peak = []
+
+    def probe(seconds, value):
+        async def run():
+            active.append(value)
+            peak.append(len(active))
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                active.remove(value)
+            return value
+        return run
+
+    probes = [('a', probe(0.1, 'a')), ('b', probe(0.1, 'b')), ('c', probe(0.1, 'c')), ('slow', probe(2, 'slow'))]
+    start = time.monotonic()
+    results = run_sync(gather_probes(probes, timeout=0.5, limit=2))
+    assert time.monotonic() - start < 1.5
+    assert max(peak) == 2
+    assert list(results) == ['a', 'b', 'c', 'slow']
+    assert results['a'] == 'a' and isinstance(results['slow'], ProbeTimeout)
+
+
+def test_run_sync_works_inside_a_running_loop():
+    async def inner():
+        return 42
+
+    async def outer():
+        return run_sync(inner())
+
+    assert asyncio.run(outer()) == 42
+
+
+def test_gather_probes_budget_cancels_pending_probes():
+    cancelled = []
+
+    def probe(seconds):
+        async def run():
+            try:
+                await asyncio.sleep(seconds)
+            except asyncio.CancelledError:
+                cancelled.append(seconds)
+                raise
+            return seconds
+        return run
+
+    start = time.monotonic()
+    results = run_sync(gather_probes([('fast', probe(0)), ('slow', probe(5)), ('queued', probe(5))],
+                                     timeout=10, limit=2, budget=0.3))
+    assert time.monotonic() - start < 1
+    assert results['fast'] == 0
+    assert str(results['slow']) == 'timed out (budget of 0.3s exhausted)'
+    assert isinstance(results['queued'], ProbeTimeout)
+    assert cancelled == [5, 5]
+
+
+def test_gather_probes_records_per_probe_timings(server):
+    async def main():
+        async with AsyncHTTP(limit=4) as http:
+            async def nodes():
+                return [node async for node in http.iter_json_array(f"{server}/v1/nodes")]
+            timings = {}
+            results = await gather_probes([('leader', lambda: http.get_json(f"{server}/v1/leader")), ('nodes', nodes)],
+                                          timings=timings)
+            return results, timings
+    results, timings = run_sync(main())
+    assert results['leader'] == '10.0.0.1:8300' and len(results['nodes']) == 500
+    leader, nodes = timings['leader'].to_dict(), timings['nodes'].to_dict()
+    assert leader['requests'] == 1 and leader['bytes'] == len('"10.0.0.1:8300"')
+    assert nodes['bytes'] == len(json.dumps([{'Node': f'n{i}'} for i in range(500)]))
+    assert 0 < leader['ttfb'] <= leader['total']
+    assert nodes['parse'] > 0 and leader['connect'] + nodes['connect'] > 0
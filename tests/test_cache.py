@@ -0,0 +1,46 @@
+import threading
+import time
+
+from hashicorp_doctor.cache import ResultCache
+
+
+def test_ttl_expiry_and_refresh():
+    cache = ResultCache(ttl=0.2, max_entries=4)
+    calls = []
+    collect = lambda: calls.append(1) or len(calls)
+    assert cache.get_or_collect('k', collect).value == 1
+    cached = cache.get_or_collect('k', collect)
+    assert cached.hit and cached.value == 1
+    assert cache.get_or_collect('k', collect, refresh=True).value == 2
+    time.sleep(0.25)
+    assert cache.get_or_collect('k', collect).value == 3
+
+
+def test_lru_eviction():
+    cache = ResultCache(ttl=60, max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a').value == 1 and cache.get('c').value == 3
+
+
+def test_single_flight_shares_one_collection():
+    cache = ResultCache(ttl=60)
+    calls = []
+
+    def slow_collect():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_collect('k', slow_collect).value))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [1]
+    assert results == ['result'] * 8
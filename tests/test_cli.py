@@ -35,3 +35,34 @@ def test_doctor_html(tmp_path):
     assert html_path.exists()
     content = html_path.read_text()
     assert '<html>' in content and 'HashiCorp Doctor Diagnostics Report' in content
+
+def test_doctor_json_and_txt_reports(tmp_path):
+    json_path = tmp_path / 'doctor_report.json'
+    txt_path = tmp_path / 'doctor_report.txt'
+    result = run_cli(['doctor', '--json', str(json_path), '--txt', str(txt_path)])
+    assert result.returncode == 0
+    assert '"Vault"' in json_path.read_text()
+    assert txt_path.read_text().startswith('HashiCorp Doctor Diagnostics Report')
+
+
+def _modules_after(args):
+    # Runs the CLI in-process in a fresh interpreter and reports which heavy modules it loaded
+    script = (
+        "import sys\n"
+        "from hashicorp_doctor.cli import cli\n"
+        f"cli.main({args!r}, standalone_mode=False)\n"
+        "print('MODULES:' + ','.join(m for m in ('hvac', 'consul', 'nomad', 'flask', 'aiohttp', 'requests',\n"
+        "    'hashicorp_doctor.vault.diagnostics', 'hashicorp_doctor.consul_diag.diagnostics') if m in sys.modules))\n"
+    )
+    env = dict(os.environ, NOMAD_ADDR='http://127.0.0.1:1', HCP_DOCTOR_PRODUCT_BUDGET='2')
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, env=env)
+    assert result.returncode == 0, result.stderr
+    return set(filter(None, result.stdout.rsplit('MODULES:', 1)[1].strip().split(',')))
+
+
+def test_help_imports_no_http_or_web_stack():
+    assert _modules_after(['--help']) == set()
+
+
+def test_nomad_command_imports_only_nomad_diagnostics():
+    assert _modules_after(['nomad']) == {'aiohttp'}
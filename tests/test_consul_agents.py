@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from hashicorp_doctor.aio import RateLimiter, run_sync
+from hashicorp_doctor.consul_diag.agents import AgentSample
+from hashicorp_doctor.consul_diag.diagnostics import run_consul_diagnostics
+from hashicorp_doctor.probes import probe_state
+
+SERVERS = ['127.0.0.1', '127.0.0.2', '127.0.0.3']
+CLIENTS = [f"127.0.1.{i}" for i in range(1, 51)]
+BROKEN = '127.0.0.3'
+
+
+def _member(addr, role):
+    return {'Name': f"{role}-{addr}", 'Addr': addr, 'Status': 1, 'Tags': {'role': role, 'dc': 'dc1'}}
+
+
+class _Agents:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.agents_seen = set()
+        self.member_reads = 0
+
+
+def _handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            addr = self.connection.getsockname()[0]
+            with state.lock:
+                state.in_flight += 1
+                state.peak = max(state.peak, state.in_flight)
+            try:
+                status = 200
+                if self.path == '/v1/agent/members':
+                    state.member_reads += 1
+                    body = [_member(a, 'consul') for a in SERVERS] + [_member(a, 'node') for a in CLIENTS]
+                elif addr == BROKEN:
+                    status, body = 500, {'errors': ['agent unavailable']}
+                elif self.path == '/v1/agent/self':
+                    time.sleep(0.02)
+                    state.agents_seen.add(addr)
+                    body = {'Config': {'Datacenter': 'dc1', 'Version': '1.17.1'},
+                            'Stats': {'consul': {'leader': str(addr == SERVERS[0]).lower(), 'known_servers': '3'}}}
+                elif self.path == '/v1/agent/metrics':
+                    body = {'Gauges': [{'Name': 'consul.runtime.num_goroutines', 'Value': 120.0},
+                                       {'Name': 'consul.runtime.alloc_bytes', 'Value': 52428800.0}]}
+                elif self.path == '/v1/agent/checks':
+                    critical = addr == SERVERS[1]
+                    body = {'serfHealth': {'Name': 'Serf Health Status', 'Status': 'passing'},
+                            'disk': {'Name': 'Disk', 'Status': 'critical' if critical else 'passing'}}
+                else:
+                    body = []
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+@pytest.fixture
+def agents():
+    state = _Agents()
+    httpd = ThreadingHTTPServer(('', 0), _handler(state))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    state.addr = f"http://127.0.0.1:{httpd.server_port}"
+    yield state
+    httpd.shutdown()
+
+
+def test_deep_mode_builds_a_bounded_per_agent_table(agents, monkeypatch):
+    monkeypatch.setenv('HCP_DOCTOR_MAX_WORKERS', '4')
+    monkeypatch.setenv('HCP_DOCTOR_AGENT_RATE', '1000')
+    result = run_consul_diagnostics(addr=agents.addr, probes={'members'}, deep=True, sample_clients=5)
+    summary = result['agents']
+    assert summary['servers'] == 3 and summary['clients_sampled'] == 5 and summary['clients_total'] == 50
+    assert [row['role'] for row in summary['agents']] == ['server'] * 3 + ['client'] * 5
+    assert summary['leaders'] == ['consul-127.0.0.1']
+    assert summary['unreachable'] == ['consul-127.0.0.3']
+    assert summary['with_critical_checks'] == ['consul-127.0.0.2']
+    leader = summary['agents'][0]
+    assert leader['goroutines'] == 120.0 and leader['checks'] == {'passing': 2} and leader['known_servers'] == 3
+    assert probe_state('consul', 'agents', summary) == 'Failed'
+    # 4 agents at a time, each with 3 requests in flight, plus nothing else
+    assert agents.peak <= 4 * 3
+    assert len(agents.agents_seen) == 7
+    # The members probe and the survey share one read of the list
+    assert agents.member_reads == 1
+    assert result['members']['total'] == 53
+
+
+def test_deep_mode_reads_members_without_the_members_probe(agents, monkeypatch):
+    monkeypatch.setenv('HCP_DOCTOR_AGENT_RATE', '1000')
+    result = run_consul_diagnostics(addr=agents.addr, probes={'leader'}, deep=True)
+    assert result['agents']['servers'] == 3 and 'members' not in result
+    assert agents.member_reads == 1
+
+
+def test_deep_mode_is_off_by_default(agents):
+    assert 'agents' not in run_consul_diagnostics(addr=agents.addr, probes={'members'})
+
+
+def test_agent_sample_keeps_servers_and_a_bounded_client_reservoir():
+    sample = AgentSample(sample_clients=10, seed=1)
+    for i in range(5000):
+        sample.add(_member(f"10.1.{i // 250}.{i % 250}", 'node'))
+    sample.add(_member('10.0.0.1', 'consul'))
+    sample.add(dict(_member('10.0.0.2', 'consul'), Status=4))
+    assert len(sample.clients) == 10 and sample.clients_seen == 5000
+    assert [agent['addr'] for agent in sample.servers] == ['10.0.0.1']
+
+
+def test_rate_limiter_spaces_requests():
+    async def main():
+        limiter = RateLimiter(rate=50)
+        start = time.monotonic()
+        for _ in range(11):
+            await limiter.wait()
+        return time.monotonic() - start
+    assert 0.18 <= run_sync(main()) < 0.5
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from hashicorp_doctor.aio import run_sync
+from hashicorp_doctor.nomad_diag.events import NomadClusterView, NomadEventStream
+
+
+def _alloc(alloc_id, job, node, status):
+    return {'ID': alloc_id, 'Namespace': 'default', 'JobID': job, 'NodeName': node, 'ClientStatus': status}
+
+
+def test_view_counts_follow_updates_without_rescanning():
+    view = NomadClusterView()
+    view.put_allocation(_alloc('a1', 'web', 'n1', 'running'))
+    view.put_allocation(_alloc('a2', 'web', 'n2', 'failed'))
+    view.put_node({'ID': 'n1', 'Status': 'ready', 'SchedulingEligibility': 'eligible'})
+    view.put_node({'ID': 'n2', 'Status': 'down', 'SchedulingEligibility': 'ineligible', 'Drain': True})
+
+    view.apply({'Topic': 'Allocation', 'Type': 'AllocationUpdated', 'Index': 20,
+                'Payload': {'Allocation': _alloc('a1', 'web', 'n1', 'failed')}})
+    view.apply({'Topic': 'Allocation', 'Type': 'AllocationUpdated', 'Index': 21,
+                'Payload': {'Allocation': _alloc('a2', 'web', 'n2', 'complete')}})
+    view.apply({'Topic': 'Node', 'Type': 'NodeDeregistration', 'Key': 'n2', 'Index': 22, 'Payload': {}})
+    view.apply({'Topic': 'Deployment', 'Type': 'DeploymentStatusUpdate', 'Index': 23,
+                'Payload': {'Deployment': {'ID': 'd2', 'JobID': 'web', 'Namespace': 'default', 'CreateIndex': 23, 'Status': 'failed'}}})
+    # An older deployment of the same job does not replace the latest
+    view.put_deployment({'ID': 'd1', 'JobID': 'web', 'Namespace': 'default', 'CreateIndex': 5, 'Status': 'successful'})
+
+    allocations = view.section('Allocation')
+    assert allocations['by_status'] == {'failed': 1, 'complete': 1}
+    assert allocations['failed_by_job'] == {'default/web': 1} and allocations['failed_by_node'] == {'n1': 1}
+    assert view.section('Node') == {'total': 1, 'by_status': {'ready': 1}, 'ineligible': 0, 'draining': 0}
+    assert view.section('Deployment')['failed'] == ['default/web']
+    assert view.index == 23 and view.events == 4
+
+
+class _FakeNomad:
+    def __init__(self):
+        self.events = queue.Queue()
+        self.requests = {}
+        self.stream_params = None
+        self.alloc_params = []
+
+
+def _handler(nomad):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _json(self, body, index, next_token=None):
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('X-Nomad-Index', str(index))
+            if next_token:
+                self.send_header('X-Nomad-NextToken', next_token)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            nomad.requests[url.path] = nomad.requests.get(url.path, 0) + 1
+            if url.path == '/v1/nodes':
+                self._json([{'ID': 'n1', 'Name': 'n1', 'Status': 'ready', 'SchedulingEligibility': 'eligible'}], 12)
+            elif url.path == '/v1/jobs':
+                self._json([{'ID': 'web', 'Namespace': 'default', 'Status': 'running'}], 10)
+            elif url.path == '/v1/deployments':
+                self._json([], 8)
+            elif url.path == '/v1/allocations':
+                nomad.alloc_params.append(parse_qs(url.query))
+                if 'next_token' in parse_qs(url.query):
+                    self._json([_alloc('a2', 'web', 'n1', 'complete')], 16)
+                else:
+                    self._json([_alloc('a1', 'web', 'n1', 'running')], 15, next_token='a2')
+            elif url.path == '/v1/event/stream':
+                nomad.stream_params = parse_qs(url.query)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                while True:
+                    frame = nomad.events.get()
+                    if frame is None:
+                        break
+                    self.wfile.write(json.dumps(frame).encode() + b'\n')
+                    self.wfile.flush()
+                self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+@pytest.fixture
+def nomad():
+    fake = _FakeNomad()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _handler(fake))
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    fake.addr = f"http://127.0.0.1:{httpd.server_port}"
+    yield fake
+    fake.events.put(None)
+    httpd.shutdown()
+
+
+def test_event_stream_seeds_from_lists_and_applies_events(nomad):
+    changes = []
+
+    async def main():
+        stream = NomadEventStream(nomad.addr, on_change=lambda key, value, state, previous: changes.append((key, state, previous)))
+        task = asyncio.ensure_future(stream.run())
+        await asyncio.sleep(0.3)
+        nomad.events.put({})  # heartbeat
+        nomad.events.put({'Index': 30, 'Events': [
+            {'Topic': 'Allocation', 'Type': 'AllocationUpdated', 'Index': 30,
+             'Payload': {'Allocation': _alloc('a1', 'web', 'n1', 'failed')}},
+            {'Topic': 'Node', 'Type': 'NodeRegistration', 'Index': 30,
+             'Payload': {'Node': {'ID': 'n1', 'Status': 'down', 'SchedulingEligibility': 'eligible'}}},
+        ]})
+        await asyncio.sleep(0.3)
+        stream.stop()
+        await task
+        return stream
+
+    stream = run_sync(main())
+    assert ('allocations', 'Good', None) in changes and ('allocations', 'Failed', 'Good') in changes
+    assert ('nodes', 'Failed', 'Good') in changes
+    assert stream.results['allocations']['failed_by_node'] == {'n1': 1}
+    assert stream.states['jobs'] == 'Good' and stream.view.index == 30
+    # Subscribed from the oldest list index, to every topic, and lists were read once
+    assert nomad.stream_params['index'] == ['8']
+    assert sorted(nomad.stream_params['topic']) == ['Allocation:*', 'Deployment:*', 'Job:*', 'Node:*']
+    assert nomad.requests['/v1/nodes'] == 1
+    # Allocations were paged through X-Nomad-NextToken
+    assert stream.results['allocations']['total'] == 2
+    assert [params.get('next_token') for params in nomad.alloc_params] == [None, ['a2']]
+    assert 'per_page' in nomad.alloc_params[0]
+
+
+def test_event_stream_reports_unreachable_cluster():
+    async def main():
+        stream = NomadEventStream('http://127.0.0.1:1')
+        await stream.run(duration=0.3)
+        return stream
+
+    stream = run_sync(main())
+    assert stream.results['error'].startswith('Error') and stream.states['error'] == 'Failed'
+    assert not stream.connected
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+import time
+
+from hashicorp_doctor.executor import run_in_order, run_as_completed, ProbeTimeout
+
+
+def _sleeper(seconds, value):
+    def probe():
+        time.sleep(seconds)
+        return value
+    return probe
+
+
+def test_run_in_order_yields_stable_order_with_timings():
+    def boom():
+        raise RuntimeError('down')
+    tasks = [('slow', _sleeper(0.3, 'a')), ('fast', _sleeper(0, 'b')), ('broken', boom)]
+    start = time.monotonic()
+    outcomes = list(run_in_order(tasks))
+    assert time.monotonic() - start < 0.6
+    assert [name for name, _, _, _ in outcomes] == ['slow', 'fast', 'broken']
+    assert outcomes[0][1] == 'a' and outcomes[0][3] >= 0.3
+    assert outcomes[1][1] == 'b' and outcomes[1][2] is None
+    assert isinstance(outcomes[2][2], RuntimeError)
+
+
+def test_run_as_completed_yields_fastest_first():
+    tasks = [('slow', _sleeper(0.3, 'a')), ('fast', _sleeper(0, 'b'))]
+    outcomes = list(run_as_completed(tasks))
+    assert [name for name, _, _, _ in outcomes] == ['fast', 'slow']
+
+
+def test_closing_run_in_order_early_cancels_queued_tasks():
+    ran = []
+    tasks = [(name, (lambda name=name: ran.append(name) or time.sleep(0.1))) for name in ['a', 'b', 'c']]
+    outcomes = run_in_order(tasks, max_workers=1)
+    assert next(outcomes)[0] == 'a'
+    outcomes.close()
+    time.sleep(0.3)
+    assert 'c' not in ran
+
+
+def test_run_in_order_reports_tasks_past_the_deadline_as_timed_out():
+    tasks = [('fast', _sleeper(0, 'a')), ('slow', _sleeper(1, 'b')), ('medium', _sleeper(0.1, 'c'))]
+    start = time.monotonic()
+    outcomes = list(run_in_order(tasks, deadline=0.3))
+    assert time.monotonic() - start < 0.8
+    assert [(name, result) for name, result, _, _ in outcomes] == [('fast', 'a'), ('slow', None), ('medium', 'c')]
+    assert isinstance(outcomes[1][2], ProbeTimeout) and 'run budget of 0.3s' in str(outcomes[1][2])
+
+
+def test_task_abandoned_at_the_deadline_does_not_hold_the_process_open():
+    code = ("import time\n"
+            "from hashicorp_doctor.executor import run_in_order\n"
+            "print(list(run_in_order([('stuck', lambda: time.sleep(30))], deadline=0.2))[0][2])\n")
+    start = time.monotonic()
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=20)
+    assert time.monotonic() - start < 5
+    assert 'run budget of 0.2s' in result.stdout
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from hashicorp_doctor.fleet import FLEET_SUMMARY_TITLE, load_inventory, parse_inventory, run_fleet
+
+
+def test_parse_inventory_resolves_explicit_params(monkeypatch):
+    monkeypatch.setenv('EAST_VAULT_TOKEN', 's.east')
+    clusters = parse_inventory({'clusters': [
+        {'name': 'east', 'vault': {'addr': 'https://vault:8200', 'token_env': 'EAST_VAULT_TOKEN'},
+         'nomad': 'http://nomad:4646'},
+        {'consul': {'addr': 'consul:8500', 'token': 't', 'skip_verify': True}},
+    ]})
+    assert clusters[0] == {'name': 'east', 'products': {
+        'vault': {'addr': 'https://vault:8200', 'token': 's.east'},
+        'nomad': {'addr': 'http://nomad:4646', 'token': ''},
+    }}
+    assert clusters[1]['name'] == 'cluster-2'
+    assert clusters[1]['products']['consul'] == {'addr': 'consul:8500', 'token': 't', 'verify': False}
+
+
+@pytest.mark.parametrize('data', [
+    {'clusters': []},
+    {'clusters': [{'name': 'a'}]},
+    {'clusters': [{'name': 'a', 'vault': {'token': 'x'}}]},
+    {'clusters': [{'name': 'a', 'nomad': 'n:4646'}, {'name': 'a', 'nomad': 'n:4646'}]},
+])
+def test_parse_inventory_rejects_bad_documents(data):
+    with pytest.raises(ValueError):
+        parse_inventory(data)
+
+
+def test_load_inventory_reads_json(tmp_path):
+    path = tmp_path / 'fleet.json'
+    path.write_text(json.dumps([{'name': 'a', 'consul': 'http://consul:8500'}]))
+    assert load_inventory(str(path))[0]['products']['consul']['addr'] == 'http://consul:8500'
+
+
+def test_run_fleet_bounds_workers_and_merges_clusters():
+    active = []
+    peak = []
+
+    async def consul(addr, token, http, **kwargs):
+        active.append(addr)
+        peak.append(len(active))
+        await asyncio.sleep(0.1)
+        active.remove(addr)
+        return {'leader': f"{addr}:8300", 'token_seen': token}
+
+    clusters = parse_inventory([{'name': f'c{i}', 'consul': f'http://consul{i}:8500'} for i in range(4)])
+    snapshot = run_fleet(clusters, max_workers=2, cluster_timeout=5, collectors={'consul': consul})
+    assert max(peak) == 2
+    assert list(snapshot.sections) == [FLEET_SUMMARY_TITLE] + [f'c{i} / Consul' for i in range(4)]
+    assert snapshot.sections['c3 / Consul']['leader'] == 'http://consul3:8500:8300'
+    assert snapshot.sections['c3 / Consul']['token_seen'] == ''
+    assert snapshot.sections[FLEET_SUMMARY_TITLE]['c0'] == {'Consul': '1/2 checks OK'}
+
+
+def test_run_fleet_keeps_finished_products_when_cluster_times_out():
+    cancelled = []
+
+    async def fast(**kwargs):
+        return {'leader': '10.0.0.1:4647'}
+
+    async def hung(**kwargs):
+        try:
+            await asyncio.sleep(2)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return {'leader': 'late'}
+
+    clusters = parse_inventory([{'name': 'slow', 'vault': 'http://vault:8200', 'nomad': 'http://nomad:4646'}])
+    start = time.monotonic()
+    snapshot = run_fleet(clusters, cluster_timeout=0.3, collectors={'vault': hung, 'nomad': fast})
+    assert time.monotonic() - start < 1.5
+    assert cancelled == [True]
+    assert snapshot.sections['slow / Nomad'] == {'leader': '10.0.0.1:4647'}
+    assert 'timed out' in snapshot.sections['slow / Vault']['error']
+    assert snapshot.sections[FLEET_SUMMARY_TITLE]['slow'] == {'Vault': 'Failed', 'Nomad': '1/1 checks OK'}
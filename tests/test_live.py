@@ -0,0 +1,62 @@
+import json
+import threading
+
+from hashicorp_doctor.live import LiveHub
+
+
+def _events(text):
+    """(event, data) pairs from SSE text."""
+    parsed = []
+    for block in text.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':'))
+        if fields:
+            parsed.append((fields['event'], json.loads(fields['data'])))
+    return parsed
+
+
+def test_publish_sends_only_changed_sections():
+    hub = LiveHub()
+    assert hub.publish('vault', {'seal_status': {'sealed': False}, 'leader': 'a'}, {'seal_status': 'Good', 'leader': 'Good'}) == 2
+    seq = hub.seq
+    assert hub.publish('vault', {'seal_status': {'sealed': False}, 'leader': 'a'}, {'seal_status': 'Good', 'leader': 'Good'}) == 0
+    assert hub.publish('vault', {'seal_status': {'sealed': True}}, {'seal_status': 'Failed'}) == 2
+
+    _, texts = hub.since(seq, timeout=0)
+    assert _events(''.join(texts)) == [
+        ('section', {'product': 'vault', 'key': 'seal_status', 'state': 'Failed', 'value': {'sealed': True}}),
+        ('removed', {'product': 'vault', 'key': 'leader'}),
+    ]
+    _, snapshot = hub.snapshot()
+    assert _events(snapshot) == [('snapshot', [{'product': 'vault', 'key': 'seal_status', 'state': 'Failed', 'value': {'sealed': True}}])]
+
+
+def test_listeners_share_events_and_resync_after_falling_behind():
+    hub = LiveHub(history=2)
+    hub.publish('consul', {'leader': 'a'}, {'leader': 'Good'})
+    listeners = [hub.listen({'consul'}, keepalive=1) for _ in range(3)]
+    first = [next(listener) for listener in listeners]
+    assert all(_events(text)[0][0] == 'snapshot' for text in first)
+
+    received = []
+    thread = threading.Thread(target=lambda: received.append(next(listeners[0])))
+    thread.start()
+    hub.publish('vault', {'leader': 'x'}, {'leader': 'Good'})  # filtered out for these listeners
+    hub.publish('consul', {'leader': 'b'}, {'leader': 'Good'})
+    thread.join(2)
+    # The vault change wakes nobody up; the consul one arrives as a single section event
+    assert [event for event, _ in _events(''.join(received))] == ['section']
+
+    # Listener 1 is now further behind than the history holds: it gets a fresh snapshot
+    for leader in 'cde':
+        hub.publish('consul', {'leader': leader}, {'leader': 'Good'})
+    event, data = _events(next(listeners[1]))[0]
+    assert event == 'snapshot' and data[0]['value'] == 'e'
+
+
+def test_listen_resumes_from_last_event_id():
+    hub = LiveHub()
+    hub.publish('nomad', {'leader': 'a'}, {'leader': 'Good'})
+    last = hub.seq
+    hub.publish('nomad', {'leader': 'b'}, {'leader': 'Good'})
+    events = _events(next(hub.listen(last_seq=last)))
+    assert events == [('section', {'product': 'nomad', 'key': 'leader', 'state': 'Good', 'value': 'b'})]
@@ -0,0 +1,23 @@
+from hashicorp_doctor.metrics import cache_metrics, render_metrics, snapshot_metrics
+from hashicorp_doctor.snapshot import Snapshot
+
+
+def test_snapshot_metrics_cover_states_errors_and_probe_timings():
+    timing = {'requests': 1, 'dns': 0.0, 'connect': 0.002, 'ttfb': 0.25, 'parse': 0.0001, 'total': 0.3, 'bytes': 64}
+    snapshot = Snapshot({'Consul': {'leader': '10.0.0.1:8300', 'raft_peers': 'Error: 403 "denied"'}},
+                        timings={'Consul': 0.5}, probe_timings={'Consul': {'leader': timing}})
+    body = render_metrics(snapshot_metrics(snapshot, {'Consul': 1760000000.25}))
+    assert 'hcp_doctor_check_state{product="consul",check="leader",state="Good"} 1' in body
+    assert 'hcp_doctor_check_healthy{product="consul",check="raft_peers"} 0' in body
+    assert 'hcp_doctor_check_errors{product="consul"} 1' in body
+    assert 'hcp_doctor_probe_duration_seconds{product="consul",probe="leader",phase="ttfb"} 0.25' in body
+    assert 'hcp_doctor_probe_response_bytes{product="consul",probe="leader"} 64' in body
+    assert 'hcp_doctor_last_collection_timestamp_seconds{product="consul"} 1760000000.25' in body
+    assert body.endswith('\n')
+
+
+def test_cache_metrics_report_hit_ratio_and_scheduler_status():
+    lines = cache_metrics({'entries': 2, 'hits': 3, 'misses': 1},
+                          {'vault': {'runs': 4, 'failures': 2, 'last_run': None, 'next_run': None}})
+    assert 'hcp_doctor_cache_hit_ratio 0.75' in lines
+    assert 'hcp_doctor_collection_consecutive_failures{product="vault"} 2' in lines
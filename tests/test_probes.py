@@ -0,0 +1,65 @@
+import pytest
+
+from hashicorp_doctor.aio import run_sync
+from hashicorp_doctor.probes import (
+    PROBES, Probe, load_probes, parse_addr, probe_state, register_probe, run_probe_set, select_probes, validate_probe_names,
+)
+
+
+class _Context:
+    def __init__(self, responses):
+        self.responses = responses
+        self.paths = []
+
+    async def get(self, path, allow_errors=False):
+        self.paths.append(path)
+        value = self.responses[path]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+def test_registry_lists_every_product_in_report_order():
+    load_probes()
+    assert list(PROBES) == ['vault', 'consul', 'nomad']
+    assert list(PROBES['consul'])[:3] == ['members', 'raft_peers', 'leader']
+    assert PROBES['vault']['replication_status'].path == '/v1/sys/replication/*'
+
+
+def test_select_probes_by_product_key_and_name(monkeypatch):
+    load_probes()
+    monkeypatch.delenv('HCP_DOCTOR_PROBES', raising=False)
+    monkeypatch.delenv('HCP_DOCTOR_SKIP_PROBES', raising=False)
+    assert [p.key for p in select_probes('nomad', only={'leader', 'nomad.scheduler'})] == ['leader', 'scheduler']
+    assert select_probes('vault', only={'consul'}) == []
+    consul = [p.key for p in select_probes('consul', skip={'catalog_nodes', 'members'})]
+    assert 'members' not in consul and 'catalog_nodes' not in consul and 'leader' in consul
+    monkeypatch.setenv('HCP_DOCTOR_SKIP_PROBES', 'vault.license, vault.config')
+    assert {'license', 'config'}.isdisjoint(p.key for p in select_probes('vault'))
+    validate_probe_names({'vault', 'leader', 'consul.members'})
+    with pytest.raises(ValueError, match='Unknown probe'):
+        validate_probe_names({'consul.nope'})
+
+
+def test_run_probe_set_parses_classifies_and_reports_errors(monkeypatch):
+    monkeypatch.setitem(PROBES, 'test', {})
+
+    async def version(ctx):
+        return (await ctx.get('/v1/version'))['version']
+    register_probe(Probe('test', 'version', '/v1/version', fetch=version,
+                         classify=lambda value: 'Good' if value.startswith('1.') else 'Failed'))
+    register_probe(Probe('test', 'broken', '/v1/broken'))
+    ctx = _Context({'/v1/version': {'version': '1.17.2'}, '/v1/broken': RuntimeError('503 unavailable')})
+    result = run_sync(run_probe_set('test', ctx, only=None, skip=None))
+    assert result == {'version': '1.17.2', 'broken': 'Error: 503 unavailable'}
+    assert probe_state('test', 'version', '1.17.2') == 'Good'
+    assert probe_state('test', 'version', '0.9.0') == 'Failed'
+    assert probe_state('test', 'version', 'Error: 503 unavailable') == 'Unknown'
+    assert run_sync(run_probe_set('test', ctx, only={'test.version'}, skip=None)) == {'version': '1.17.2'}
+    with pytest.raises(ValueError):
+        Probe('test', 'nothing')
+
+
+def test_parse_addr_fills_in_scheme_and_port():
+    assert parse_addr('consul.service:8501', 8500) == 'http://consul.service:8501'
+    assert parse_addr('https://nomad.example/', 4646) == 'https://nomad.example:4646'
@@ -0,0 +1,96 @@
+from hashicorp_doctor.metrics import render_metrics, snapshot_metrics
+from hashicorp_doctor.probes import probe_state
+from hashicorp_doctor.raft import RaftTrend, analyze, cluster_model, duration_seconds, raft_analytics
+from hashicorp_doctor.snapshot import Snapshot
+
+VAULT_STATE = {'data': {'healthy': True, 'failure_tolerance': 1, 'servers': {
+    'vault-0': {'name': 'vault-0', 'status': 'leader', 'healthy': True, 'last_index': 1000, 'last_contact': '0s'},
+    'vault-1': {'name': 'vault-1', 'status': 'voter', 'healthy': True, 'last_index': 998, 'last_contact': '12ms'},
+    'vault-2': {'name': 'vault-2', 'status': 'voter', 'healthy': True, 'last_index': 995, 'last_contact': '15ms'},
+}}}
+
+
+def _health(lags, contacts=None, leader='nomad-0'):
+    contacts = contacts or {}
+    return {'Healthy': True, 'FailureTolerance': 1, 'Servers': [
+        {'ID': f"id-{i}", 'Name': f"nomad-{i}", 'Leader': f"nomad-{i}" == leader, 'Voter': True, 'Healthy': True,
+         'LastIndex': 5000 - lag, 'LastContact': contacts.get(i, '10ms')}
+        for i, lag in enumerate(lags)]}
+
+
+def test_duration_seconds_parses_go_durations():
+    assert duration_seconds('1m2.5s') == 62.5
+    assert duration_seconds('150µs') == 0.00015
+    assert duration_seconds('12ms') == 0.012
+    assert duration_seconds('soon') is None and duration_seconds(None) is None
+
+
+def test_vault_consul_and_nomad_payloads_share_one_model():
+    vault = cluster_model('vault', {'autopilot': VAULT_STATE})
+    consul = cluster_model('consul', {'autopilot_state': {'Healthy': True, 'FailureTolerance': 1, 'Servers': {
+        'a1': {'Name': 'consul-0', 'Status': 'leader', 'Healthy': True, 'LastIndex': 40, 'LastContact': '0s'},
+        'a2': {'Name': 'consul-1', 'Status': 'non-voter', 'Healthy': True, 'LastIndex': 39, 'LastContact': '5ms'},
+    }}, 'autopilot_health': 'Error: 403 "Permission denied"'})
+    nomad = cluster_model('nomad', {'autopilot_health': 'Error: 500', 'raft_configuration': {'Servers': [
+        {'ID': 'n1', 'Node': 'nomad-0.global', 'Leader': True, 'Voter': True},
+        {'ID': 'n2', 'Node': 'nomad-1.global', 'Leader': False, 'Voter': True},
+    ]}})
+    assert [s['name'] for s in vault['servers'] if s['leader']] == ['vault-0']
+    assert vault['servers'][1]['last_contact'] == 0.012
+    assert [(s['name'], s['voter']) for s in consul['servers']] == [('consul-0', True), ('consul-1', False)]
+    assert [s['name'] for s in nomad['servers'] if s['leader']] == ['nomad-0.global']
+    assert nomad['servers'][1]['last_index'] is None
+    assert cluster_model('nomad', {'leader': '10.0.0.1:4647'}) is None
+
+
+def test_analyze_reports_lag_outliers_and_failure_tolerance():
+    analysis = analyze(cluster_model('nomad', {'autopilot_health': _health([0, 3, 400, 1], {3: '900ms'})}))
+    assert analysis['leader'] == 'nomad-0' and analysis['leader_index'] == 5000
+    assert analysis['voters'] == 4 and analysis['quorum'] == 3 and analysis['even_voters'] is True
+    assert analysis['max_commit_lag'] == 400 and analysis['lagging'] == ['nomad-2']
+    assert analysis['last_contact_outliers'] == ['nomad-3']
+    assert analysis['failure_tolerance'] == 1
+    assert probe_state('nomad', 'raft_analytics', analysis) == 'Failed'
+
+
+def test_failure_tolerance_is_computed_when_the_payload_lacks_it():
+    health = _health([0, 1, 2])
+    health['FailureTolerance'] = None
+    health['Servers'][2]['Healthy'] = False
+    analysis = raft_analytics('consul', {'autopilot_health': health})
+    assert analysis['failure_tolerance'] == 0 and analysis['unhealthy'] == ['nomad-2']
+
+
+def test_healthy_cluster_is_good():
+    analysis = raft_analytics('vault', {'autopilot': VAULT_STATE})
+    assert analysis['max_commit_lag'] == 5 and not analysis['lagging'] and not analysis['last_contact_outliers']
+    assert analysis['even_voters'] is False
+    assert probe_state('vault', 'raft_analytics', analysis) == 'Good'
+    assert raft_analytics('vault', {'autopilot': 'Error: 404'}) is None
+
+
+def test_trend_tracks_commit_rate_leader_changes_and_growing_lag():
+    trend = RaftTrend(size=10)
+    for i, lag in enumerate([0, 5, 20, 60]):
+        health = _health([0, 1, lag], leader='nomad-1' if i == 3 else 'nomad-0')
+        for server in health['Servers']:
+            server['LastIndex'] += 100 * i
+        trend.add(raft_analytics('nomad', {'autopilot_health': health}), at=1000.0 + 10 * i)
+    summary = trend.summary()
+    assert summary['samples'] == 4 and summary['window_seconds'] == 30
+    # The new leader in the last sample was one entry behind the old one
+    assert summary['commit_rate'] == round(299 / 30, 3)
+    assert summary['leader_changes'] == 1
+    assert summary['falling_behind'] == ['nomad-2']
+    assert summary['servers']['nomad-2']['max_commit_lag'] == 59
+    assert RaftTrend().summary() == {'samples': 0}
+
+
+def test_raft_metrics_are_exported_per_server():
+    result = {'autopilot': VAULT_STATE}
+    result['raft_analytics'] = raft_analytics('vault', result)
+    body = render_metrics(snapshot_metrics(Snapshot({'Vault': result})))
+    assert 'hcp_doctor_raft_failure_tolerance{product="vault"} 1' in body
+    assert 'hcp_doctor_raft_voters{product="vault"} 3' in body
+    assert 'hcp_doctor_raft_commit_lag{product="vault",server="vault-2"} 5' in body
+    assert 'hcp_doctor_raft_last_contact_seconds{product="vault",server="vault-1"} 0.012' in body
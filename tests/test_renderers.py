@@ -0,0 +1,41 @@
+import re
+import time
+
+from hashicorp_doctor.snapshot import Snapshot
+from hashicorp_doctor.renderers import render_pdf, render_html, render_json
+
+
+def _catalog(count):
+    return [{'ID': f'id-{i:05d}', 'Node': f'node-{i}', 'Address': f'10.0.{i // 256}.{i % 256}',
+             'Datacenter': 'dc1', 'Meta': {'segment': 'café\t'}} for i in range(count)]
+
+
+def test_pdf_of_large_snapshot_stays_within_budget():
+    nodes = _catalog(10000)
+    snapshot = Snapshot({
+        'Vault': {'leader': {'ha_enabled': False}},
+        'Consul': {'members': nodes, 'catalog_nodes': nodes},
+        'Nomad': 'Error: connection refused',
+    })
+    start = time.monotonic()
+    pdf = render_pdf(snapshot)
+    assert time.monotonic() - start < 2
+    assert pdf.startswith(b'%PDF')
+    assert len(re.findall(rb'/Type /Page\b', pdf)) < 40
+
+
+def test_html_escapes_payloads():
+    snapshot = Snapshot({'Vault': {'config': {'note': '<script>'}}})
+    html = render_html(snapshot)
+    assert '&lt;script&gt;' in html and '<script>' not in html
+    assert '"Vault"' in render_json(snapshot)
+
+
+def test_reports_include_probe_timings():
+    timing = {'requests': 1, 'reused': 0, 'dns': 0.001, 'connect': 0.002, 'ttfb': 0.25, 'total': 0.3, 'bytes': 64, 'parse': 0.0001}
+    snapshot = Snapshot({'Vault': {'leader': {'ha_enabled': False}}}, timings={'Vault': 0.31},
+                        probe_timings={'Vault': {'leader': timing}})
+    html = render_html(snapshot)
+    assert "<h2>Timings</h2>" in html and '<td>Vault / leader</td>' in html and '<td>250.0</td>' in html
+    assert '"probe_timings"' in render_json(snapshot)
+    assert '<h2>Timings</h2>' not in render_html(Snapshot({'Vault': {}}))
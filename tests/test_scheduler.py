@@ -0,0 +1,32 @@
+import time
+
+from hashicorp_doctor.cache import ResultCache
+from hashicorp_doctor.scheduler import CollectionScheduler, is_failing
+
+
+def test_scheduler_publishes_results_into_cache():
+    cache = ResultCache(ttl=0)
+    jobs = {'vault': (lambda: ('vault', 'addr'), lambda: {'leader': 'node-1'})}
+    scheduler = CollectionScheduler(cache, jobs, interval=0.05, jitter=0)
+    scheduler.start()
+    try:
+        deadline = time.time() + 2
+        while cache.get(('vault', 'addr')) is None and time.time() < deadline:
+            time.sleep(0.01)
+        assert cache.get(('vault', 'addr')).value == {'leader': 'node-1'}
+    finally:
+        scheduler.stop(timeout=1)
+    assert scheduler.status()['vault']['runs'] >= 1
+
+
+def test_failing_cluster_backs_off():
+    cache = ResultCache(ttl=0)
+    jobs = {'nomad': (lambda: ('nomad', ''), lambda: {'leader': 'Error: connection refused'})}
+    scheduler = CollectionScheduler(cache, jobs, interval=10, jitter=0, max_backoff=100)
+    assert scheduler.run_once('nomad') is False
+    assert scheduler.run_once('nomad') is False
+    assert scheduler.status()['nomad']['failures'] == 2
+    assert scheduler.next_delay(0) == 10
+    assert scheduler.next_delay(2) == 40
+    assert scheduler.next_delay(10) == 100
+    assert is_failing({'error': 'x'}) and not is_failing({'leader': 'a', 'peers': 'Error: x'})
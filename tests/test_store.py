@@ -0,0 +1,53 @@
+import time
+
+from hashicorp_doctor.snapshot import Snapshot
+from hashicorp_doctor.store import SnapshotStore
+
+
+def _snapshot(sealed, collected_at=None):
+    snapshot = Snapshot(collected_at=collected_at)
+    snapshot.add('Vault', {'seal_status': {'sealed': sealed}, 'config': 'Error: 503'}, 0.4, 'vault',
+                 {'seal_status': {'total': 0.1, 'bytes': 20}})
+    snapshot.add('Nomad', {'leader': '10.0.0.1:4647'}, 0.2, 'nomad')
+    return snapshot
+
+
+def test_save_load_and_list_runs(tmp_path, monkeypatch):
+    monkeypatch.setenv('VAULT_ADDR', 'https://vault:8200/')
+    store = SnapshotStore(str(tmp_path / 'h.db'))
+    run_id = store.save(_snapshot(False))
+    loaded = store.load(run_id)
+    assert list(loaded.sections) == ['Vault', 'Nomad']
+    assert loaded.sections['Vault']['seal_status'] == {'sealed': False}
+    assert loaded.timings == {'Vault': 0.4, 'Nomad': 0.2}
+    assert loaded.probe_timings['Vault']['seal_status']['bytes'] == 20
+    assert loaded.state('Vault', 'seal_status') == 'Good'
+    [run] = store.runs()
+    assert run['sections']['Vault'] == {'ok': 1, 'total': 2, 'errors': 1, 'elapsed': 0.4}
+    data, _, timings = store.latest('vault', 'vault:8200')
+    assert data['seal_status'] == {'sealed': False} and timings['seal_status']['total'] == 0.1
+    assert store.latest('vault', 'other:8200') is None
+
+
+def test_trend_and_retention(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'h.db'), retention_days=1, max_runs=3)
+    now = time.time()
+    store.save(_snapshot(False, now - 3 * 86400))
+    for i, sealed in enumerate([False, True, False, True]):
+        store.save(_snapshot(sealed, now - 60 + i))
+    assert len(store.runs()) == 3
+    trend = store.trend('Vault', 'seal_status')
+    assert [point['states']['seal_status'] for point in trend] == ['Failed', 'Good', 'Failed']
+    assert store.load().sections['Vault']['seal_status'] == {'sealed': True}
+
+
+def test_web_collections_are_pruned_apart_from_doctor_runs(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'h.db'), max_runs=2, max_web_runs=3)
+    now = time.time()
+    doctor_runs = [store.save(_snapshot(False, now - 100 + i)) for i in range(2)]
+    for i in range(10):
+        store.save(_snapshot(False, now - 50 + i), source='web')
+    assert [run['id'] for run in store.runs(source='doctor')] == doctor_runs[::-1]
+    assert len(store.runs(source='web')) == 3
+    with store._connect() as db:
+        assert db.execute('SELECT COUNT(*) FROM states WHERE run_id NOT IN (SELECT id FROM runs)').fetchone()[0] == 0
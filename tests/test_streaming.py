@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from hashicorp_doctor.streaming import BoundedCounter, iter_json_array
+from hashicorp_doctor.nomad_diag.allocations import scan_allocations
+from hashicorp_doctor.consul_diag.summaries import summarize_catalog_nodes, summarize_members
+from hashicorp_doctor.probes import probe_state
+
+
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_iter_json_array_handles_any_chunking():
+    items = [{'ID': i, 'Name': f'ñode-{i}', 'Tags': ['a', 'b']} for i in range(50)] + [12345, 'x', None]
+    data = json.dumps(items).encode('utf-8')
+    for size in (1, 3, 7, 64, len(data)):
+        assert list(iter_json_array(_chunks(data, size))) == items
+    assert list(iter_json_array([b' [ ] '])) == []
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'[{"a": 1}, ']))
+
+
+def test_bounded_counter_keeps_heavy_hitters():
+    counter = BoundedCounter(capacity=5)
+    for i in range(1000):
+        counter.add('hot')
+        counter.add(f'cold-{i}')
+    assert counter.total == 2000
+    assert counter.most_common(1) == [('hot', 1000)]
+    assert len(counter.counts) <= 10
+
+
+class _Resp:
+    def __init__(self, items, next_token=None):
+        self.status_code = 200
+        self.headers = {'X-Nomad-NextToken': next_token} if next_token else {}
+        self._data = json.dumps(items).encode()
+        self.text = ''
+
+    def iter_content(self, chunk_size):
+        return _chunks(self._data, 10)
+
+    def close(self):
+        pass
+
+
+class _Session:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def get(self, url, params=None, **kwargs):
+        self.calls.append(dict(params))
+        return self.pages[len(self.calls) - 1]
+
+
+def test_scan_allocations_follows_pages_and_aggregates():
+    def alloc(status, job, node):
+        return {'ClientStatus': status, 'JobID': job, 'NodeID': node, 'Namespace': 'default'}
+    session = _Session([
+        _Resp([alloc('running', 'web', 'n1'), alloc('failed', 'web', 'n1')], next_token='t1'),
+        _Resp([alloc('failed', 'api', 'n2'), alloc('failed', 'web', 'n1'), alloc('complete', 'batch', 'n3')]),
+    ])
+    summary = scan_allocations(session, 'http://nomad:4646', per_page=2)
+    assert session.calls[0]['per_page'] == 2 and 'next_token' not in session.calls[0]
+    assert session.calls[1]['next_token'] == 't1'
+    assert summary['total'] == 5 and summary['not_running'] == 4
+    assert summary['by_client_status'] == {'running': 1, 'failed': 3, 'complete': 1}
+    assert summary['top_jobs_not_running']['default/web'] == 2
+    assert summary['top_nodes_not_running'] == {'n1': 2, 'n2': 1, 'n3': 1}
+
+
+def test_summarize_members_keeps_worst_offenders():
+    def member(name, status, dc='dc1', segment=''):
+        return {'Name': name, 'Addr': '10.0.0.1', 'Status': status,
+                'Tags': {'dc': dc, 'role': 'node', 'segment': segment}}
+    members = [member(f'n{i}', 1) for i in range(50)]
+    members += [member('left-1', 3), member('failed-1', 4, dc='dc2'), member('leaving-1', 2, segment='alpha')]
+    summary = summarize_members(iter(members), top=2)
+    assert summary['total'] == 53
+    assert summary['by_status'] == {'alive': 50, 'left': 1, 'failed': 1, 'leaving': 1}
+    assert summary['by_datacenter'] == {'dc1': 52, 'dc2': 1}
+    assert [m['Name'] for m in summary['offenders']] == ['failed-1', 'leaving-1']
+    assert probe_state('consul', 'members', summary) == 'Failed'
+
+
+def test_summarize_catalog_nodes_streamed():
+    nodes = [{'Node': f'n{i}', 'Address': '10.0.0.1', 'Datacenter': 'dc1', 'Meta': {}} for i in range(1000)]
+    payload = json.dumps(nodes).encode()
+    summary = summarize_catalog_nodes(iter_json_array(_chunks(payload, 333)), top=3)
+    assert summary['total'] == 1000
+    assert summary['by_segment'] == {'<default>': 1000}
+    assert len(summary['sample']) == 3
+    assert probe_state('consul', 'catalog_nodes', summary) == 'Good'
@@ -0,0 +1,45 @@
+import pytest
+from requests.adapters import HTTPAdapter
+
+from hashicorp_doctor.transport import get_session, close_sessions
+
+
+def test_sessions_are_shared_per_product_and_address():
+    close_sessions()
+    a = get_session('consul', 'https://consul.example:8501/')
+    b = get_session('consul', 'https://consul.example:8501')
+    c = get_session('nomad', 'https://consul.example:8501')
+    d = get_session('consul', 'https://consul.example:8501', verify=False)
+    assert a is b
+    assert a is not c and a is not d
+    assert d.verify is False
+    close_sessions()
+    assert get_session('consul', 'https://consul.example:8501') is not a
+
+
+def test_session_pool_size_is_configurable():
+    close_sessions()
+    session = get_session('vault', 'http://vault.example:8200', pool_size=3)
+    assert session.get_adapter('http://vault.example:8200')._pool_maxsize == 3
+    close_sessions()
+
+
+def test_session_applies_default_timeouts(monkeypatch):
+    monkeypatch.setenv('HCP_DOCTOR_CONNECT_TIMEOUT', '2')
+    monkeypatch.setenv('HCP_DOCTOR_READ_TIMEOUT', '7')
+    close_sessions()
+    seen = []
+    session = get_session('nomad', 'http://nomad.example:4646')
+    adapter = session.get_adapter('http://nomad.example:4646')
+
+    def send(self, request, **kwargs):
+        seen.append(kwargs['timeout'])
+        raise ConnectionError('not sent')
+
+    monkeypatch.setattr(HTTPAdapter, 'send', send)
+    for timeout in (None, 1):
+        with pytest.raises(ConnectionError):
+            session.get('http://nomad.example:4646/v1/status/leader', timeout=timeout)
+    assert adapter.timeout == (2.0, 7.0)
+    assert seen == [(2.0, 7.0), 1]
+    close_sessions()
@@ -0,0 +1,38 @@
+from hashicorp_doctor.probes import probe_state
+from hashicorp_doctor.utils import _STATE_RULES, get_section_state, register_state_rule
+
+
+class _Unprintable(dict):
+    def __str__(self):
+        raise AssertionError('payload was stringified')
+
+    __repr__ = __str__
+
+
+def test_token_lookup_self_does_not_stringify_payload():
+    assert probe_state('vault', 'token_lookup_self', _Unprintable(data={'policies': ['x'] * 1000})) == 'Unknown'
+    assert probe_state('vault', 'token_lookup_self', {'errors': ['1 error occurred: permission denied']}) == 'Failed'
+    assert probe_state('vault', 'token_lookup_self', {'data': {'id': 's.abc'}}) == 'Good'
+
+
+def test_product_rules_take_precedence_and_can_defer(monkeypatch):
+    monkeypatch.setattr('hashicorp_doctor.utils._STATE_RULES', dict(_STATE_RULES))
+    register_state_rule('leader', lambda value: 'Good' if value == 'n1' else None, product='test')
+
+    @register_state_rule('build_info', product='test')
+    def _build(value):
+        return 'Good' if isinstance(value, dict) else None
+
+    assert get_section_state('leader', 'n1', 'test') == 'Good'
+    assert get_section_state('leader', '', 'test') == 'Failed'  # deferred to the shared rule
+    assert get_section_state('build_info', {'version': '1'}, 'test') == 'Good'
+    assert get_section_state('build_info', {'version': '1'}) == 'Unknown'
+    assert get_section_state('error', 'boom', 'test') == 'Failed'
+
+
+def test_product_payload_rules_are_registered_by_their_product():
+    summary = {'total': 3, 'by_status': {'down': 1}}
+    assert probe_state('nomad', 'nodes', summary) == 'Failed'
+    assert probe_state('consul', 'catalog_nodes', summary) == 'Good'
+    assert not any(product is None and section in ('nodes', 'catalog_nodes', 'seal_status')
+                   for product, section in _STATE_RULES)
@@ -0,0 +1,102 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from hashicorp_doctor.aio import AsyncHTTP, run_sync
+from hashicorp_doctor.probes import ProbeContext, probe_state
+from hashicorp_doctor.vault.diagnostics import run_vault_diagnostics
+from hashicorp_doctor.vault.nodes import discover_nodes, probe_nodes
+
+DELAY = 0.3
+
+
+def _handler(node):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            status = 200
+            if path == '/v1/sys/ha-status':
+                body = {'nodes': [{'hostname': name, 'api_address': address, 'active_node': name == 'vault-0'}
+                                  for name, address in node['members']]}
+            elif path == '/v1/sys/health':
+                time.sleep(DELAY)
+                status = 503 if node['sealed'] else 200 if node['active'] else 429
+                body = {'initialized': True, 'sealed': node['sealed'], 'standby': not node['active'], 'version': '1.15.2'}
+            elif path == '/v1/sys/seal-status':
+                time.sleep(DELAY)
+                body = {'initialized': True, 'sealed': node['sealed'], 't': 3, 'progress': 1 if node['sealed'] else 0}
+            elif path == '/v1/sys/leader':
+                time.sleep(DELAY)
+                body = {'ha_enabled': True, 'is_self': node['active'], 'raft_committed_index': node['index'],
+                        'raft_applied_index': node['index'] - 2}
+            else:
+                status, body = 404, {'errors': []}
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+@pytest.fixture
+def cluster():
+    servers = []
+    nodes = [{'active': True, 'sealed': False, 'index': 100}, {'active': False, 'sealed': True, 'index': 90},
+             {'active': False, 'sealed': False, 'index': 98}]
+    members = []
+    for i, node in enumerate(nodes):
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), _handler(node))
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        members.append((f"vault-{i}", f"http://127.0.0.1:{httpd.server_port}"))
+    # A member nothing listens on
+    members.append(('vault-3', 'http://127.0.0.1:1'))
+    for node in nodes:
+        node['members'] = members
+    yield members[0][1]
+    for httpd in servers:
+        httpd.shutdown()
+
+
+def test_all_nodes_probes_every_member_in_parallel(cluster):
+    start = time.monotonic()
+    result = run_vault_diagnostics(addr=cluster, probes={'node_health'}, all_nodes=True)
+    elapsed = time.monotonic() - start
+    summary = result['node_health']
+    assert summary['total'] == 4 and summary['reachable'] == 3
+    assert summary['active'] == ['vault-0'] and summary['sealed'] == ['vault-1'] and summary['unreachable'] == ['vault-3']
+    assert summary['raft_index_lag'] == 100 - 88
+    assert summary['nodes']['vault-1']['unseal_progress'] == '1/3'
+    assert summary['nodes']['vault-2']['standby'] is True
+    assert 'errors' in summary['nodes']['vault-3']
+    assert probe_state('vault', 'node_health', summary) == 'Failed'
+    # Nine slow reads across three nodes take about as long as one
+    assert elapsed < DELAY * 3
+
+
+def test_node_health_is_skipped_without_all_nodes(cluster):
+    assert 'node_health' not in run_vault_diagnostics(addr=cluster, probes={'node_health'})
+
+
+
+def test_node_reads_stop_at_the_budget(cluster):
+    async def main():
+        async with AsyncHTTP() as http:
+            ctx = ProbeContext(http, cluster)
+            return await probe_nodes(ctx, await discover_nodes(ctx), budget=DELAY / 3)
+
+    start = time.monotonic()
+    summary = run_sync(main())
+    # The slow reads outlast the budget, so every node is reported unreachable
+    assert summary['total'] == 4 and summary['reachable'] == 0
+    assert time.monotonic() - start < DELAY
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from hashicorp_doctor.aio import run_sync
+from hashicorp_doctor.consul_diag.watch import ConsulWatch
+
+
+class _FakeConsul:
+    """Catalog and health state with Consul's blocking-query semantics."""
+
+    def __init__(self):
+        self.index = 10
+        self.nodes = [{'Node': 'n1', 'Address': '10.0.0.1'}]
+        self.checks = [{'Node': 'n1', 'CheckID': 'serfHealth', 'Name': 'Serf', 'Status': 'passing'}]
+        self.changed = threading.Condition()
+        self.requests = {}
+
+    def change(self, nodes=None, checks=None):
+        with self.changed:
+            self.index += 1
+            if nodes is not None:
+                self.nodes = nodes
+            if checks is not None:
+                self.checks = checks
+            self.changed.notify_all()
+
+
+def _handler(consul):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            consul.requests[url.path] = consul.requests.get(url.path, 0) + 1
+            if url.path in ['/v1/catalog/nodes', '/v1/health/state/any']:
+                wait = float(query.get('wait', ['0s'])[0].rstrip('s'))
+                index = int(query.get('index', ['0'])[0])
+                with consul.changed:
+                    consul.changed.wait_for(lambda: consul.index != index, timeout=wait if index else 0)
+                    body = consul.nodes if url.path == '/v1/catalog/nodes' else consul.checks
+                    current = consul.index
+            elif url.path == '/v1/status/leader':
+                body, current = '10.0.0.1:8300', None
+            else:
+                body, current = {'Healthy': True}, None
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            if current is not None:
+                self.send_header('X-Consul-Index', str(current))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+@pytest.fixture
+def consul():
+    fake = _FakeConsul()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _handler(fake))
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    fake.addr = f"http://127.0.0.1:{httpd.server_port}"
+    yield fake
+    with fake.changed:
+        # Release parked blocking queries so shutdown does not wait on them
+        fake.index += 1000
+        fake.changed.notify_all()
+    httpd.shutdown()
+
+
+def test_watch_reports_changes_from_blocking_queries(consul):
+    changes = []
+
+    def on_change(key, value, state, previous):
+        changes.append((time.monotonic(), key, state, previous))
+
+    async def main():
+        watch = ConsulWatch(consul.addr, wait=30, poll_interval=0.2, on_change=on_change)
+        task = asyncio.ensure_future(watch.run())
+        await asyncio.sleep(0.5)
+        changed_at = time.monotonic()
+        await asyncio.get_running_loop().run_in_executor(None, lambda: consul.change(
+            checks=[{'Node': 'n1', 'CheckID': 'serfHealth', 'Name': 'Serf', 'Status': 'critical'}]))
+        await asyncio.sleep(0.5)
+        watch.stop()
+        return watch, changed_at, await task
+
+    watch, changed_at, results = run_sync(main())
+    assert results['leader'] == '10.0.0.1:8300'
+    assert watch.states['autopilot_health'] == 'Healthy'
+    assert watch.states['catalog_nodes'] == 'Good'
+    health = [change for change in changes if change[1] == 'health_checks']
+    assert [(state, previous) for _, _, state, previous in health] == [('Good', None), ('Failed', 'Good')]
+    assert health[-1][0] - changed_at < 1.0
+    assert results['health_checks']['offenders'][0]['CheckID'] == 'serfHealth'
+    # The catalog did change index but not content: no second notification
+    assert [change[1] for change in changes].count('catalog_nodes') == 1
+    # One initial read plus one re-issue per change, not a poll loop
+    assert consul.requests['/v1/health/state/any'] <= 3
+    assert watch.indexes['health_checks'] == consul.index
+
+
+def test_watch_resets_an_index_that_goes_backwards(consul):
+    async def main():
+        watch = ConsulWatch(consul.addr, wait=30, poll_interval=0.1, keys=['catalog_nodes'])
+        task = asyncio.ensure_future(watch.run())
+        await asyncio.sleep(0.3)
+        with consul.changed:
+            consul.index = 5
+            consul.nodes = []
+            consul.changed.notify_all()
+        await asyncio.sleep(0.5)
+        watch.stop()
+        await task
+        return watch
+
+    watch = run_sync(main())
+    assert watch.states['catalog_nodes'] == 'Failed'
+    assert watch.indexes['catalog_nodes'] == 5
+
+
+def test_watch_records_errors_without_stopping():
+    async def main():
+        watch = ConsulWatch('http://127.0.0.1:1', wait=1, poll_interval=0.05, keys=['catalog_nodes', 'leader'])
+        return await watch.run(duration=0.3), watch
+
+    results, watch = run_sync(main())
+    assert results['catalog_nodes'].startswith('Error')
+    assert results['leader'].startswith('Error')
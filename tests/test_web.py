@@ -38,7 +38,10 @@ def test_nomad_page(client):
 def test_html_report(client):
     resp = client.get('/report/html')
     assert resp.status_code == 200
+    assert resp.is_streamed
     assert b'<html>' in resp.data
+    for title in (b'Vault', b'Consul', b'Nomad'):
+        assert b'<h2>' + title + b'</h2>' in resp.data
 
 def test_html_report_download(client):
     resp = client.get('/report/html/download')
@@ -52,3 +55,133 @@ def test_txt_report(client):
     assert resp.headers['Content-Type'].startswith('text/plain')
     assert 'attachment' in resp.headers.get('Content-Disposition', '')
 
+
+def test_pages_are_served_from_cache(client):
+    resp = client.get('/vault?refresh=1')
+    assert resp.headers['X-HCP-Doctor-Cache'] == 'MISS'
+    resp = client.get('/vault')
+    assert resp.status_code == 200
+    assert resp.headers['X-HCP-Doctor-Cache'] == 'HIT'
+    assert float(resp.headers['X-HCP-Doctor-Cache-Age']) >= 0
+
+def test_json_report(client):
+    resp = client.get('/report/json')
+    assert resp.status_code == 200
+    assert resp.headers['Content-Type'].startswith('application/json')
+    assert set(resp.get_json()['sections']) == {'Vault', 'Consul', 'Nomad'}
+
+def test_pdf_report(client):
+    resp = client.get('/report/pdf')
+    assert resp.status_code == 200
+    assert resp.headers['Content-Type'] == 'application/pdf'
+    assert resp.data.startswith(b'%PDF')
+
+def test_metrics_export_cached_results_without_collecting(client):
+    web_mod = sys.modules['hashicorp_doctor.web']
+    client.get('/vault')
+    stats = web_mod.result_cache.stats()
+    resp = client.get('/metrics')
+    assert resp.status_code == 200
+    assert resp.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    assert web_mod.result_cache.stats() == stats
+    body = resp.get_data(as_text=True)
+    assert '# TYPE hcp_doctor_check_state gauge' in body
+    assert 'hcp_doctor_check_errors{product="vault"}' in body
+    assert 'hcp_doctor_collection_duration_seconds{product="vault"}' in body
+    assert f"hcp_doctor_cache_hits_total {stats['hits']}" in body
+
+
+def test_history_views_and_warm_cache(client):
+    web_mod = sys.modules['hashicorp_doctor.web']
+    client.get('/nomad?refresh=1')
+    resp = client.get('/history')
+    assert resp.status_code == 200 and b'Run History' in resp.data
+    run_id = web_mod.history_store().runs(limit=1)[0]['id']
+    resp = client.get(f'/history/{run_id}')
+    assert resp.status_code == 200 and b'<h2>Nomad</h2>' in resp.data
+    assert client.get('/history/999999').status_code == 404
+    assert client.get('/history/trend?section=Nomad').get_json()[-1]['run_id'] == run_id
+    web_mod.result_cache.clear()
+    assert 'nomad' in web_mod.warm_cache()
+    assert client.get('/nomad').headers['X-HCP-Doctor-Cache'] == 'HIT'
+
+
+def test_events_stream_collected_sections_without_collecting(client):
+    web_mod = sys.modules['hashicorp_doctor.web']
+    page = client.get('/consul')
+    assert b"new EventSource('/events?products=consul')" in page.data
+    stats = web_mod.result_cache.stats()
+    resp = client.get('/events?products=consul', buffered=False)
+    assert resp.headers['Content-Type'].startswith('text/event-stream')
+    first = next(resp.response)
+    first = first.decode() if isinstance(first, bytes) else first
+    resp.close()
+    assert first.startswith('id: ') and '\nevent: snapshot\n' in first
+    assert '"product": "consul"' in first and '"product": "vault"' not in first
+    assert web_mod.result_cache.stats() == stats
+
+
+def test_nomad_live_page_does_not_evaluate_cluster_data(client):
+    web_mod = sys.modules['hashicorp_doctor.web']
+
+    class Stream:
+        connected = True
+        view = type('View', (), {'index': 7, 'events': 3})()
+        results = {'jobs': {'failed': ['{{ 7 * 7 }}', '<script>alert(1)</script>']}}
+        states = {'jobs': 'Failed'}
+
+    previous, web_mod.nomad_events = web_mod.nomad_events, Stream()
+    try:
+        page = client.get('/nomad/live').get_data(as_text=True)
+    finally:
+        web_mod.nomad_events = previous
+    assert '"{{ 7 * 7 }}"' in page
+    assert '&lt;script&gt;alert(1)&lt;/script&gt;' in page
+
+
+@pytest.mark.parametrize('product', ['vault', 'consul', 'nomad'])
+def test_product_pages_do_not_evaluate_cluster_data(client, monkeypatch, product):
+    web_mod = sys.modules['hashicorp_doctor.web']
+    from hashicorp_doctor.cache import CachedResult
+    cached = CachedResult({'jobs': ['{{7*7}}']}, 0, True)
+    monkeypatch.setattr(web_mod, 'collect', lambda product, refresh=False: cached)
+    resp = client.get(f'/{product}')
+    assert resp.mimetype == 'text/html' and resp.headers['X-HCP-Doctor-Cache'] == 'HIT'
+    page = resp.get_data(as_text=True)
+    assert '{{7*7}}' in page and '49' not in page
+
+
+def test_background_collections_reuse_connections(monkeypatch):
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    web_mod = sys.modules['hashicorp_doctor.web']
+    ports = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            ports.append(self.client_address[1])
+            data = json.dumps([]).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.setenv('NOMAD_ADDR', f"http://127.0.0.1:{httpd.server_port}")
+    monkeypatch.setenv('HCP_DOCTOR_STORE', 'off')
+    try:
+        web_mod.timed_collector('nomad')()
+        first = set(ports)
+        del ports[:]
+        web_mod.timed_collector('nomad')()
+    finally:
+        httpd.shutdown()
+    assert ports and set(ports) <= first